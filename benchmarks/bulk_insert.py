@@ -0,0 +1,59 @@
+"""Compare per-call and batched insertion of abstractions and contents
+
+Usage: PYTHONPATH=. python benchmarks/bulk_insert.py [n_systems] [n_replicas]
+"""
+
+import sys
+import time
+
+from indirect import indirect
+
+
+def build_per_call(n_systems, n_replicas):
+    project = indirect.Project()
+    for s in range(n_systems):
+        project.add_abstraction(f"s{s}")
+        for r in range(n_replicas):
+            project.add_abstraction(f"{r}", path=f"rep_{r}", view=[f"s{s}"])
+
+    project.add_content(
+        "report", "data.dat",
+        view=[
+            f"s{s}.{r}" for s in range(n_systems) for r in range(n_replicas)
+            ]
+        )
+
+    return project
+
+
+def build_batched(n_systems, n_replicas):
+    project = indirect.Project()
+    project.add_abstractions((f"s{s}", None, []) for s in range(n_systems))
+    project.add_abstractions(
+        (f"{r}", f"rep_{r}", [f"s{s}"])
+        for s in range(n_systems) for r in range(n_replicas)
+        )
+    project.add_contents(
+        ("report", "data.dat", [f"s{s}", f"{r}"])
+        for s in range(n_systems) for r in range(n_replicas)
+        )
+
+    return project
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n_systems = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    n_replicas = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    t_per_call = timed(build_per_call, n_systems, n_replicas)
+    t_batched = timed(build_batched, n_systems, n_replicas)
+
+    print(f"{n_systems * n_replicas} replicas")
+    print(f"per call: {t_per_call:.3f} s")
+    print(f"batched:  {t_batched:.3f} s ({t_per_call / t_batched:.1f}x)")
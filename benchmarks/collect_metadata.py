@@ -0,0 +1,63 @@
+"""File metadata of many contents
+
+Usage: PYTHONPATH=. python benchmarks/collect_metadata.py [n_dirs] [n_files]
+
+Compares a stat call per content with Project.collect_metadata, which
+stats the same files per directory in a thread pool, and a second
+collection served from the metadata table.  Every other content file is
+missing.  The cold collection makes as many stat calls as the loop, so
+it is not expected to be faster on a local disk.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from indirect import indirect
+
+
+if __name__ == "__main__":
+    n_dirs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_files = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for d in range(n_dirs):
+            os.mkdir(os.path.join(tmp, f"d{d}"))
+            for f in range(0, n_files, 2):
+                open(os.path.join(tmp, f"d{d}", f"f{f}.dat"), "w").close()
+
+        p = indirect.Project()
+        p.sources["main"] = tmp
+        p.add_abstractions((f"d{d}", None, []) for d in range(n_dirs))
+        p.add_contents(
+            (
+                (f"f{f}", f"f{f}.dat", [f"d{d}"])
+                for d in range(n_dirs) for f in range(n_files)
+                ),
+            source="main"
+            )
+
+        start = time.perf_counter()
+        stats = {}
+        for keyp, path in zip(*p.resolve_paths(with_keys=True)):
+            try:
+                stats[keyp] = os.stat(path)
+            except FileNotFoundError:
+                stats[keyp] = None
+        t_stat = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cold = p.collect_metadata()
+        t_cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm = p.collect_metadata()
+        t_warm = time.perf_counter() - start
+
+    n = len(stats)
+    assert len(cold.metadata) == n and warm.n_cached == n
+    for name, t in [
+            ("stat per file", t_stat), ("collect (cold)", t_cold),
+            ("collect (warm)", t_warm)]:
+        print(f"{name:15s} {n} contents: {t:.3f} s ({n / t:.0f}/s)")
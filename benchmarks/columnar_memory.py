@@ -0,0 +1,66 @@
+"""Memory footprint of an object tree and its columnar form
+
+Usage: PYTHONPATH=. python benchmarks/columnar_memory.py [n_systems] [n_replicas]
+
+Also times modifications of the compacted project, which update the
+columns in place, and resolving all paths from the columns.
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from indirect import columnar
+
+
+def build(n_systems, n_replicas):
+    project = columnar.ColumnarProject()
+    project.add_abstractions(
+        (f"s{s}", f"system_{s}", []) for s in range(n_systems)
+        )
+    project.add_abstractions(
+        (f"{r}", f"rep_{r}", [f"s{s}"])
+        for s in range(n_systems) for r in range(n_replicas)
+        )
+    project.add_contents(
+        ("report", "data.dat", [f"s{s}", f"{r}"])
+        for s in range(n_systems) for r in range(n_replicas)
+        )
+    return project
+
+
+if __name__ == "__main__":
+    n_systems = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    n_replicas = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    project = build(n_systems, n_replicas)
+    gc.collect()
+    objects, _ = tracemalloc.get_traced_memory()
+
+    project.compact()
+    gc.collect()
+    compacted, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    objects -= start
+    compacted -= start
+    print(f"{n_systems * n_replicas} replicas")
+    print(f"objects:  {objects / 2**20:.1f} MiB")
+    print(
+        f"columnar: {compacted / 2**20:.1f} MiB "
+        f"({objects / compacted:.1f}x)"
+        )
+
+    start = time.perf_counter()
+    for i in range(1000):
+        project.add_abstraction(f"new{i}", view=["s0"])
+    t_add = time.perf_counter() - start
+
+    start = time.perf_counter()
+    paths = project.resolve_paths()
+    t_resolve = time.perf_counter() - start
+    print(f"add 1000 abstractions: {t_add:.3f} s")
+    print(f"resolve {len(paths)} paths: {t_resolve:.3f} s")
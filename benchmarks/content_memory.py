@@ -0,0 +1,70 @@
+"""Per-node memory footprint of contents
+
+Compares :obj:`indirect.Content` against a replica of the former
+dict-based layout (own `pathlib.Path` per cpath, own KeyPath list).
+
+Usage: PYTHONPATH=. python benchmarks/content_memory.py [n_contents]
+"""
+
+import pathlib
+import sys
+import tracemalloc
+
+from indirect import indirect
+
+
+class LegacyContent:
+    def __init__(
+            self, alias, *, filename, cpath, keyp, source, project):
+        self.alias = alias
+        self.filename = filename
+        self.cpath = pathlib.Path(cpath)
+        self.keyp = [str(k) for k in keyp]
+        self.source = source
+        self.exists = None
+        self.desc = ""
+        self.kind = None
+        self.hash = None
+        self.signature = None
+        self.tags = []
+        self.project = project
+        self.ignore_keyp = False
+
+
+def build(cls, n_contents, project):
+    n_replicas = 100
+    return [
+        cls(
+            "report",
+            filename="data.dat",
+            cpath="",
+            keyp=["system", f"{i // n_replicas}", f"{i % n_replicas}"],
+            source="home",
+            project=project
+            )
+        for i in range(n_contents)
+        ]
+
+
+def measure(cls, n_contents, project):
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    contents = build(cls, n_contents, project)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del contents
+    return (end - start) / n_contents
+
+
+if __name__ == "__main__":
+    n_contents = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    project = indirect.Project()
+
+    legacy = measure(LegacyContent, n_contents, project._proxy)
+    current = measure(indirect.Content, n_contents, project._proxy)
+
+    print(f"{n_contents} contents")
+    print(f"legacy:  {legacy:.0f} B per node")
+    print(f"current: {current:.0f} B per node ({legacy / current:.1f}x)")
@@ -0,0 +1,67 @@
+"""Compare per-content path resolution with Project.resolve_paths
+
+Usage: PYTHONPATH=. python benchmarks/resolve_paths.py [n_systems] [n_replicas]
+
+Reports the best of three runs, each starting from empty path caches.
+"""
+
+import sys
+import time
+
+from indirect import indirect
+
+
+def build(n_systems, n_replicas):
+    project = indirect.Project()
+    project.sources["data"] = "$HOME/data"
+    project.add_abstractions(
+        (f"s{s}", f"system_{s}", []) for s in range(n_systems)
+        )
+    project.add_abstractions(
+        (f"{r}", f"rep_{r}", [f"s{s}"])
+        for s in range(n_systems) for r in range(n_replicas)
+        )
+    for alias in ["report", "log"]:
+        project.add_contents(
+            ((alias, f"{alias}.dat", [f"s{s}", f"{r}"])
+             for s in range(n_systems) for r in range(n_replicas)),
+            source="data"
+            )
+    return project
+
+
+def per_content(project):
+    project.invalidate()
+    return [str(c.fullpath) for _, c in project.iter_contents()]
+
+
+def batched(project):
+    project.invalidate()
+    return project.resolve_paths()
+
+
+def timed(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    n_systems = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    n_replicas = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    project = build(n_systems, n_replicas)
+
+    t_per_content, expected = timed(per_content, project)
+    t_batched, paths = timed(batched, project)
+    assert paths == expected
+
+    print(f"{len(paths)} contents")
+    print(f"per content: {t_per_content:.3f} s")
+    print(
+        f"batched:     {t_batched:.3f} s "
+        f"({t_per_content / t_batched:.1f}x)"
+        )
@@ -0,0 +1,78 @@
+"""Concurrent writers of one project file
+
+Usage: PYTHONPATH=. python benchmarks/shared_writers.py [n_writers] [n_existing]
+
+Every writer adds one abstraction with ten contents to a project that
+already holds `n_existing` contents.  Compares serialised rewrites of
+the file (lock, load, modify, save) with SharedProject commits.
+"""
+
+import fcntl
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from indirect import indirect
+from indirect import shared
+
+
+def add_outputs(p, i):
+    p.add_abstraction(f"job{i}", view=["runs"])
+    p.add_contents(
+        (f"out{j}", f"out{j}.dat", ["runs", f"job{i}"]) for j in range(10)
+        )
+
+
+def rewrite(file, i):
+    with open(f"{file}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        p = indirect.Project(file=file)
+        add_outputs(p, i)
+        p.save(file)
+
+
+def commit(file, i):
+    p = shared.SharedProject(file=file)
+    add_outputs(p, i)
+    p.commit()
+
+
+def run(target, file, n_writers):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=target, args=(file, i))
+        for i in range(n_writers)
+        ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    n_jobs = len(indirect.Project(file=file)["runs"].next)
+    assert n_jobs == n_writers, n_jobs
+    return elapsed
+
+
+if __name__ == "__main__":
+    n_writers = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    n_existing = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+
+    for name, target in [("rewrite", rewrite), ("commit", commit)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "project.json")
+            p = indirect.Project()
+            p.add_abstractions([("runs", None, []), ("data", None, [])])
+            p.add_contents(
+                (f"c{i}", f"c{i}.dat", ["data"]) for i in range(n_existing)
+                )
+            p.save(file)
+
+            elapsed = run(target, file, n_writers)
+            print(
+                f"{name:8s} {n_writers} writers: {elapsed:.2f} s "
+                f"({n_writers / elapsed:.1f} commits/s)"
+                )
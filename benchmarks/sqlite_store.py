@@ -0,0 +1,69 @@
+"""Bulk insert and cold lookup throughput of SqliteProject
+
+Usage: PYTHONPATH=. python benchmarks/sqlite_store.py [n_systems] [n_replicas]
+
+Ten contents are added per replica.  Lookups run in a fresh project on
+the committed database, so that every node is read from SQLite.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from indirect import sqlite
+
+
+if __name__ == "__main__":
+    n_systems = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    n_replicas = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "project.sqlite")
+        project = sqlite.SqliteProject(database=database)
+
+        start = time.perf_counter()
+        project.add_abstractions(
+            (f"s{s}", None, []) for s in range(n_systems)
+            )
+        project.add_abstractions(
+            (f"{r}", None, [f"s{s}"])
+            for s in range(n_systems) for r in range(n_replicas)
+            )
+        t_abstractions = time.perf_counter() - start
+
+        start = time.perf_counter()
+        project.add_contents(
+            (f"c{i}", f"c{i}.dat", [f"s{s}", f"{r}"])
+            for s in range(n_systems) for r in range(n_replicas)
+            for i in range(10)
+            )
+        project.commit()
+        t_contents = time.perf_counter() - start
+        project.close()
+
+        project = sqlite.SqliteProject(database=database)
+        keyps = [
+            (f"s{s}", f"{r}", "c0")
+            for s in range(n_systems) for r in range(0, n_replicas, 10)
+            ]
+        start = time.perf_counter()
+        for keyp in keyps:
+            project.eval_keyp(keyp)
+        t_lookups = time.perf_counter() - start
+        project.close()
+
+    n_abstractions = n_systems * (n_replicas + 1)
+    n_contents = 10 * n_systems * n_replicas
+    print(
+        f"{n_abstractions} abstractions: {t_abstractions:.2f} s "
+        f"({n_abstractions / t_abstractions:.0f}/s)"
+        )
+    print(
+        f"{n_contents} contents:     {t_contents:.2f} s "
+        f"({n_contents / t_contents:.0f}/s)"
+        )
+    print(
+        f"{len(keyps)} cold lookups:     {t_lookups:.2f} s "
+        f"({1e6 * t_lookups / len(keyps):.0f} us each)"
+        )
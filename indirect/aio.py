@@ -0,0 +1,271 @@
+"""Asyncio variants of file system operations
+
+Directory discovery, existence and stat checks of contents and project
+persistence block on the file system.  The coroutines and asynchronous
+iterators in this module run the blocking work in an executor (the
+event loop's default executor if `None`) and keep at most
+`max_concurrency` jobs in flight, so that one event loop can serve
+many projects at the same time.
+
+Results are streamed in completion order.  A project must not be
+modified by other tasks while it is iterated or saved.
+
+Example:
+
+    async def refresh(files):
+        projects = await asyncio.gather(*(aio.load(f) for f in files))
+        for p in projects:
+            async for keyp, exists in aio.iter_exists(p):
+                ...
+        await asyncio.gather(*(aio.save(p, p.file) for p in projects))
+"""
+
+import asyncio
+import functools
+from itertools import islice
+import os
+from stat import S_ISREG
+
+from . import cookbook
+from . import indirect
+
+
+MAX_CONCURRENCY = 8
+BATCH_SIZE = 64
+
+
+async def _run(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(func, *args, **kwargs)
+        )
+
+
+async def _map_batches(func, items, *, batch_size, max_concurrency,
+                       executor):
+    """Apply `func` to batches of `items` in an executor
+
+    Yields:
+        (batch, result) tuples in completion order
+    """
+
+    loop = asyncio.get_running_loop()
+    items = iter(items)
+    pending = {}
+
+    try:
+        while True:
+            while len(pending) < max_concurrency:
+                batch = list(islice(items, batch_size))
+                if not batch:
+                    break
+                pending[loop.run_in_executor(executor, func, batch)] = batch
+
+            if not pending:
+                return
+
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+                )
+            for future in done:
+                yield pending.pop(future), future.result()
+    finally:
+        # Batches that did not start yet are dropped
+        for future in pending:
+            future.cancel()
+
+
+async def get_dirs(path='', *, prefix='', regex='.*', suffix='',
+                   exclude=None, executor=None):
+    """Find all directories matching a pattern
+
+    See :func:`cookbook.get_dirs`.
+
+    Keyword args:
+        executor: Executor to list the directory in.
+
+    Yields:
+        Matching names, sorted
+    """
+
+    names = await _run(
+        executor, lambda: list(cookbook.get_dirs(
+            path, prefix=prefix, regex=regex, suffix=suffix,
+            exclude=exclude
+            ))
+        )
+    for name in names:
+        yield name
+
+
+def _list_matching(root, prefix, match):
+    with os.scandir(os.path.join(root, *prefix)) as entries:
+        return sorted(
+            entry.name for entry in entries
+            if entry.is_dir() and match(entry.name)
+            )
+
+
+async def scan_dirs(path, template, *, max_concurrency=MAX_CONCURRENCY,
+                    executor=None):
+    """Find directories matching a multi-level template
+
+    Directories of all levels are listed concurrently.  See
+    :func:`cookbook.scan_dirs` for the template format.
+
+    Keyword args:
+        max_concurrency: Maximum number of directories listed at once.
+        executor: Executor to list directories in.
+
+    Yields:
+        Tuples with the matched directory name for each level, in
+        completion order
+    """
+
+    levels = cookbook.compile_template(template)
+    root = os.fspath(path) or "."
+    loop = asyncio.get_running_loop()
+    queue = [()]
+    pending = {}
+
+    try:
+        while queue or pending:
+            while queue and (len(pending) < max_concurrency):
+                prefix = queue.pop()
+                future = loop.run_in_executor(
+                    executor, _list_matching, root, prefix,
+                    levels[len(prefix)]
+                    )
+                pending[future] = prefix
+
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+                )
+            for future in done:
+                prefix = pending.pop(future)
+                for name in future.result():
+                    match = (*prefix, name)
+                    if len(match) == len(levels):
+                        yield match
+                    else:
+                        queue.append(match)
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _isfiles(batch):
+    return [os.path.isfile(path) for _, _, path in batch]
+
+
+def _stats(batch):
+    stats = []
+    for _, _, path in batch:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Missing, or a parent is no directory, like os.path.isfile
+            stat = None
+        stats.append(stat)
+    return stats
+
+
+def _with_paths(project, view, recursive):
+    for keyp, c in project.iter_contents(view, recursive=recursive):
+        yield keyp, c, c.fullpath
+
+
+def _set_exists(project, keyp, c, exists):
+    if c.exists is not exists:
+        c.exists = exists
+        project._modified(keyp, c)
+
+
+async def iter_exists(project, view=None, *, recursive=True,
+                      max_concurrency=MAX_CONCURRENCY,
+                      batch_size=BATCH_SIZE, executor=None):
+    """Check if content files exist
+
+    Like :meth:`indirect.Project.check_exists`, the outcome is stored
+    in :attr:`indirect.Content.exists`.
+
+    Args:
+        project: Project to check.
+        view: View (or view name) to check. If `None`, the whole
+            project is checked.
+
+    Keyword args:
+        recursive: Include contents in the subtrees of the view,
+            see :meth:`indirect.Project.iter_contents`.
+        max_concurrency: Maximum number of batches checked at once.
+        batch_size: Number of files checked per executor job.
+        executor: Executor to run the checks in.
+
+    Yields:
+        (keyp, exists) tuples in completion order
+    """
+
+    batches = _map_batches(
+        _isfiles, _with_paths(project, view, recursive),
+        batch_size=batch_size, max_concurrency=max_concurrency,
+        executor=executor
+        )
+    async for batch, checked in batches:
+        for (keyp, c, _), exists in zip(batch, checked):
+            _set_exists(project, keyp, c, exists)
+            yield keyp, exists
+
+
+async def iter_stats(project, view=None, *, recursive=True,
+                     max_concurrency=MAX_CONCURRENCY,
+                     batch_size=BATCH_SIZE, executor=None):
+    """Collect file metadata of contents
+
+    :attr:`indirect.Content.exists` is updated as in
+    :func:`iter_exists`.  See there for the arguments.
+
+    Yields:
+        (keyp, stat) tuples in completion order, where `stat` is an
+        `os.stat_result` or `None` if the path can not be stat'ed
+    """
+
+    batches = _map_batches(
+        _stats, _with_paths(project, view, recursive),
+        batch_size=batch_size, max_concurrency=max_concurrency,
+        executor=executor
+        )
+    async for batch, stats in batches:
+        for (keyp, c, _), stat in zip(batch, stats):
+            exists = (stat is not None) and S_ISREG(stat.st_mode)
+            _set_exists(project, keyp, c, exists)
+            yield keyp, stat
+
+
+async def load(file, *, cls=indirect.Project, executor=None, **kwargs):
+    """Load a project from a file
+
+    Args:
+        file: Path to the project file.
+
+    Keyword args:
+        cls: Project class to instantiate.
+        executor: Executor to load the file in.
+        **kwargs: Passed on to `cls`.
+
+    Returns:
+        The loaded project
+    """
+
+    return await _run(executor, cls, file=file, **kwargs)
+
+
+async def save(project, file, *, fmt=None, executor=None):
+    """Save a project to a file
+
+    See :meth:`indirect.Project.save`.
+
+    Keyword args:
+        executor: Executor to save the file in.
+    """
+
+    await _run(executor, project.save, file, fmt=fmt)
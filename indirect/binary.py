@@ -0,0 +1,452 @@
+"""Compact binary project format with lazy, memory-mapped loading
+
+Layout (little-endian)::
+
+    header    magic, version, table sizes and section offsets
+    strings   offset index (uint32, n_strings + 1) followed by the
+              utf-8 encoded string blob; every alias, path, filename,
+              etc. is stored once and referenced by index
+    nodes     NODE_FIELDS uint32 per abstraction in breadth-first
+              order, so that children and contents of a node are
+              contiguous ranges in their tables
+    contents  CONTENT_FIELDS uint32 per content
+    tags      uint32 string indices referenced by contents
+    signatures  (size, mtime_ns, inode) as uint64 per content
+    meta      JSON encoded sources, views and layouts
+
+On load, only the header and the meta section are read.  Abstractions
+are materialised from the memory-mapped tables the first time their
+children or contents are accessed.
+"""
+
+from array import array
+import json
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import threading
+from weakref import proxy
+
+from . import indirect
+
+
+MAGIC = b"INDIRECT"
+VERSION = 2
+SUFFIX = ".idb"
+
+NONE = 0xFFFFFFFF
+NONE64 = 0xFFFFFFFFFFFFFFFF
+
+HEADER = struct.Struct("<8sIIIII7Q")
+
+NODE_FIELDS = 7
+(N_PARENT, N_ALIAS, N_PATH, N_FIRST_CHILD, N_CHILDREN,
+ N_FIRST_CONTENT, N_CONTENTS) = range(NODE_FIELDS)
+
+CONTENT_FIELDS = 10
+(C_ALIAS, C_FILENAME, C_CPATH, C_SOURCE, C_DESC, C_KIND, C_HASH,
+ C_FLAGS, C_FIRST_TAG, C_TAGS) = range(CONTENT_FIELDS)
+
+SIGNATURE_FIELDS = 3
+
+FLAG_EXISTS_KNOWN = 1
+FLAG_EXISTS = 2
+FLAG_IGNORE_KEYP = 4
+
+_LITTLE = sys.byteorder == "little"
+
+
+def _uint32_array(iterable=()):
+    a = array("I", iterable)
+    assert a.itemsize == 4, "Platform has no 4 byte unsigned int type"
+    return a
+
+
+def _uint64_array(iterable=()):
+    a = array("Q", iterable)
+    assert a.itemsize == 8, "Platform has no 8 byte unsigned int type"
+    return a
+
+
+def _to_bytes(a):
+    if not _LITTLE:
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _uint_view(buffer, typecode):
+    if _LITTLE:
+        return buffer.cast(typecode)
+
+    a = array(typecode)
+    a.frombytes(buffer)
+    a.byteswap()
+    return a
+
+
+class _StringTable:
+    """Intern strings during writing"""
+
+    def __init__(self):
+        self._ids = {}
+        self.strings = []
+
+    def __call__(self, s):
+        if s is None:
+            return NONE
+
+        s = str(s)
+        try:
+            return self._ids[s]
+        except KeyError:
+            i = self._ids[s] = len(self.strings)
+            self.strings.append(s)
+            return i
+
+    def to_bytes(self):
+        offsets = _uint32_array([0])
+        blob = bytearray()
+        for s in self.strings:
+            blob += s.encode()
+            offsets.append(len(blob))
+        return _to_bytes(offsets), bytes(blob)
+
+
+def _content_flags(c):
+    flags = 0
+    if c.exists is not None:
+        flags |= FLAG_EXISTS_KNOWN
+        if c.exists:
+            flags |= FLAG_EXISTS
+    if c.ignore_keyp:
+        flags |= FLAG_IGNORE_KEYP
+    return flags
+
+
+def _encode(project, meta=True):
+    """Yield the chunks of the binary representation of a project"""
+
+    strings = _StringTable()
+    nodes = _uint32_array()
+    contents = _uint32_array()
+    tags = _uint32_array()
+    signatures = _uint64_array()
+
+    queue = [project.abstractions]
+    parents = [NONE]
+    i = 0
+    while i < len(queue):
+        a = queue[i]
+
+        children = list(a.next.values()) if a.next else []
+        nodes.extend((
+            parents[i], strings(a.alias), strings(a.path),
+            len(queue), len(children),
+            len(contents) // CONTENT_FIELDS,
+            len(a.content) if a.content else 0
+            ))
+        queue.extend(children)
+        parents.extend([i] * len(children))
+
+        if a.content:
+            for c in a.content.values():
+                contents.extend((
+                    strings(c.alias), strings(c.filename),
+                    strings(c._cpath), strings(c.source),
+                    strings(c.desc), strings(c.kind), strings(c.hash),
+                    _content_flags(c), len(tags), len(c.tags)
+                    ))
+                tags.extend(strings(t) for t in c.tags)
+                signatures.extend(
+                    c.signature if c.signature is not None
+                    else (NONE64,) * SIGNATURE_FIELDS
+                    )
+
+        i += 1
+
+    if meta:
+        meta = json.dumps(
+            {
+                "sources": project.sources,
+                "views": project._serialisable_views(),
+                "layouts": project.layouts,
+            },
+            cls=indirect.ProjectEncoder
+            ).encode()
+    else:
+        meta = b"{}"
+
+    string_offsets, string_blob = strings.to_bytes()
+    sections = [
+        string_offsets, string_blob,
+        _to_bytes(nodes), _to_bytes(contents), _to_bytes(tags),
+        _to_bytes(signatures), meta
+        ]
+
+    # Sections start at 8 byte boundaries for aligned access
+    offsets = []
+    padding = []
+    position = HEADER.size
+    for section in sections:
+        pad = -position % 8
+        padding.append(b"\0" * pad)
+        position += pad
+        offsets.append(position)
+        position += len(section)
+
+    header = HEADER.pack(
+        MAGIC, VERSION, len(strings.strings),
+        len(nodes) // NODE_FIELDS, len(contents) // CONTENT_FIELDS,
+        len(tags), *offsets
+        )
+
+    yield header
+    for pad, section in zip(padding, sections):
+        yield pad
+        yield section
+
+
+def dumps(project, *, meta=True):
+    """Binary representation of a project as bytes
+
+    Keyword args:
+        meta: Include sources, views and layouts.
+    """
+
+    return b"".join(_encode(project, meta=meta))
+
+
+def save(project, file):
+    """Write a project in binary format
+
+    The file is written next to its destination and moved in place, so
+    that a project lazily loaded from the same file stays intact.
+    """
+
+    file = pathlib.Path(os.path.expandvars(file))
+    tmp_file = file.with_name(f"{file.name}.tmp")
+    with open(tmp_file, "wb") as fp:
+        fp.writelines(_encode(project))
+    os.replace(tmp_file, file)
+
+
+def load(project, file):
+    """Open a binary project file
+
+    Sources, views and layouts are read into `project`.  Contents refer
+    to `project`, which should be a weak proxy.
+
+    Returns:
+        The root abstraction. Its subtree is materialised on access.
+    """
+
+    reader = Reader(file, project=project)
+
+    meta = json.loads(
+        bytes(reader.meta), object_hook=indirect.ProjectDecoder(project)
+        )
+    project.sources.update(meta["sources"])
+    project.views.update(meta["views"])
+    project.layouts.update(meta.get("layouts", {}))
+
+    return reader.node(0)
+
+
+class Reader:
+    """Lazy access to a memory-mapped binary project file
+
+    Args:
+        file: Path to the file. Ignored if `buffer` is given.
+        project: Project (proxy) assigned to contents.
+
+    Keyword args:
+        buffer: Object supporting the buffer protocol holding the
+            binary representation (see :func:`dumps`), read instead of
+            mapping `file`.
+    """
+
+    def __init__(self, file=None, project=None, *, buffer=None):
+        if buffer is None:
+            with open(os.path.expandvars(file), "rb") as fp:
+                buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = buffer
+
+        buffer = memoryview(buffer)
+        (magic, version, n_strings, n_nodes, n_contents, n_tags,
+         *offsets) = HEADER.unpack_from(buffer)
+
+        if magic != MAGIC:
+            raise ValueError(f"{file} is not a binary project file")
+        if version != VERSION:
+            raise ValueError(
+                f"Unsupported binary project file version {version}"
+                )
+
+        (o_string_offsets, o_strings, o_nodes,
+         o_contents, o_tags, o_signatures, o_meta) = offsets
+
+        def section(offset, size, typecode):
+            return _uint_view(buffer[offset:offset + size], typecode)
+
+        self._string_offsets = section(
+            o_string_offsets, 4 * (n_strings + 1), "I"
+            )
+        self._strings = buffer[o_strings:o_strings + self._string_offsets[-1]]
+        self._nodes = section(o_nodes, 4 * NODE_FIELDS * n_nodes, "I")
+        self._contents = section(
+            o_contents, 4 * CONTENT_FIELDS * n_contents, "I"
+            )
+        self._tags = section(o_tags, 4 * n_tags, "I")
+        self._signatures = section(
+            o_signatures, 8 * SIGNATURE_FIELDS * n_contents, "Q"
+            )
+        self.meta = buffer[o_meta:]
+
+        self._decoded = {}
+        self.project = project
+        self.n_nodes = n_nodes
+
+    def string(self, i):
+        if i == NONE:
+            return None
+
+        try:
+            return self._decoded[i]
+        except KeyError:
+            pass
+
+        start, end = self._string_offsets[i], self._string_offsets[i + 1]
+        s = self._decoded[i] = str(self._strings[start:end], "utf-8")
+        return s
+
+    def node(self, i, previous=None):
+        n = i * NODE_FIELDS
+        a = _MappedAbstraction.__new__(_MappedAbstraction)
+        _alias_slot.__set__(a, self.string(self._nodes[n + N_ALIAS]))
+        _path_slot.__set__(
+            a, pathlib.Path(self.string(self._nodes[n + N_PATH]))
+            )
+        _previous_slot.__set__(a, previous)
+        _next_slot.__set__(a, None)
+        _content_slot.__set__(a, None)
+        a._frozen = None
+        a._reader = self
+        a._index = i
+        return a
+
+    def keyp(self, i):
+        keyp = []
+        while i != 0:
+            n = i * NODE_FIELDS
+            keyp.append(self.string(self._nodes[n + N_ALIAS]))
+            i = self._nodes[n + N_PARENT]
+        return indirect.KeyPath(reversed(keyp))
+
+    def content(self, i, keyp):
+        c = self._contents[i * CONTENT_FIELDS:(i + 1) * CONTENT_FIELDS]
+        signature = tuple(
+            self._signatures[i * SIGNATURE_FIELDS:(i + 1) * SIGNATURE_FIELDS]
+            )
+        flags = c[C_FLAGS]
+        string = self.string
+        first_tag = c[C_FIRST_TAG]
+
+        return indirect.Content(
+            string(c[C_ALIAS]),
+            filename=string(c[C_FILENAME]),
+            cpath=string(c[C_CPATH]),
+            keyp=keyp,
+            source=string(c[C_SOURCE]),
+            exists=(
+                bool(flags & FLAG_EXISTS)
+                if flags & FLAG_EXISTS_KNOWN else None
+                ),
+            desc=string(c[C_DESC]),
+            kind=string(c[C_KIND]),
+            hash=string(c[C_HASH]),
+            signature=signature if signature[0] != NONE64 else None,
+            tags=[
+                string(t)
+                for t in self._tags[first_tag:first_tag + c[C_TAGS]]
+                ],
+            project=self.project,
+            ignore_keyp=bool(flags & FLAG_IGNORE_KEYP)
+            )
+
+    def materialise(self, a, i):
+        """Attach children and contents of node `i` to abstraction `a`"""
+
+        n = self._nodes[i * NODE_FIELDS:(i + 1) * NODE_FIELDS]
+
+        if n[N_CHILDREN]:
+            previous = proxy(a)
+            children = (
+                self.node(j, previous=previous)
+                for j in range(
+                    n[N_FIRST_CHILD], n[N_FIRST_CHILD] + n[N_CHILDREN]
+                    )
+                )
+            _next_slot.__set__(a, {a_.alias: a_ for a_ in children})
+
+        if n[N_CONTENTS]:
+            keyp = self.keyp(i)
+            contents = (
+                self.content(j, keyp)
+                for j in range(
+                    n[N_FIRST_CONTENT], n[N_FIRST_CONTENT] + n[N_CONTENTS]
+                    )
+                )
+            _content_slot.__set__(a, {c.alias: c for c in contents})
+
+
+_alias_slot = indirect.Abstraction.alias
+_path_slot = indirect.Abstraction.path
+_previous_slot = indirect.Abstraction.previous
+_next_slot = indirect.Abstraction.next
+_content_slot = indirect.Abstraction.content
+
+_materialise_lock = threading.RLock()
+
+
+class _MappedAbstraction(indirect.Abstraction):
+    """Abstraction backed by a node in a binary project file
+
+    Children and contents are read from the file on first access.
+    Concurrent readers wait for the first one to fill both slots.
+    """
+
+    __slots__ = ["_reader", "_index"]
+
+    def _materialise(self):
+        if self._reader is None:
+            return
+
+        with _materialise_lock:
+            reader = self._reader
+            if reader is not None:
+                reader.materialise(self, self._index)
+                # Cleared last, the slots are filled when it reads None
+                self._reader = None
+
+    @property
+    def next(self):
+        self._materialise()
+        return _next_slot.__get__(self)
+
+    @next.setter
+    def next(self, value):
+        self._materialise()
+        _next_slot.__set__(self, value)
+
+    @property
+    def content(self):
+        self._materialise()
+        return _content_slot.__get__(self)
+
+    @content.setter
+    def content(self, value):
+        self._materialise()
+        _content_slot.__set__(self, value)
@@ -0,0 +1,728 @@
+"""Columnar storage backend for projects
+
+A :obj:`ColumnarProject` mirrors its abstraction tree in parallel arrays
+(see :obj:`Columns`) built from the binary project format (see
+:mod:`indirect.binary`) instead of keeping a graph of Python objects.
+Abstractions and contents are materialised from the binary form when
+they are accessed through the usual :obj:`indirect.Project` API, so
+lookups and modifications work as for any project.  Modifications
+update the arrays in place.  Whole-tree operations work on the arrays
+directly: collecting the rows of subtrees and tree levels is vectorised
+with NumPy if it is installed, while path resolution walks the rows in
+Python without materialising abstractions.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import binary
+from . import indirect
+
+
+def _column(table, field, n_fields):
+    """Copy one field of a row-major table into an array"""
+
+    column = table[field::n_fields]
+    if isinstance(column, memoryview):
+        a = binary._uint32_array()
+        a.frombytes(column.tobytes())
+        return a
+    return binary._uint32_array(column)
+
+
+def _copy(column):
+    if np is not None:
+        return np.array(memoryview(column))
+    return column[:]
+
+
+def _ranges(starts, counts):
+    """Concatenate the index ranges [start, start + count)"""
+
+    if np is not None:
+        starts = np.asarray(starts, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return np.arange(offsets.size, dtype=np.int64) + offsets
+
+    return [j for s, c in zip(starts, counts) for j in range(s, s + c)]
+
+
+def _expand(level, first, counts, extras, alive):
+    """Rows in use below the rows of `level`
+
+    Args:
+        level: Abstraction rows.
+        first: First row of the range at compaction per abstraction.
+        counts: Length of the range at compaction per abstraction.
+        extras: Rows added since, by abstraction.
+        alive: Flag per row if it is in use.
+    """
+
+    n_base = len(counts)
+
+    if np is not None:
+        level = np.asarray(level, dtype=np.int64)
+        rows = np.empty(0, dtype=np.int64)
+        if n_base:
+            base = level[level < n_base]
+            rows = _ranges(
+                np.frombuffer(first, dtype=np.uint32)[base],
+                np.frombuffer(counts, dtype=np.uint32)[base]
+                )
+        if extras:
+            keys = np.fromiter(extras, dtype=np.int64, count=len(extras))
+            added = [
+                j for i in keys[np.isin(keys, level)].tolist()
+                for j in extras[i].values()
+                ]
+            rows = np.concatenate([rows, np.array(added, dtype=np.int64)])
+        if not len(alive):
+            return rows
+        return rows[np.frombuffer(alive, dtype=np.uint8)[rows] != 0]
+
+    rows = [
+        j for i in level if i < n_base
+        for j in range(first[i], first[i] + counts[i])
+        ]
+    if extras:
+        for i in level:
+            rows.extend(extras.get(i, {}).values())
+    return [j for j in rows if alive[j]]
+
+
+def _exported(name, doc):
+    return property(lambda self: _copy(getattr(self, f"_{name}")), doc=doc)
+
+
+class Columns:
+    """Parallel arrays mirroring an abstraction tree
+
+    Each abstraction and each content is a row.  Rows are numbered in
+    breadth-first order at compaction, starting with the root (0), so
+    that the children and the contents of an abstraction are contiguous
+    ranges.  Rows of nodes added later are appended and tracked per
+    parent, rows of removed nodes are kept but marked as not in use, so
+    that a modification costs time proportional to the size of the
+    modified subtree.  A replaced node takes over the row of its
+    predecessor.
+
+    String columns hold indices into the string table (see
+    :meth:`string`); `binary.NONE` marks a missing value.  Column
+    attributes return copies, as NumPy arrays if NumPy is available.
+
+    Args:
+        reader: :obj:`binary.Reader` of the compacted tree.
+
+    Attributes:
+        parent: Parent row per abstraction.
+        alias: Alias per abstraction.
+        path: Path per abstraction.
+        alive: 1 per abstraction in use, 0 per removed one.
+        content_parent: Owning abstraction per content.
+        content_alias: Alias per content.
+        content_filename: Filename per content.
+        content_cpath: Cpath per content.
+        content_source: Source per content.
+        content_flags: Flags per content (see `binary.FLAG_*`).
+        content_alive: 1 per content in use, 0 per removed one.
+    """
+
+    parent = _exported("parent", "Parent row per abstraction")
+    alias = _exported("alias", "Alias per abstraction")
+    path = _exported("path", "Path per abstraction")
+    alive = _exported("alive", "1 per abstraction in use")
+    content_parent = _exported("content_parent", "Owner per content")
+    content_alias = _exported("content_alias", "Alias per content")
+    content_filename = _exported("content_filename", "Filename per content")
+    content_cpath = _exported("content_cpath", "Cpath per content")
+    content_source = _exported("content_source", "Source per content")
+    content_flags = _exported("content_flags", "Flags per content")
+    content_alive = _exported("content_alive", "1 per content in use")
+
+    def __init__(self, reader):
+        nodes = reader._nodes
+        for name, field in [
+                ("parent", binary.N_PARENT),
+                ("alias", binary.N_ALIAS),
+                ("path", binary.N_PATH),
+                ("first_child", binary.N_FIRST_CHILD),
+                ("n_children", binary.N_CHILDREN),
+                ("first_content", binary.N_FIRST_CONTENT),
+                ("n_contents", binary.N_CONTENTS)]:
+            setattr(
+                self, f"_{name}", _column(nodes, field, binary.NODE_FIELDS)
+                )
+
+        contents = reader._contents
+        for name, field in [
+                ("content_alias", binary.C_ALIAS),
+                ("content_filename", binary.C_FILENAME),
+                ("content_cpath", binary.C_CPATH),
+                ("content_source", binary.C_SOURCE),
+                ("content_flags", binary.C_FLAGS)]:
+            setattr(
+                self, f"_{name}",
+                _column(contents, field, binary.CONTENT_FIELDS)
+                )
+
+        self._content_parent = binary._uint32_array()
+        for i, n in enumerate(self._n_contents):
+            self._content_parent.extend([i] * n)
+
+        self._alive = bytearray(b"\x01") * len(self._parent)
+        self._content_alive = (
+            bytearray(b"\x01") * len(self._content_alias)
+            )
+
+        # Rows added after compaction by parent row and alias
+        self._extra_children = {}
+        self._extra_contents = {}
+
+        self._strings = [
+            reader.string(i)
+            for i in range(len(reader._string_offsets) - 1)
+            ]
+        self._string_ids = {}
+        for i, s in enumerate(self._strings):
+            self._string_ids.setdefault(s, i)
+
+    @property
+    def n_nodes(self):
+        """Number of abstractions in use"""
+
+        return self._alive.count(1)
+
+    @property
+    def n_contents_total(self):
+        """Number of contents in use"""
+
+        return self._content_alive.count(1)
+
+    @property
+    def nbytes(self):
+        """Size of the arrays"""
+
+        return sum(
+            len(column) * column.itemsize for column in (
+                self._parent, self._alias, self._path, self._first_child,
+                self._n_children, self._first_content, self._n_contents,
+                self._content_parent, self._content_alias,
+                self._content_filename, self._content_cpath,
+                self._content_source, self._content_flags
+                )
+            ) + len(self._alive) + len(self._content_alive)
+
+    def string(self, i):
+        """Entry of the string table"""
+
+        if i == binary.NONE:
+            return None
+        return self._strings[i]
+
+    def string_id(self, s):
+        """Index of a string in the string table or `binary.NONE`"""
+
+        if s is None:
+            return binary.NONE
+        return self._string_ids.get(str(s), binary.NONE)
+
+    def _intern(self, s):
+        if s is None:
+            return binary.NONE
+
+        s = str(s)
+        try:
+            return self._string_ids[s]
+        except KeyError:
+            i = self._string_ids[s] = len(self._strings)
+            self._strings.append(s)
+            return i
+
+    def keyp(self, i):
+        """KeyPath of abstraction `i`"""
+
+        keyp = []
+        while i != 0:
+            keyp.append(self._strings[self._alias[i]])
+            i = self._parent[i]
+        return indirect.KeyPath(reversed(keyp))
+
+    def _find(self, i, alias, children=True, removed=False):
+        """Row of a child or content of abstraction `i` or `None`"""
+
+        if children:
+            extras, aliases, alive = (
+                self._extra_children, self._alias, self._alive
+                )
+            first, counts = self._first_child, self._n_children
+        else:
+            extras, aliases, alive = (
+                self._extra_contents, self._content_alias,
+                self._content_alive
+                )
+            first, counts = self._first_content, self._n_contents
+
+        j = extras.get(i, {}).get(alias)
+        if (j is not None) and (removed or alive[j]):
+            return j
+
+        if i >= len(counts):
+            return None
+
+        # array.index takes no bounds before Python 3.10, search a slice
+        start = first[i]
+        block = aliases[start:start + counts[i]]
+        while True:
+            try:
+                k = block.index(alias)
+            except ValueError:
+                return None
+            j = start + k
+            if removed or alive[j]:
+                return j
+            start = j + 1
+            block = block[k + 1:]
+
+    def index(self, keyp):
+        """Row of the abstraction at a KeyPath
+
+        Raises:
+            LookupError: If `keyp` does not lead to an abstraction.
+        """
+
+        if isinstance(keyp, str):
+            keyp = indirect.KeyPath.from_string(keyp)
+
+        i = 0
+        for key in keyp:
+            i = self._find(i, self.string_id(key))
+            if i is None:
+                raise LookupError("Invalid KeyPath")
+        return i
+
+    def content_index(self, keyp):
+        """Row of the content at a KeyPath
+
+        Raises:
+            LookupError: If `keyp` does not lead to a content.
+        """
+
+        if isinstance(keyp, str):
+            keyp = indirect.KeyPath.from_string(keyp)
+
+        j = None
+        if len(keyp):
+            j = self._find(
+                self.index(keyp[:-1]), self.string_id(keyp[-1]),
+                children=False
+                )
+        if j is None:
+            raise LookupError("Invalid KeyPath")
+        return j
+
+    @staticmethod
+    def _rows(i, first, counts, extras, alive):
+        rows = []
+        if i < len(counts):
+            start = first[i]
+            rows = [j for j in range(start, start + counts[i]) if alive[j]]
+
+        extras = extras.get(i)
+        if extras:
+            rows.extend(j for j in extras.values() if alive[j])
+        return rows
+
+    def children(self, i):
+        """Rows of the children of abstraction `i` in insertion order"""
+
+        return self._rows(
+            i, self._first_child, self._n_children, self._extra_children,
+            self._alive
+            )
+
+    def contents(self, i):
+        """Rows of the contents of abstraction `i` in insertion order"""
+
+        return self._rows(
+            i, self._first_content, self._n_contents,
+            self._extra_contents, self._content_alive
+            )
+
+    def levels(self, i=0):
+        """Yield abstraction rows of a subtree level by level
+
+        Args:
+            i: Root of the subtree.
+        """
+
+        level = _ranges([i], [1])
+        while len(level):
+            yield level
+            level = _expand(
+                level, self._first_child, self._n_children,
+                self._extra_children, self._alive
+                )
+
+    def subtree(self, i=0):
+        """Abstraction rows of a subtree in breadth-first order"""
+
+        levels = list(self.levels(i))
+        if np is not None:
+            return np.concatenate(levels)
+        return [j for level in levels for j in level]
+
+    def _set_content(self, row, parent, alias, c):
+        values = (
+            (self._content_parent, parent),
+            (self._content_alias, alias),
+            (self._content_filename, self._intern(c.filename)),
+            (self._content_cpath, self._intern(c._cpath)),
+            (self._content_source, self._intern(c.source)),
+            (self._content_flags, binary._content_flags(c))
+            )
+
+        if row is None:
+            row = len(self._content_alive)
+            for column, value in values:
+                column.append(value)
+            self._content_alive.append(1)
+
+            extras = self._extra_contents.setdefault(parent, {})
+            extras.pop(alias, None)
+            extras[alias] = row
+        else:
+            for column, value in values:
+                column[row] = value
+            self._content_alive[row] = 1
+
+        return row
+
+    def _set_node(self, row, parent, alias, a):
+        path = self._intern(a.path)
+
+        if row is None:
+            row = len(self._alive)
+            self._parent.append(parent)
+            self._alias.append(alias)
+            self._path.append(path)
+            self._alive.append(1)
+
+            extras = self._extra_children.setdefault(parent, {})
+            extras.pop(alias, None)
+            extras[alias] = row
+        else:
+            self._path[row] = path
+            self._alive[row] = 1
+
+            # Forget the children of the predecessor
+            if row < len(self._n_children):
+                self._n_children[row] = 0
+                self._n_contents[row] = 0
+            self._extra_children.pop(row, None)
+            self._extra_contents.pop(row, None)
+
+        return row
+
+    def attach(self, key, node, last=True):
+        """Add rows for a node attached at a key path
+
+        Args:
+            key: KeyPath of the node.
+            node: The :obj:`indirect.Abstraction` or
+                :obj:`indirect.Content`.
+            last: `False` if the node replaced a sibling in place, whose
+                row it takes over.
+        """
+
+        key = tuple(key)
+        parent = self.index(key[:-1])
+        alias = self._intern(key[-1])
+        is_content = isinstance(node, indirect.Content)
+
+        row = None
+        if not last:
+            row = self._find(
+                parent, alias, children=not is_content, removed=True
+                )
+
+        if is_content:
+            self._set_content(row, parent, alias, node)
+            return
+
+        rows = {key: self._set_node(row, parent, alias, node)}
+        walk = node.walk(key)
+        next(walk)
+        for key_, node_ in walk:
+            parent = rows[key_[:-1]]
+            alias = self._intern(key_[-1])
+            if isinstance(node_, indirect.Content):
+                self._set_content(None, parent, alias, node_)
+            else:
+                rows[key_] = self._set_node(None, parent, alias, node_)
+
+    def detach(self, key, node):
+        """Mark the rows of a node to be removed from a key path as unused
+
+        Args:
+            key: KeyPath of the node.
+            node: The :obj:`indirect.Abstraction` or
+                :obj:`indirect.Content`.
+        """
+
+        key = tuple(key)
+        try:
+            parent = self.index(key[:-1])
+        except LookupError:
+            return
+        alias = self.string_id(key[-1])
+
+        if isinstance(node, indirect.Content):
+            row = self._find(parent, alias, children=False)
+            if row is not None:
+                self._content_alive[row] = 0
+            return
+
+        row = self._find(parent, alias)
+        if row is None:
+            return
+
+        for level in self.levels(row):
+            for i in list(level):
+                for j in self.contents(i):
+                    self._content_alive[j] = 0
+                self._alive[i] = 0
+
+    def refresh(self, key, node):
+        """Update the rows of a node modified in place
+
+        Only materialised parts of a subtree are visited, unloaded parts
+        can not have been modified.  Changed aliases are not picked up.
+
+        Args:
+            key: KeyPath of the node.
+            node: The :obj:`indirect.Abstraction` or
+                :obj:`indirect.Content`.
+        """
+
+        key = tuple(key)
+        if not key:
+            return
+        try:
+            parent = self.index(key[:-1])
+        except LookupError:
+            return
+        alias = self.string_id(key[-1])
+
+        if isinstance(node, indirect.Content):
+            row = self._find(parent, alias, children=False)
+            if row is not None:
+                self._set_content(row, parent, alias, node)
+            return
+
+        row = self._find(parent, alias)
+        if row is None:
+            return
+
+        self._path[row] = self._intern(node.path)
+        stack = [(row, node)]
+        while stack:
+            i, a = stack.pop()
+            if getattr(a, "_reader", None) is not None:
+                continue
+
+            for alias, c in (binary._content_slot.__get__(a) or {}).items():
+                j = self._find(i, self.string_id(alias), children=False)
+                if j is not None:
+                    self._set_content(j, i, self._content_alias[j], c)
+
+            for alias, a_ in (binary._next_slot.__get__(a) or {}).items():
+                j = self._find(i, self.string_id(alias))
+                if j is not None:
+                    self._path[j] = self._intern(a_.path)
+                    stack.append((j, a_))
+
+
+class ColumnarProject(indirect.Project):
+    """Project mirroring its abstraction tree in parallel arrays
+
+    The tree is compacted when the project is loaded and when
+    :attr:`columns` are first requested.  Compaction releases the Python
+    objects of the tree; abstractions and contents are recreated from
+    the binary form on access.  Modifications through the `Project` API
+    update the columns in place, and :meth:`resolve_paths` reads them
+    instead of the tree.  Call :meth:`invalidate` with the KeyPath
+    after modifying abstractions or contents in place; without a
+    KeyPath, the columns are rebuilt on next access.  After many
+    modifications, :meth:`compact` makes the arrays contiguous again.
+    """
+
+    def __init__(self, alias=None, /, *, file=None, threadsafe=False):
+        self._columns = None
+        super().__init__(alias, file=file, threadsafe=threadsafe)
+
+    @property
+    def columns(self):
+        """:obj:`Columns` of the current tree"""
+
+        if self._columns is None:
+            self.compact()
+        return self._columns
+
+    @indirect._writes
+    def compact(self):
+        """Move the tree into parallel arrays"""
+
+        reader = binary.Reader(
+            buffer=binary.dumps(self, meta=False), project=self._proxy
+            )
+        self.abstractions = reader.node(0)
+        self._reset_indexes()
+        self._columns = Columns(reader)
+
+    def load(self, *args, **kwargs):
+        super().load(*args, **kwargs)
+
+        reader = getattr(self.abstractions, "_reader", None)
+        if reader is not None:
+            # Binary files are already in columnar form
+            self._columns = Columns(reader)
+        else:
+            self.compact()
+
+    @indirect._writes
+    def invalidate(self, keyp=None):
+        if keyp is None:
+            self._columns = None
+        elif self._columns is not None:
+            if isinstance(keyp, str):
+                keyp = indirect.KeyPath.from_string(keyp)
+            try:
+                node = self.decent_keyp(keyp)
+            except LookupError:
+                pass
+            else:
+                self._columns.refresh(keyp, node)
+
+        super().invalidate(keyp)
+
+    @indirect._writes
+    def refresh_env(self):
+        # Columns hold unexpanded strings and stay valid
+        columns = self._columns
+        changed = super().refresh_env()
+        self._columns = columns
+        return changed
+
+    def _attach(self, key, node):
+        super()._attach(key, node)
+
+        if self._columns is not None:
+            parent = self.decent_keyp(key[:-1])
+            if isinstance(node, indirect.Content):
+                siblings = parent.content
+            else:
+                siblings = parent.next
+            self._columns.attach(
+                key, node, last=next(reversed(siblings)) == key[-1]
+                )
+
+    def _detach(self, key, node):
+        if self._columns is not None:
+            self._columns.detach(key, node)
+
+        super()._detach(key, node)
+
+    def _modified(self, key, content):
+        super()._modified(key, content)
+
+        if self._columns is not None:
+            self._columns.refresh(key, content)
+
+    def resolve_paths(
+            self, view=None, *, recursive=True, as_array=False,
+            with_keys=False):
+        """Resolve the file system paths of all contents under a view
+
+        Same as :meth:`indirect.Project.resolve_paths`, but reads the
+        columns, so that no abstraction below the view is materialised.
+        """
+
+        columns = self.columns
+        with self.reading():
+            return self._resolve_columns(
+                columns, view, recursive, as_array, with_keys
+                )
+
+    def _resolve_columns(self, columns, view, recursive, as_array,
+                         with_keys):
+        keys = [] if with_keys else None
+        paths = []
+        joiner = indirect._PathJoiner(self.sources)
+        string = columns.string
+        path = columns._path
+        alias = columns._alias
+        c_alias = columns._content_alias
+        c_filename = columns._content_filename
+        c_cpath = columns._content_cpath
+        c_source = columns._content_source
+        c_flags = columns._content_flags
+
+        def collect(keyp, rows, keyp_eval):
+            prefixes = {}
+            for j in rows:
+                source = c_source[j]
+                ignore_keyp = bool(c_flags[j] & binary.FLAG_IGNORE_KEYP)
+                try:
+                    prefix = prefixes[source, ignore_keyp]
+                except KeyError:
+                    prefix = prefixes[source, ignore_keyp] = joiner.prefix(
+                        string(source), ignore_keyp, keyp_eval
+                        )
+
+                paths.append(joiner.join(prefix, joiner.tail(
+                    string(c_cpath[j]), string(c_filename[j])
+                    )))
+
+                if keys is not None:
+                    keys.append((*keyp, string(c_alias[j])))
+
+        for keyp in self.check_view(view):
+            if isinstance(keyp, str):
+                keyp = indirect.KeyPath.from_string(keyp)
+            keyp = tuple(keyp)
+
+            # Abstractions take precedence, as in decent_keyp
+            try:
+                i = columns.index(keyp)
+            except LookupError:
+                collect(
+                    keyp[:-1], [columns.content_index(keyp)],
+                    str(self.eval_keyp(keyp[:-1]))
+                    )
+                continue
+
+            stack = [(keyp, i, str(self.eval_keyp(keyp)))]
+            while stack:
+                keyp, i, keyp_eval = stack.pop()
+                collect(keyp, columns.contents(i), keyp_eval)
+
+                if not recursive:
+                    continue
+
+                for j in reversed(columns.children(i)):
+                    stack.append((
+                        (*keyp, string(alias[j])), j,
+                        joiner.child(keyp_eval, string(path[j]))
+                        ))
+
+        if as_array:
+            import numpy as np
+
+            paths = np.array(paths, dtype=str)
+
+        if with_keys:
+            return keys, paths
+        return paths
@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+import fnmatch
+from itertools import chain
 import os
 import pathlib
 import re
-from typing import Container, Iterator, Optional, Union
+import threading
+from typing import Container, Iterator, List, Optional, Sequence, Tuple, Union
 
 from . import indirect
 
@@ -21,22 +25,27 @@ def get_dirs(
             match this regular expression.
         suffix: Directory names must end with this suffix.
         exclude: List of directory names to ignore.
+
+    Yields:
+        Matching names, sorted
     """
 
     if exclude is None:
         exclude = set()
 
-    pattern = f"{prefix}{regex}{suffix}"
-    path_to_search = pathlib.Path(path)
+    pattern = re.compile(f"{prefix}{regex}{suffix}")
 
-    for match in path_to_search.iterdir():
-        if not match.is_dir():
-            continue
+    with os.scandir(path or ".") as entries:
+        stems = sorted(
+            os.path.splitext(entry.name)[0] for entry in entries
+            if entry.is_dir()
+            )
 
-        if not re.search(pattern, match.stem):
+    for stem in stems:
+        if not pattern.search(stem):
             continue
 
-        a = match.stem.lstrip(prefix).rstrip(suffix)
+        a = stem.lstrip(prefix).rstrip(suffix)
 
         if a in exclude:
             continue
@@ -44,8 +53,172 @@ def get_dirs(
         yield a
 
 
-def list_content_paths(project, view):
-    view = project.check_view(view)
+class DirJournal:
+    """Directory listings with modification times for incremental scans
+
+    A directory is only listed again if its modification time changed
+    since it was last listed.  Directories may be listed from several
+    threads (see :func:`scan_dirs`).
+
+    Args:
+        entries: Mapping of directory paths relative to the scan root
+            ("" for the root itself, "/" separated) to
+            [mtime_ns, subdirectory names, file names] lists.
+
+    Attributes:
+        visited: Relative paths stat'ed since the last :meth:`reset`.
+        changed: Relative paths listed since the last :meth:`reset`.
+        n_stat: Number of stat calls since the last :meth:`reset`.
+        n_listed: Number of directory listings since the last
+            :meth:`reset`.
+    """
+
+    def __init__(self, entries=None):
+        if entries is None:
+            entries = {}
+        self.entries = entries
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.visited = set()
+        self.changed = set()
+        self.n_stat = 0
+        self.n_listed = 0
+
+    def listdir(self, root, rel=""):
+        """Return sorted subdirectory and file names of a directory"""
+
+        path = os.path.join(root, rel) if rel else os.fspath(root)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            self.n_stat += 1
+            self.visited.add(rel)
+            entry = self.entries.get(rel)
+        if (entry is not None) and (entry[0] == mtime):
+            return entry[1], entry[2]
+
+        dirs = []
+        files = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    dirs.append(entry.name)
+                else:
+                    files.append(entry.name)
+        dirs.sort()
+        files.sort()
+
+        with self._lock:
+            self.entries[rel] = [mtime, dirs, files]
+            self.changed.add(rel)
+            self.n_listed += 1
+
+        return dirs, files
+
+    def prune(self):
+        """Forget directories that were not visited since the last reset"""
+
+        for rel in self.entries.keys() - self.visited:
+            del self.entries[rel]
+
+
+def scan_dirs(
+        path: Union[str, pathlib.Path],
+        template: Union[str, Sequence[Union[str, re.Pattern]]], *,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        journal: Optional[DirJournal] = None) -> List[Tuple[str, ...]]:
+    """Find directories matching a multi-level template in one traversal
+
+    Directory entries are classified with `os.scandir` so that no
+    extra stat call is needed per entry (except for symbolic links).
+
+    Args:
+        path: Look for directories under this location.
+        template: Either a string of glob patterns separated by "/",
+            e.g. "exp_*/replica_*", with one pattern per directory
+            level, or a sequence of levels where each level is a glob
+            pattern string or a compiled regular expression (searched
+            in the directory name).
+
+    Keyword args:
+        parallel: Scan the subtrees below the first level concurrently
+            in a thread pool.
+        max_workers: Maximum number of threads if `parallel` is `True`.
+        journal: If given, directories are listed through this
+            :obj:`DirJournal` and only re-read when their modification
+            time changed.
+
+    Returns:
+        Sorted list of tuples with the matched directory name for each
+        level, e.g. `[("exp_1", "replica_1"), ("exp_1", "replica_2")]`.
+        Joined with "/", each tuple is a path fragment that can be used
+        for :meth:`indirect.Project.add_abstraction`.
+    """
+
+    levels = compile_template(template)
+    path = os.fspath(path) or "."
+
+    if not parallel or len(levels) == 1:
+        return list(_scan(path, levels, journal=journal))
+
+    first = list(_scan(path, levels[:1], journal=journal))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        subtrees = executor.map(
+            lambda match: list(_scan(
+                path, levels[1:], prefix=match, journal=journal
+                )),
+            first
+            )
+        return list(chain.from_iterable(subtrees))
+
+
+def compile_template(template):
+    """Turn a directory template into a list of name matchers
+
+    See :func:`scan_dirs` for the template format.
+    """
+
+    if isinstance(template, str):
+        template = template.strip("/").split("/")
+
+    levels = []
+    for level in template:
+        if isinstance(level, re.Pattern):
+            levels.append(level.search)
+        else:
+            levels.append(re.compile(fnmatch.translate(level)).match)
+
+    return levels
+
+
+def _scan(root, levels, prefix=(), journal=None):
+    match, *levels = levels
+
+    if journal is None:
+        with os.scandir(os.path.join(root, *prefix)) as entries:
+            names = sorted(
+                entry.name for entry in entries
+                if entry.is_dir() and match(entry.name)
+                )
+    else:
+        dirs, _ = journal.listdir(root, "/".join(prefix))
+        names = [name for name in dirs if match(name)]
+
+    for name in names:
+        if levels:
+            yield from _scan(
+                root, levels, prefix=(*prefix, name), journal=journal
+                )
+        else:
+            yield (*prefix, name)
+
+
+def list_content_paths(project, view, *, max_workers=None):
+    # Iterated twice, patterns and lazy views are resolved once
+    view = indirect.View(project.check_view(view))
+    project.check_exists(view, recursive=False, max_workers=max_workers)
 
     print(f"{'key':<20}path (exists?)")
     print("=" * 100)
@@ -70,7 +243,7 @@ def list_content_paths(project, view):
 
                 print(
                     f"  .{alias:<18}{fullpath_} "
-                    f"({content.fullpath.is_file()})"
+                    f"({content.exists})"
                     )
             print()
 
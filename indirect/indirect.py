@@ -1,7 +1,19 @@
 from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import fnmatch
+import functools
+import hashlib
+import heapq
+from itertools import islice
 import json
-import os.path
+import os
 import pathlib
+import re
+from stat import S_IMODE, S_ISREG
+import sys
+import threading
+import time
 from typing import Any, Optional, Type, Union
 import warnings
 from weakref import proxy
@@ -15,16 +27,22 @@ class ProjectEncoder(json.JSONEncoder):
             serialisable = obj._sources
             return serialisable
 
+        if isinstance(obj, Views):
+            serialisable = obj._views
+            return serialisable
+
         if isinstance(obj, Content):
             serialisable = {
                 "alias": obj.alias,
                 "filename": obj.filename,
-                "cpath": f"{obj.cpath!s}",
+                "cpath": f"{obj._cpath!s}",
                 "keyp": obj.keyp,
                 "source": obj.source,
                 "exists": obj.exists,
                 "desc": obj.desc,
                 "kind": obj.kind,
+                "hash": obj.hash,
+                "signature": obj.signature,
                 "tags": obj.tags,
                 "ignore_keyp": obj.ignore_keyp,
                 "_type": "indirect.Content"
@@ -34,6 +52,9 @@ class ProjectEncoder(json.JSONEncoder):
         if isinstance(obj, pathlib.Path):
             return f"{obj!s}"
 
+        if isinstance(obj, LazyView):
+            return obj.to_dict()
+
         if isinstance(obj, Abstraction):
             serialisable = {
                 "alias": obj.alias,
@@ -61,7 +82,7 @@ class ProjectDecoder:
 
         if _type == "indirect.Content":
             decoded = Content(
-                alias=dct["alias"],
+                dct["alias"],
                 filename=dct["filename"],
                 cpath=dct["cpath"],
                 keyp=dct["keyp"],
@@ -69,17 +90,125 @@ class ProjectDecoder:
                 exists=dct["exists"],
                 desc=dct["desc"],
                 kind=dct["kind"],
+                hash=dct.get("hash"),
+                signature=dct.get("signature"),
                 tags=dct["tags"],
                 project=self._project,
-                ignore_keyp=dct["ingore_keyp"]
+                ignore_keyp=dct["ignore_keyp"]
                 )
             return decoded
 
+        if _type == "indirect.Abstraction":
+            decoded = Abstraction(dct["alias"], path=dct["path"])
+            return decoded
+
+        if _type == "indirect.LazyView":
+            decoded = LazyView.from_dict(dct)
+            return decoded
+
         return dct
 
 
+class _EnvCache:
+    """Cached :func:`os.path.expandvars`
+
+    Strings are classified once: strings without variables map to
+    themselves, others to their expansion.  The values of all variables
+    used in expansions are recorded, and :meth:`refresh` drops the
+    expansions depending on variables that changed since.
+    """
+
+    CACHE_SIZE = 1 << 20
+
+    _variable = re.compile(r"\$(\w+|\{[^}]*\})")
+
+    def __init__(self):
+        self._expanded = {}
+        self._watched = {}
+        self._dependents = {}
+        self.generation = 0
+
+    def __call__(self, s):
+        if type(s) is not str:
+            s = os.fspath(s)
+
+        try:
+            return self._expanded[s]
+        except KeyError:
+            pass
+
+        if len(self._expanded) >= self.CACHE_SIZE:
+            self.clear()
+
+        names = [
+            name.strip("{}") for name in self._variable.findall(s)
+            ]
+        for name in names:
+            self._watched.setdefault(name, os.environ.get(name))
+            self._dependents.setdefault(name, set()).add(s)
+
+        expanded = self._expanded[s] = (
+            os.path.expandvars(s) if names else s
+            )
+        return expanded
+
+    def clear(self):
+        self._expanded.clear()
+        self._watched.clear()
+        self._dependents.clear()
+        self.generation += 1
+
+    def refresh(self):
+        """Drop expansions of variables that changed
+
+        Returns:
+            Set of names of changed variables
+        """
+
+        changed = {
+            name for name, value in self._watched.items()
+            if os.environ.get(name) != value
+            }
+
+        for name in changed:
+            del self._watched[name]
+            for s in self._dependents.pop(name):
+                self._expanded.pop(s, None)
+
+        if changed:
+            self.generation += 1
+
+        return changed
+
+
+_expandvars = _EnvCache()
+
+
+_paths = {}
+
+
+def _as_path(path):
+    """Shared `pathlib.Path` per path string (paths are immutable)"""
+
+    try:
+        return _paths[path]
+    except KeyError:
+        pass
+    except TypeError:
+        return pathlib.Path(path)
+
+    if len(_paths) >= KeyPath.CACHE_SIZE:
+        _paths.clear()
+
+    p = _paths[path] = pathlib.Path(path)
+    return p
+
+
 class Abstraction:
-    __slots__ = ["alias", "path", "previous", "next", "content", '__weakref__']
+    __slots__ = [
+        "alias", "path", "previous", "next", "content", "_frozen",
+        '__weakref__'
+        ]
 
     def __init__(self, alias=None, /, *, path=None):
         if alias is None:
@@ -88,11 +217,12 @@ class Abstraction:
 
         if path is None:
             path = ""
-        self.path = pathlib.Path(path)
+        self.path = _as_path(path)
 
         self.previous = None
         self.next = None
         self.content = None
+        self._frozen = None
 
     def __str__(self):
         n_next = len(self.next) if self.next is not None else None
@@ -178,32 +308,281 @@ class Abstraction:
 
         return dct
 
+    @classmethod
+    def from_dict(cls, dct):
+        """Rebuild an abstraction tree from the output of :meth:`to_dict`"""
+
+        def make_a(alias, d, previous=None):
+            a = cls(alias, path=d.get("path"))
+            if previous is not None:
+                a.previous = proxy(previous)
+
+            content = d.get("content")
+            if content:
+                a.content = dict(content)
+
+            next_ = d.get("next")
+            if next_:
+                a.next = {
+                    alias_: make_a(alias_, d_, previous=a)
+                    for alias_, d_ in next_.items()
+                    }
+
+            return a
+
+        (alias, d), = dct.items()
+
+        return make_a(alias, d)
+
+    def walk(self, keyp=None):
+        """Iterate depth first over this abstraction and its children
+
+        Yields:
+            (keyp, node) tuples in pre-order. Contents of an abstraction
+            are yielded right after the abstraction itself. Key paths
+            are relative to this abstraction unless `keyp` is given.
+        """
+
+        if keyp is None:
+            keyp = ()
+        else:
+            keyp = tuple(keyp)
+
+        stack = [(keyp, self)]
+        while stack:
+            keyp, a = stack.pop()
+            yield keyp, a
+
+            if a.content is not None:
+                for alias, c in a.content.items():
+                    yield (*keyp, alias), c
+
+            if a.next is not None:
+                stack.extend(
+                    ((*keyp, alias), a_)
+                    for alias, a_ in reversed(a.next.items())
+                    )
+
     @property
     def fullpath(self):
         def retrace(a):
             if a.previous is not None:
                 yield from retrace(a.previous)
-            yield os.path.expandvars(a.path)
+            yield _expandvars(a.path)
 
         return pathlib.Path(*retrace(self))
 
 
-class KeyPath(list):
-    def __init__(self, iterable=(), /):
+class KeyPath(tuple):
+    """Immutable sequence of keys addressing a node in a project
+
+    KeyPaths are hashable and interned: creating a KeyPath equal to an
+    existing one returns the existing instance, so that, for example,
+    all contents of an abstraction share the same KeyPath object.
+    Parsed dotted strings and string forms are cached as well.  The
+    caches are cleared when they exceed `CACHE_SIZE` entries.
+
+    Args:
+        iterable: Keys (converted to `str`) or a dotted string.
+    """
+
+    __slots__ = ()
+
+    CACHE_SIZE = 1 << 20
+
+    _interned = {}
+    _parsed = {}
+    _strings = {}
+
+    def __new__(cls, iterable=(), /):
+        if type(iterable) is cls:
+            return iterable
+
         if isinstance(iterable, str):
-            super().__init__(self.from_string(iterable))
-        else:
-            super().__init__(str(k) for k in iterable)
+            return cls.from_string(iterable)
+
+        # Most keys are str already, look them up before converting
+        key = tuple(iterable)
+        interned = cls._interned
+        try:
+            return interned[key]
+        except (KeyError, TypeError):
+            pass
+
+        if {*map(type, key)} - {str}:
+            key = tuple(k if type(k) is str else str(k) for k in key)
+            try:
+                return interned[key]
+            except KeyError:
+                pass
+
+        if len(interned) >= cls.CACHE_SIZE:
+            interned.clear()
+
+        keyp = super().__new__(cls, map(sys.intern, key))
+        interned[keyp] = keyp
+        return keyp
 
     @classmethod
     def from_string(cls, s):
-        as_list = s.split(".")
-        if len(as_list) == 1 and as_list[0] == "":
-            as_list = []
-        return cls(as_list)
+        parsed = cls._parsed
+        try:
+            return parsed[s]
+        except KeyError:
+            pass
+
+        if len(parsed) >= cls.CACHE_SIZE:
+            parsed.clear()
+
+        keyp = parsed[s] = cls(s.split(".") if s else ())
+        return keyp
 
     def to_string(self):
-        return ".".join(self)
+        strings = self._strings
+        try:
+            return strings[self]
+        except KeyError:
+            pass
+
+        if len(strings) >= self.CACHE_SIZE:
+            strings.clear()
+
+        s = strings[self] = ".".join(self)
+        return s
+
+
+class KeyPathPattern:
+    """KeyPath with wildcards
+
+    Segments are separated by "." as for :obj:`KeyPath`. A segment can
+    be a literal key, a glob pattern (``*``, ``?``, ``[...]``), a brace
+    alternative (``{1,3}``, ``rep{1,2}*``) or ``**``, which matches any
+    number (including zero) of abstraction levels.
+
+    Patterns are resolved against a project with :meth:`Project.glob`
+    and can be passed wherever a view is accepted.
+
+    Args:
+        pattern: Pattern string, e.g. "a.*.report", "**.report" or
+            "b.{1,3}.*".
+    """
+
+    ANY_DEPTH = "**"
+
+    def __init__(self, pattern, /):
+        self.pattern = pattern
+
+        segments = []
+        for segment in pattern.split(".") if pattern else []:
+            if segment == self.ANY_DEPTH:
+                if segments and segments[-1] is self.ANY_DEPTH:
+                    continue
+                segments.append(self.ANY_DEPTH)
+                continue
+
+            alternatives = self._expand_braces(segment)
+            if not any(map(self.has_magic, alternatives)):
+                # Literal keys are looked up directly
+                segments.append(tuple(dict.fromkeys(alternatives)))
+            else:
+                segments.append(re.compile("|".join(
+                    fnmatch.translate(a) for a in alternatives
+                    )).match)
+
+        self.segments = segments
+
+    @staticmethod
+    def has_magic(s):
+        return re.search(r"[*?[{]", s) is not None
+
+    @classmethod
+    def _expand_braces(cls, segment):
+        match = re.search(r"{([^{}]*)}", segment)
+        if match is None:
+            return [segment]
+
+        head, tail = segment[:match.start()], segment[match.end():]
+        return [
+            expanded
+            for alternative in match.group(1).split(",")
+            for expanded in cls._expand_braces(f"{head}{alternative}{tail}")
+            ]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.pattern!r})"
+
+    def __str__(self):
+        return self.pattern
+
+    def __eq__(self, other):
+        if not isinstance(other, KeyPathPattern):
+            return NotImplemented
+        return self.pattern == other.pattern
+
+    def __hash__(self):
+        return hash(self.pattern)
+
+    def iter_matches(self, root, keyp=None):
+        """Yield key paths of nodes below root matching the pattern
+
+        Only the branches that can still match are visited. Children
+        of each visited node are snapshot, so the tree can be modified
+        while iterating.
+
+        Args:
+            root: Abstraction to start matching at.
+            keyp: Key path of root.
+        """
+
+        if keyp is None:
+            keyp = ()
+
+        seen = set() if self.segments.count(self.ANY_DEPTH) > 1 else None
+        for match in self._match(root, tuple(keyp), 0):
+            if seen is not None:
+                if match in seen:
+                    continue
+                seen.add(match)
+            yield KeyPath(match)
+
+    def _match(self, node, keyp, i):
+        if i == len(self.segments):
+            yield keyp
+            return
+
+        if isinstance(node, Content):
+            return
+
+        segment = self.segments[i]
+        last = i == len(self.segments) - 1
+
+        if segment is self.ANY_DEPTH:
+            children = tuple(node.next.items()) if node.next else ()
+            yield from self._match(node, keyp, i + 1)
+            for alias, a in children:
+                yield from self._match(a, (*keyp, alias), i)
+            return
+
+        if isinstance(segment, tuple):
+            for alias in segment:
+                child = None
+                if node.next is not None:
+                    child = node.next.get(alias)
+                if (child is None) and last and (node.content is not None):
+                    child = node.content.get(alias)
+                if child is not None:
+                    yield from self._match(child, (*keyp, alias), i + 1)
+            return
+
+        children = []
+        if node.next is not None:
+            children.extend(node.next.items())
+        if last and (node.content is not None):
+            children.extend(node.content.items())
+
+        for alias, child in children:
+            if segment(alias):
+                yield from self._match(child, (*keyp, alias), i + 1)
 
 
 class View(list):
@@ -218,19 +597,7 @@ class View(list):
 
     @classmethod
     def from_dict(cls, dct):
-
-        def decent(d, keyp=None):
-            if keyp is None:
-                keyp = []
-
-            for key in d:
-                keyp_ = keyp + [key]
-                if (d[key] is None) or (len(d[key]) == 0):
-                    yield keyp_
-                else:
-                    yield from decent(d[key], keyp=keyp_)
-
-        return cls(decent(dct))
+        return cls(_iter_dict_keyps(dct))
 
     def to_dict(self):
         dct = {}
@@ -244,10 +611,179 @@ class View(list):
         return dct
 
 
+def _iter_dict_keyps(dct):
+    """Yield KeyPaths to the leaves of a nested dict in O(depth) memory"""
+
+    keyp = []
+    stack = [iter(dct.items())]
+    while stack:
+        try:
+            key, d = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            if keyp:
+                keyp.pop()
+            continue
+
+        if (d is None) or (len(d) == 0):
+            yield KeyPath([*keyp, key])
+        else:
+            keyp.append(key)
+            stack.append(iter(d.items()))
+
+
+class LazyView:
+    """View producing its KeyPaths on demand
+
+    In contrast to :obj:`View`, no KeyPath is materialised before it is
+    needed, so iterating over a lazy view spanning millions of nodes
+    needs memory proportional to the tree depth only.  Lazy views are
+    accepted wherever a view is (see :meth:`Project.check_view`).
+
+    Args:
+        source: Nested dict (see :meth:`View.from_dict`),
+            :obj:`KeyPathPattern` or pattern string, or a callable
+            that receives the project and returns an iterable of
+            KeyPaths.
+    """
+
+    def __init__(self, source, /):
+        if isinstance(source, str):
+            source = KeyPathPattern(source)
+        self.source = source
+
+    @classmethod
+    def from_subtree(cls, keyp=None, *, contents=False):
+        """Lazy view of all abstractions in a subtree
+
+        Args:
+            keyp: Root of the subtree. If `None`, the project root.
+
+        Keyword args:
+            contents: Include contents.
+        """
+
+        if keyp is None:
+            keyp = []
+        elif isinstance(keyp, str):
+            keyp = KeyPath.from_string(keyp)
+        keyp = tuple(keyp)
+
+        def iter_subtree(project):
+            return _iter_subtree(
+                project.decent_keyp(keyp), keyp, contents=contents
+                )
+
+        view = cls(iter_subtree)
+        view.subtree = (keyp, contents)
+
+        return view
+
+    @classmethod
+    def from_dict(cls, dct):
+        """Restore a lazy view serialised with :meth:`to_dict`"""
+
+        if "subtree" in dct:
+            return cls.from_subtree(
+                dct["subtree"], contents=dct.get("contents", False)
+                )
+
+        if "pattern" in dct:
+            return cls(dct["pattern"])
+
+        return cls(dct["spec"])
+
+    def to_dict(self):
+        """Serialisable description of this view
+
+        Raises:
+            TypeError: If the view is backed by an arbitrary callable.
+        """
+
+        if isinstance(self.source, dict):
+            spec = {"spec": self.source}
+        elif isinstance(self.source, KeyPathPattern):
+            spec = {"pattern": self.source.pattern}
+        elif hasattr(self, "subtree"):
+            keyp, contents = self.subtree
+            spec = {"subtree": list(keyp), "contents": contents}
+        else:
+            raise TypeError(
+                f"Lazy view over {self.source!r} is not serialisable"
+                )
+
+        spec["_type"] = "indirect.LazyView"
+        return spec
+
+    def resolve(self, project):
+        """Iterate over the KeyPaths of this view in a project"""
+
+        if isinstance(self.source, dict):
+            return _iter_dict_keyps(self.source)
+
+        if isinstance(self.source, KeyPathPattern):
+            return project.glob(self.source)
+
+        return iter(self.source(project))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.source!r})"
+
+
+def _iter_subtree(node, keyp, contents=False):
+    """Yield KeyPaths of a subtree in pre-order
+
+    Children of a node are snapshot before the node is yielded, so
+    nodes added below a yielded node are not visited and nodes removed
+    meanwhile are skipped.
+    """
+
+    stack = [iter([(keyp[-1] if keyp else None, node)])]
+    parents = [None]
+    keyp = list(keyp[:-1])
+
+    while stack:
+        try:
+            alias, node = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            parents.pop()
+            if keyp and stack:
+                keyp.pop()
+            continue
+
+        parent = parents[-1]
+        if parent is not None:
+            siblings = (
+                parent.content if isinstance(node, Content) else parent.next
+                )
+            if (siblings is None) or (siblings.get(alias) is not node):
+                continue
+
+        current = [*keyp, alias] if alias is not None else keyp
+        if isinstance(node, Content):
+            yield KeyPath(current)
+            continue
+
+        children = []
+        if contents and node.content:
+            children.extend(node.content.items())
+        if node.next:
+            children.extend(node.next.items())
+
+        yield KeyPath(current)
+
+        if alias is not None:
+            keyp.append(alias)
+        stack.append(iter(children))
+        parents.append(node)
+
+
 class Sources(MutableMapping):
 
-    def __init__(self) -> None:
+    def __init__(self, project=None) -> None:
         self._sources = {}
+        self._project = project
 
     def __getitem__(self, key: str):
         try:
@@ -260,10 +796,25 @@ class Sources(MutableMapping):
     def __setitem__(self, key: str, value: Union[str, pathlib.Path]) -> None:
         if isinstance(value, str):
             value = pathlib.Path(value)
-        self._sources[key] = value
+
+        if self._project is None:
+            self._sources[key] = value
+            return
+
+        with self._project.writing():
+            self._sources[key] = value
+            self._project._invalidate_source(key)
+            self._project._assigned("source", key, value)
 
     def __delitem__(self, key: str) -> None:
-        del self._sources[key]
+        if self._project is None:
+            del self._sources[key]
+            return
+
+        with self._project.writing():
+            del self._sources[key]
+            self._project._invalidate_source(key)
+            self._project._assigned("source", key, None)
 
     def __iter__(self):
         return iter(self._sources)
@@ -277,17 +828,33 @@ class Sources(MutableMapping):
 
 class Views(MutableMapping):
 
-    def __init__(self):
+    def __init__(self, project=None):
         self._views = {}
+        self._project = project
 
     def __getitem__(self, key: str) -> Type["View"]:
         return self._views[key]
 
     def __setitem__(self, key: str, value: Any):
-        self._views[key] = View(value)
+        if not isinstance(value, LazyView):
+            value = View(value)
+
+        if self._project is None:
+            self._views[key] = value
+            return
+
+        with self._project.writing():
+            self._views[key] = value
+            self._project._assigned("view", key, value)
 
     def __delitem__(self, key: str):
-        del self._views[key]
+        if self._project is None:
+            del self._views[key]
+            return
+
+        with self._project.writing():
+            del self._views[key]
+            self._project._assigned("view", key, None)
 
     def __iter__(self):
         return iter(self._views)
@@ -299,71 +866,1118 @@ class Views(MutableMapping):
         return f"{type(self).__name__}({self._views})"
 
 
-class Project:
-    def __init__(self, alias=None, /, *, file=None):
-        self.abstractions = Abstraction("root")
-        self.views = Views()
-        self.sources = Sources()
-
-        if file is None:
-            self.file = file
-        else:
-            self.load(file)
+def _has_magic(pattern):
+    return re.search(r"[*?[]", pattern) is not None
 
-        self.alias = alias
 
-    @property
-    def a(self):
-        return self.abstractions
+class SyncReport:
+    """Outcome of a layout synchronisation
 
-    @property
-    def v(self):
-        return self.views
+    Args:
+        added: Key paths of added abstractions.
+        removed: Key paths of removed abstractions.
+        n_stat: Number of directories stat'ed.
+        n_listed: Number of directories listed.
+        elapsed: Wall time of the synchronisation in seconds.
+    """
 
-    @property
-    def s(self):
-        return self.sources
+    def __init__(
+            self, added=None, removed=None, n_stat=0, n_listed=0,
+            elapsed=0.):
+        if added is None:
+            added = []
+        self.added = added
 
-    def load(self, file, reinit=False):
-        """Load project from file"""
-        if reinit:
-            self.__init__()
+        if removed is None:
+            removed = []
+        self.removed = removed
 
-        file = pathlib.Path(file)
+        self.n_stat = n_stat
+        self.n_listed = n_listed
+        self.elapsed = elapsed
 
-        with open(os.path.expandvars(file)) as file_:
-            details = json.load(file_, object_hook=ProjectDecoder())
-            # self.abstractions.update(details["abstractions"])
-            self.sources.update(details["sources"])
-            self.views.update(details["views"])
+    def __repr__(self):
+        obj_repr = (
+            f"{type(self).__name__}("
+            f"added={self.added!r}, "
+            f"removed={self.removed!r}, "
+            f"n_stat={self.n_stat!r}, "
+            f"n_listed={self.n_listed!r}, "
+            f"elapsed={self.elapsed!r})"
+            )
+        return obj_repr
 
-        self.file = file
-        self.sources["home"] = self.file.parent
+    def __str__(self):
+        str_repr = (
+            f"{type(self).__name__}\n"
+            f"    added:    {len(self.added)!r}\n"
+            f"    removed:  {len(self.removed)!r}\n"
+            f"    stat:     {self.n_stat!r}\n"
+            f"    listed:   {self.n_listed!r}\n"
+            f"    elapsed:  {self.elapsed:.3f} s"
+            )
+        return str_repr
 
-    def save(self, file):
-        file = pathlib.Path(file)
 
-        save_obj = {
-            "sources": self.sources,
-            "views": self.views,
-            "abstractions": self.abstractions.to_dict()
-        }
+class ExistenceReport:
+    """Outcome of an existence check over many contents
 
-        with open(os.path.expandvars(file), "w") as fp:
-            json.dump(save_obj, fp, indent=4, cls=ProjectEncoder)
+    Args:
+        n_checked: Number of contents checked.
+        n_existing: Number of contents found as files.
+        elapsed: Wall time of the check in seconds.
+        slowest: List of (duration, keyp, path) tuples for the slowest
+            checks, slowest first.
+    """
 
-        self.file = file
-        self.sources["home"] = self.file.parent
+    def __init__(self, n_checked=0, n_existing=0, elapsed=0., slowest=None):
+        self.n_checked = n_checked
+        self.n_existing = n_existing
+        self.elapsed = elapsed
 
-    def add_abstraction(self, alias, *, path=None, view=None):
-        """Add abstraction to abstractions
+        if slowest is None:
+            slowest = []
+        self.slowest = slowest
 
-        Args:
-            alias: Short identifier for the new abstraction.
+    @property
+    def throughput(self):
+        """Checked contents per second"""
+        if self.elapsed == 0:
+            return 0.
+        return self.n_checked / self.elapsed
 
-        Keyword args:
-            path: Actual path fragment represented by this abstraction.
-                If `None`, will use ``alias``.
+    def __repr__(self):
+        obj_repr = (
+            f"{type(self).__name__}("
+            f"n_checked={self.n_checked!r}, "
+            f"n_existing={self.n_existing!r}, "
+            f"elapsed={self.elapsed!r}, "
+            f"slowest={self.slowest!r})"
+            )
+        return obj_repr
+
+    def __str__(self):
+        slowest = "".join(
+            f"\n        {duration * 1000:.2f} ms  {path!s}"
+            for duration, _, path in self.slowest
+            )
+        str_repr = (
+            f"{type(self).__name__}\n"
+            f"    checked:     {self.n_checked!r}\n"
+            f"    existing:    {self.n_existing!r}\n"
+            f"    elapsed:     {self.elapsed:.3f} s\n"
+            f"    throughput:  {self.throughput:.1f} /s\n"
+            f"    slowest:{slowest}"
+            )
+        return str_repr
+
+
+class HashReport:
+    """Outcome of a hash update over many contents
+
+    Args:
+        changed: Key paths of contents with a new hash.
+        unchanged: Number of contents skipped because their file
+            signature did not change.
+        missing: Key paths of contents whose file was not found or
+            could not be read.
+        elapsed: Wall time of the update in seconds.
+    """
+
+    def __init__(self, changed=None, unchanged=0, missing=None, elapsed=0.):
+        if changed is None:
+            changed = []
+        self.changed = changed
+
+        self.unchanged = unchanged
+
+        if missing is None:
+            missing = []
+        self.missing = missing
+
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        obj_repr = (
+            f"{type(self).__name__}("
+            f"changed={self.changed!r}, "
+            f"unchanged={self.unchanged!r}, "
+            f"missing={self.missing!r}, "
+            f"elapsed={self.elapsed!r})"
+            )
+        return obj_repr
+
+    def __str__(self):
+        str_repr = (
+            f"{type(self).__name__}\n"
+            f"    changed:    {len(self.changed)!r}\n"
+            f"    unchanged:  {self.unchanged!r}\n"
+            f"    missing:    {len(self.missing)!r}\n"
+            f"    elapsed:    {self.elapsed:.3f} s"
+            )
+        return str_repr
+
+
+class FileMetadata:
+    """Size, modification time and mode of a file
+
+    Args:
+        size: Size in bytes.
+        mtime_ns: Modification time in nanoseconds since the epoch.
+        mode: File type and permission bits (`st_mode`).
+    """
+
+    __slots__ = ("size", "mtime_ns", "mode")
+
+    def __init__(self, size, mtime_ns, mode):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.mode = mode
+
+    @classmethod
+    def from_stat(cls, stat):
+        """Create from an `os.stat_result`"""
+        return cls(stat.st_size, stat.st_mtime_ns, stat.st_mode)
+
+    @property
+    def mtime(self):
+        """Modification time in seconds since the epoch"""
+        return self.mtime_ns / 1e9
+
+    @property
+    def permissions(self):
+        """Permission bits, e.g. `0o644`"""
+        return S_IMODE(self.mode)
+
+    @property
+    def is_file(self):
+        return S_ISREG(self.mode)
+
+    def __eq__(self, other):
+        if not isinstance(other, FileMetadata):
+            return NotImplemented
+        return (
+            (self.size, self.mtime_ns, self.mode)
+            == (other.size, other.mtime_ns, other.mode)
+            )
+
+    def __repr__(self):
+        obj_repr = (
+            f"{type(self).__name__}("
+            f"size={self.size!r}, "
+            f"mtime_ns={self.mtime_ns!r}, "
+            f"mode={self.mode:#o})"
+            )
+        return obj_repr
+
+
+class MetadataTable:
+    """File metadata by path, valid for a limited time
+
+    Entries map file system paths to :obj:`FileMetadata`, or to `None`
+    if the file was not found.  Entries older than `ttl` are treated as
+    absent and collected again by :meth:`Project.collect_metadata`.
+    Keying by path keeps entries valid when abstractions or contents
+    are modified, as long as their path does not change.
+
+    Args:
+        ttl: Time to live of entries in seconds. If `None`, entries
+            never expire.
+    """
+
+    def __init__(self, ttl=60.):
+        self.ttl = ttl
+        self._entries = {}
+
+    def _fresh(self, path, now=None):
+        entry = self._entries.get(os.fspath(path))
+        if entry is None:
+            return None
+
+        if self.ttl is not None:
+            if now is None:
+                now = time.monotonic()
+            if now - entry[0] > self.ttl:
+                return None
+
+        return entry
+
+    def __getitem__(self, path):
+        entry = self._fresh(path)
+        if entry is None:
+            raise KeyError(path)
+        return entry[1]
+
+    def get(self, path, default=None):
+        entry = self._fresh(path)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def __contains__(self, path):
+        return self._fresh(path) is not None
+
+    def __len__(self):
+        """Number of entries, expired ones included until :meth:`prune`"""
+        return len(self._entries)
+
+    def set(self, path, metadata, timestamp=None):
+        """Store metadata of a path
+
+        Args:
+            path: File system path.
+            metadata: :obj:`FileMetadata` or `None` for missing files.
+            timestamp: Time (`time.monotonic`) the metadata was
+                collected. If `None`, now.
+        """
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self._entries[os.fspath(path)] = (timestamp, metadata)
+
+    def invalidate(self, path=None):
+        """Drop the entry of a path, or all entries if `path` is `None`"""
+
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(os.fspath(path), None)
+
+    def prune(self):
+        """Drop expired entries"""
+
+        if self.ttl is None:
+            return
+
+        limit = time.monotonic() - self.ttl
+        self._entries = {
+            path: entry for path, entry in self._entries.items()
+            if entry[0] >= limit
+            }
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(ttl={self.ttl!r}) "
+            f"with {len(self)} entries"
+            )
+
+
+class MetadataReport:
+    """Outcome of a metadata collection over many contents
+
+    Args:
+        metadata: Mapping of content key paths to :obj:`FileMetadata`,
+            or `None` for missing files and paths that are no files.
+        n_cached: Number of contents served from the metadata table.
+        n_dirs: Number of directories with files stat'ed.
+        elapsed: Wall time of the collection in seconds.
+    """
+
+    def __init__(self, metadata=None, n_cached=0, n_dirs=0, elapsed=0.):
+        if metadata is None:
+            metadata = {}
+        self.metadata = metadata
+
+        self.n_cached = n_cached
+        self.n_dirs = n_dirs
+        self.elapsed = elapsed
+
+    @property
+    def total_size(self):
+        """Summed size of all found files in bytes"""
+        return sum(m.size for m in self.metadata.values() if m is not None)
+
+    def __repr__(self):
+        obj_repr = (
+            f"{type(self).__name__}("
+            f"metadata={self.metadata!r}, "
+            f"n_cached={self.n_cached!r}, "
+            f"n_dirs={self.n_dirs!r}, "
+            f"elapsed={self.elapsed!r})"
+            )
+        return obj_repr
+
+    def __str__(self):
+        n_missing = sum(m is None for m in self.metadata.values())
+        str_repr = (
+            f"{type(self).__name__}\n"
+            f"    contents:   {len(self.metadata)!r}\n"
+            f"    missing:    {n_missing!r}\n"
+            f"    size:       {self.total_size!r} B\n"
+            f"    cached:     {self.n_cached!r}\n"
+            f"    dirs:       {self.n_dirs!r}\n"
+            f"    elapsed:    {self.elapsed:.3f} s"
+            )
+        return str_repr
+
+
+_hash_buffers = threading.local()
+
+
+def _hash_file(path, signature, algorithm, chunk_size):
+    """Hash a file unless its signature is unchanged
+
+    Runs in a worker. The file is read in chunks into a buffer that is
+    reused across calls in the same worker thread.
+
+    Returns:
+        (signature, digest) tuple. The digest is `None` if the signature
+        is unchanged, and both are `None` if the file is missing or
+        cannot be read.
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+
+    new_signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    if new_signature == signature:
+        return signature, None
+
+    buffer = getattr(_hash_buffers, "buffer", None)
+    if (buffer is None) or (len(buffer) != chunk_size):
+        buffer = _hash_buffers.buffer = memoryview(bytearray(chunk_size))
+
+    h = hashlib.new(algorithm)
+    try:
+        with open(path, "rb", buffering=0) as fp:
+            while True:
+                n = fp.readinto(buffer)
+                if not n:
+                    break
+                h.update(buffer[:n])
+    except OSError:
+        return None, None
+
+    return new_signature, h.hexdigest()
+
+
+def _timed_isfile(path):
+    start = time.perf_counter()
+    exists = os.path.isfile(path)
+    return exists, time.perf_counter() - start
+
+
+def _stat_dir(directory, names):
+    """Stat the requested files of one directory
+
+    Runs in a worker, one `os.stat` per file.
+
+    Returns:
+        List of :obj:`FileMetadata` (or `None` if no file) in the order
+        of `names`
+    """
+
+    found = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(directory, name))
+        except (FileNotFoundError, NotADirectoryError):
+            found.append(None)
+            continue
+
+        found.append(
+            FileMetadata.from_stat(st) if S_ISREG(st.st_mode) else None
+            )
+
+    return found
+
+
+class _PathIndex:
+    """Trie of path components mapping file system paths to key paths"""
+
+    _KEYP = None  # Reserved trie key, components are always str
+
+    def __init__(self):
+        self._root = {}
+
+    @staticmethod
+    def _split(path):
+        return os.path.abspath(path).split(os.sep)
+
+    def insert(self, path, keyp):
+        node = self._root
+        for part in self._split(path):
+            try:
+                node = node[part]
+            except KeyError:
+                child = node[part] = {}
+                node = child
+        node[self._KEYP] = keyp
+
+    def remove(self, path, keyp):
+        node = self._root
+        trail = []
+        for part in self._split(path):
+            try:
+                trail.append((node, part))
+                node = node[part]
+            except KeyError:
+                return
+
+        if node.get(self._KEYP) != keyp:
+            return
+        del node[self._KEYP]
+
+        for parent, part in reversed(trail):
+            if parent[part]:
+                break
+            del parent[part]
+
+    def lookup(self, path):
+        node = self._root
+        keyp = None
+        for part in self._split(path):
+            try:
+                node = node[part]
+            except KeyError:
+                break
+            keyp = node.get(self._KEYP, keyp)
+
+        return keyp
+
+
+class _ContentIndex:
+    """Inverted indexes of content key paths by attribute values"""
+
+    fields = ("tags", "kind", "source", "alias")
+
+    def __init__(self):
+        self._index = {field: {} for field in self.fields}
+
+    def _values(self, field, content):
+        if field == "tags":
+            return content.tags
+
+        value = getattr(content, field)
+        if value is None:
+            return ()
+        return (value,)
+
+    def insert(self, key, content):
+        for field, index in self._index.items():
+            for value in self._values(field, content):
+                try:
+                    index[value].add(key)
+                except KeyError:
+                    index[value] = {key}
+
+    def remove(self, key, content):
+        for field, index in self._index.items():
+            for value in self._values(field, content):
+                keys = index.get(value)
+                if keys is None:
+                    continue
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def get(self, field, value):
+        return self._index[field].get(value, set())
+
+
+class RWLock:
+    """Reader-writer lock
+
+    Any number of threads can hold the lock for reading or a single
+    thread for writing.  Writers are preferred: threads that do not
+    already read wait while a writer is waiting.  Both modes are
+    reentrant, and the writing thread can acquire the lock for reading
+    as well.  Upgrading from reading to writing is not possible.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = {}
+        self._writer = None
+        self._writes = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._condition:
+            if (self._writer != me) and (me not in self._readers):
+                while (self._writer is not None) or self._waiting_writers:
+                    self._condition.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._condition:
+            n = self._readers[me] - 1
+            if n:
+                self._readers[me] = n
+                return
+
+            del self._readers[me]
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writes += 1
+                return
+
+            if me in self._readers:
+                raise RuntimeError("Cannot upgrade a read lock to writing")
+
+            self._waiting_writers += 1
+            try:
+                while (self._writer is not None) or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+
+            self._writer = me
+            self._writes = 1
+
+    def release_write(self):
+        with self._condition:
+            self._writes -= 1
+            if not self._writes:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def reading(self):
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield self
+        finally:
+            self.release_write()
+
+
+def _reads(method):
+    """Run a project method under the read lock (if threadsafe)"""
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        lock = self._lock
+        if lock is None:
+            return method(self, *args, **kwargs)
+
+        lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_read()
+
+    return locked
+
+
+def _writes(method):
+    """Run a project method under the write lock (if threadsafe)"""
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        lock = self._lock
+        if lock is None:
+            return method(self, *args, **kwargs)
+
+        lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_write()
+
+    return locked
+
+
+class _PathJoiner:
+    """Build resolved paths from strings as `pathlib` would
+
+    Expansions of environment variables and normalised snippets are
+    memoised, so that sources, abstraction paths and cpaths shared by
+    many contents are processed once.  See
+    :meth:`Project.resolve_paths`.
+
+    Args:
+        sources: :obj:`Sources` of the project.
+    """
+
+    def __init__(self, sources):
+        self._sources = sources
+        self._roots = {}
+        self._tails = {}
+        self._relative = {}
+
+    @staticmethod
+    def concat(base, rel):
+        """Join as f"{base}/{rel}" would after normalisation"""
+
+        if not rel:
+            return base
+        if base == ".":
+            return rel
+        if base.endswith(os.sep):
+            return base + rel
+        return f"{base}{os.sep}{rel}"
+
+    @staticmethod
+    def split(path):
+        """Absolute flag and normalised relative form of a path"""
+
+        if path and (path != ".") and ("/" not in path) and (
+                os.sep not in path):
+            return False, path
+
+        pure = pathlib.PurePath(path)
+        parts = pure.parts[1:] if pure.anchor else pure.parts
+        return pure.is_absolute(), os.sep.join(parts)
+
+    def normalise(self, path):
+        """Like :meth:`split`, after expanding environment variables"""
+
+        try:
+            return self._relative[path]
+        except KeyError:
+            pass
+
+        normalised = self._relative[path] = self.split(_expandvars(path))
+        return normalised
+
+    def child(self, keyp_eval, path):
+        """Path of an abstraction below a resolved parent path"""
+
+        absolute, rel = self.normalise(path)
+        if absolute:
+            # Like pathlib, absolute paths replace the parent
+            return str(pathlib.Path(_expandvars(path)))
+        return self.concat(keyp_eval, rel)
+
+    def prefix(self, source, ignore_keyp, keyp_eval):
+        """Directory of contents below a resolved abstraction path"""
+
+        try:
+            root = self._roots[source]
+        except KeyError:
+            root = self._roots[source] = str(pathlib.Path(
+                _expandvars(self._sources[source])
+                ))
+
+        if ignore_keyp:
+            return root
+        return self.concat(root, keyp_eval.lstrip(os.sep))
+
+    def tail(self, cpath, filename):
+        """Separator led remainder of a content path below its prefix"""
+
+        try:
+            return self._tails[cpath, filename]
+        except KeyError:
+            pass
+
+        # Like Content.fullpath, the filename is not expanded
+        rel = os.sep.join(
+            p for p in (
+                self.normalise(str(cpath))[1], self.split(filename)[1]
+                )
+            if p
+            )
+        tail = self._tails[cpath, filename] = f"{os.sep}{rel}" if rel else ""
+        return tail
+
+    def join(self, prefix, tail):
+        if (prefix[-1] == os.sep) or (prefix == "."):
+            return self.concat(prefix, tail[1:])
+        return prefix + tail
+
+
+@contextmanager
+def _replacing(file):
+    """Open a file next to `file` for writing that replaces it when closed
+
+    If writing fails, `file` is left untouched.
+    """
+
+    file = pathlib.Path(os.path.expandvars(file))
+    tmp_file = file.with_name(f"{file.name}.tmp")
+    try:
+        with open(tmp_file, "w") as fp:
+            yield fp
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_file, file)
+
+
+class Project:
+    """Collection of abstractions and contents
+
+    Args:
+        alias: Name of the project.
+
+    Keyword args:
+        file: Project file to load.
+        journal: Open a journal (see :meth:`open_journal`) next to
+            `file` after loading it.
+        threadsafe: Guard the project with a :obj:`RWLock`, so that
+            it can be shared between threads.  Methods modifying the
+            tree (`add_*`, `rm_*`, `__setitem__`, `populate`, etc.)
+            then run exclusively, while lookups and path resolution
+            run concurrently.  Hold :meth:`reading` while iterating
+            (e.g. over :meth:`iter_contents` or :meth:`glob`).
+
+    Attributes:
+        metadata: :obj:`MetadataTable` filled by
+            :meth:`collect_metadata`. Not saved with the project.
+    """
+
+    def __init__(
+            self, alias=None, /, *,
+            file=None, journal=False, threadsafe=False):
+        if getattr(self, "_lock", None) is None:
+            self._lock = RWLock() if threadsafe else None
+
+        # Journal of modifications, None unless opened
+        self._journal = None
+        self._proxy = proxy(self)
+
+        self.abstractions = Abstraction("root")
+        self.views = Views(project=self._proxy)
+        self.layouts = {}
+
+        # Resolved path caches (keyed by KeyPath tuples)
+        self._path_cache = {}
+        self._fullpath_cache = {}
+        self._cache_children = {}
+        self._cache_by_source = {}
+        self._path_index = None
+        self._content_index = None
+
+        self._env_generation = _expandvars.generation
+
+        # File metadata by path, kept when the project is reinitialised
+        if getattr(self, "metadata", None) is None:
+            self.metadata = MetadataTable()
+
+        # Validity of snapshot memos, None until the first snapshot
+        self._frozen_epoch = None
+        self.sources = Sources(project=self._proxy)
+
+        if file is None:
+            self.file = file
+        else:
+            self.load(file)
+            if journal:
+                self.open_journal()
+
+        self.alias = alias
+
+    @property
+    def a(self):
+        return self.abstractions
+
+    @contextmanager
+    def reading(self):
+        """Context in which the project is not modified by other threads
+
+        Has no effect unless the project is threadsafe.
+        """
+
+        if self._lock is None:
+            yield self
+        else:
+            with self._lock.reading():
+                yield self
+
+    @contextmanager
+    def writing(self):
+        """Context with exclusive access to the project
+
+        Has no effect unless the project is threadsafe.
+        """
+
+        if self._lock is None:
+            yield self
+        else:
+            with self._lock.writing():
+                yield self
+
+    @property
+    def v(self):
+        return self.views
+
+    @property
+    def s(self):
+        return self.sources
+
+    @_writes
+    def load(self, file, reinit=False, *, fmt=None):
+        """Load project from file
+
+        Args:
+            file: Path to the project file.
+            reinit: Reset the project before loading.
+
+        Keyword args:
+            fmt: File format, "json", "jsonl" or "binary". If `None`,
+                deduced from the file suffix (".jsonl" for line
+                delimited JSON, ".idb" for binary, "json" otherwise).
+                Binary files are memory-mapped and abstractions are
+                only materialised when accessed.
+
+        If a journal belonging to `file` exists (see
+        :meth:`open_journal`), it is replayed on top of the loaded
+        project.
+        """
+        # Loading is not journaled, an open journal stays open
+        journal, self._journal = self._journal, None
+        try:
+            self._load(file, reinit, fmt)
+        finally:
+            self._journal = journal
+
+    def _load(self, file, reinit, fmt):
+        if reinit:
+            self.__init__()
+
+        file = pathlib.Path(file)
+        fmt = self._check_fmt(file, fmt)
+
+        if fmt == "jsonl":
+            self._load_jsonl(file)
+        elif fmt == "binary":
+            from . import binary
+
+            self.abstractions = binary.load(self._proxy, file)
+        else:
+            with open(os.path.expandvars(file)) as file_:
+                details = json.load(
+                    file_, object_hook=ProjectDecoder(project=self._proxy)
+                    )
+                self.sources.update(details["sources"])
+                self.views.update(details["views"])
+                self.layouts.update(details.get("layouts", {}))
+                self.abstractions = Abstraction.from_dict(
+                    details["abstractions"]
+                    )
+
+        self._reset_indexes()
+        self.file = file
+        self.sources["home"] = self.file.parent
+
+        from . import journal
+
+        journal_file = journal.path_for(file)
+        if journal_file.is_file():
+            journal.replay(self, journal_file)
+
+    @_writes
+    def save(self, file, *, fmt=None):
+        """Save project to file
+
+        Args:
+            file: Path to the project file.
+
+        Keyword args:
+            fmt: File format, "json", "jsonl" or "binary". If `None`,
+                deduced from the file suffix (".jsonl" for line
+                delimited JSON, ".idb" for binary, "json" otherwise).
+        """
+        file = pathlib.Path(file)
+        fmt = self._check_fmt(file, fmt)
+
+        if fmt == "jsonl":
+            self._save_jsonl(file)
+        elif fmt == "binary":
+            from . import binary
+
+            binary.save(self, file)
+        else:
+            save_obj = {
+                "sources": self.sources,
+                "views": self._serialisable_views(),
+                "layouts": self.layouts,
+                "abstractions": self.abstractions.to_dict()
+            }
+
+            with _replacing(file) as fp:
+                json.dump(save_obj, fp, indent=4, cls=ProjectEncoder)
+
+        self.file = file
+        self.sources["home"] = self.file.parent
+
+    def _serialisable_views(self):
+        """Views that can be saved, others are skipped with a warning"""
+
+        views = {}
+        for name, view in self.views.items():
+            if isinstance(view, LazyView):
+                try:
+                    view.to_dict()
+                except TypeError as error:
+                    warnings.warn(f"view {name!r} not saved: {error}")
+                    continue
+            views[name] = view
+
+        return views
+
+    @_writes
+    def open_journal(self, file=None, *, sync_every=256, sync_interval=1.):
+        """Append all further modifications to a journal file
+
+        Modifications through the `Project` API (`add_*`, `rm_*`,
+        `__setitem__`, `sources`, `views`, `populate`, etc.) are
+        journaled.  Abstractions or contents modified in place are
+        only journaled when they are assigned again with
+        `project[keyp] = node`.  :meth:`load` replays the journal next
+        to the project file, :meth:`checkpoint` folds it into the
+        project file.  See :mod:`indirect.journal`.
+
+        Args:
+            file: Journal file. If `None`, uses the project file with
+                the suffix ".journal" appended.
+
+        Keyword args:
+            sync_every: Fsync the journal after this many records.
+            sync_interval: Fsync the journal in the background at most
+                this many seconds after a record was appended.
+
+        Returns:
+            :obj:`journal.Journal`
+        """
+
+        from . import journal
+
+        if file is None:
+            if self.file is None:
+                raise ValueError("Project has no file, pass a journal file")
+            file = journal.path_for(self.file)
+
+        self.close_journal()
+        self._journal = journal.Journal(
+            file, sync_every=sync_every, sync_interval=sync_interval
+            )
+
+        return self._journal
+
+    @_writes
+    def close_journal(self):
+        """Sync and close the journal, if one is open"""
+
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    @_writes
+    def checkpoint(self, *, fmt=None):
+        """Save the project file and truncate the journal
+
+        The project file is replaced atomically, so that a crash leaves
+        either the old file and the full journal, or the new file.
+
+        Keyword args:
+            fmt: File format, see :meth:`save`.
+        """
+
+        if self.file is None:
+            raise ValueError("Project has no file to checkpoint to")
+
+        file = self.file
+        tmp = file.with_name(f"{file.name}.tmp")
+        fmt = self._check_fmt(file, fmt)
+
+        journal, self._journal = self._journal, None
+        try:
+            self.save(tmp, fmt=fmt)
+            os.replace(tmp, file)
+        finally:
+            self._journal = journal
+            self.file = file
+            self.sources._sources["home"] = file.parent
+
+        if journal is not None:
+            journal.truncate()
+
+    @staticmethod
+    def _check_fmt(file, fmt):
+        if fmt is None:
+            fmt = {
+                ".jsonl": "jsonl", ".idb": "binary"
+                }.get(file.suffix, "json")
+
+        if fmt not in ("json", "jsonl", "binary"):
+            raise ValueError(f"Unknown project file format {fmt!r}")
+
+        return fmt
+
+    def _save_jsonl(self, file):
+        """Write the project as line delimited JSON, one node per line
+
+        The first line holds sources, views and layouts. It is followed
+        by the abstraction tree in pre-order, each record carrying its
+        depth so that the tree can be rebuilt with a stack on load.
+        """
+
+        encoder = ProjectEncoder()
+
+        with _replacing(file) as fp:
+            fp.write(encoder.encode({
+                "sources": self.sources,
+                "views": self._serialisable_views(),
+                "layouts": self.layouts,
+                }))
+            fp.write("\n")
+
+            for keyp, node in self.abstractions.walk():
+                fp.write(encoder.encode({"depth": len(keyp), "node": node}))
+                fp.write("\n")
+
+    def _load_jsonl(self, file):
+        decoder = ProjectDecoder(project=self._proxy)
+        stack = []
+
+        with open(os.path.expandvars(file)) as fp:
+            details = json.loads(next(fp), object_hook=decoder)
+            self.sources.update(details["sources"])
+            self.views.update(details["views"])
+            self.layouts.update(details.get("layouts", {}))
+
+            for line in fp:
+                record = json.loads(line, object_hook=decoder)
+                depth, node = record["depth"], record["node"]
+
+                if isinstance(node, Content):
+                    last_a = stack[depth - 1]
+                    if last_a.content is None:
+                        last_a.content = {}
+                    last_a.content[node.alias] = node
+                    continue
+
+                del stack[depth:]
+                if depth > 0:
+                    last_a = stack[-1]
+                    node.previous = proxy(last_a)
+                    if last_a.next is None:
+                        last_a.next = {}
+                    last_a.next[node.alias] = node
+                stack.append(node)
+
+        if stack:
+            self.abstractions = stack[0]
+
+    @_writes
+    def add_abstraction(self, alias, *, path=None, view=None):
+        """Add abstraction to abstractions
+
+        Args:
+            alias: Short identifier for the new abstraction.
+
+        Keyword args:
+            path: Actual path fragment represented by this abstraction.
+                If `None`, will use ``alias``.
             view: List of KeyPath instances (or equivalents) under which
                 the new abstraction should be added.
         """
@@ -371,48 +1985,489 @@ class Project:
         if path is None:
             path = alias
 
-        view = self.check_view(view)
+        for keyp in self.check_view(view):
+            key = self._as_key(keyp)
+            last_a = self.decent_keyp(key)
+            assert isinstance(last_a, Abstraction)
+
+            self._insert_abstraction(last_a, key, alias, path, proxy(last_a))
+
+    @_writes
+    def add_abstractions(self, records):
+        """Add many abstractions in one pass
+
+        Lookups of the parent abstractions are shared between records,
+        so a common key path prefix is only traversed once.
+
+        Args:
+            records: Iterable of (alias, path, keyp) tuples. If path is
+                `None`, will use alias. The new abstraction is added
+                under keyp (a KeyPath or equivalent).
+        """
+
+        resolve = self._keyp_resolver()
+        memo = resolve.memo
+        proxies = {}
+
+        for alias, path, keyp in records:
+            if path is None:
+                path = alias
+
+            key = self._as_key(keyp)
+            last_a = resolve(key)
+            assert isinstance(last_a, Abstraction)
+
+            try:
+                last_a_proxy = proxies[key]
+            except KeyError:
+                last_a_proxy = proxies[key] = proxy(last_a)
+
+            key, a = self._insert_abstraction(
+                last_a, key, alias, path, last_a_proxy
+                )
+            memo[key] = a
+
+    def _insert_abstraction(self, last_a, key, alias, path, previous):
+        """Add an abstraction below `last_a`, which is at key
+
+        Returns:
+            Key tuple of the new abstraction and the abstraction
+        """
+
+        a = Abstraction(alias, path=path)
+        a.previous = previous
+
+        key = (*key, alias)
+
+        if last_a.next is None:
+            last_a.next = {}
+        else:
+            old = last_a.next.get(alias)
+            if old is not None:
+                self._detach(key, old)
+        last_a.next[alias] = a
+        # Storage backends may keep a copy
+        a = last_a.next[alias]
+
+        self._attach(key, a)
+        return key, a
+
+    def _keyp_resolver(self):
+        """Memoised KeyPath tuple to node lookup for batch operations"""
+
+        memo = {(): self.abstractions}
+
+        def resolve(key):
+            try:
+                return memo[key]
+            except KeyError:
+                pass
+
+            a = resolve(key[:-1])
+            try:
+                a = a.next[key[-1]]
+            except (KeyError, TypeError, AttributeError):
+                try:
+                    a = a.content[key[-1]]
+                except (KeyError, TypeError, AttributeError):
+                    raise LookupError("Invalid KeyPath")
+
+            memo[key] = a
+            return a
+
+        resolve.memo = memo
+
+        return resolve
+
+    @staticmethod
+    def _as_key(keyp):
+        if isinstance(keyp, str):
+            keyp = KeyPath.from_string(keyp)
+        return keyp if isinstance(keyp, tuple) else tuple(keyp)
+
+    @_writes
+    def populate(
+            self, layout, *, contents=None, source="home", view=None,
+            name=None, parallel=False, max_workers=None):
+        """Create abstractions and contents from a directory layout
+
+        The source is scanned once per KeyPath in the view (see
+        :func:`indirect.cookbook.scan_dirs`) and all abstractions and
+        contents are added in bulk.
+
+        Args:
+            layout: Sequence of abstraction levels. A level is either a
+                directory template (string of glob patterns separated
+                by "/" or compiled regular expression) or a dict with
+                keys "pattern" (the template) and optionally "alias".
+                The alias is a format string receiving the matched
+                directory names as positional fields and the keywords
+                `name` (matched path fragment) and `index` (1-based
+                position among siblings). Defaults to "{index}".
+
+        Keyword args:
+            contents: Mapping of content aliases to filenames added to
+                every abstraction of the last level. Filenames may be
+                glob patterns, in which case the first matching file
+                (sorted by name) is used. Values may also be dicts with
+                key "filename" and further keyword arguments for
+                :meth:`add_contents`.
+            source: Root of the scanned directory tree.
+            view: List of KeyPath instances (or equivalents) under which
+                the new abstractions should be added.
+            name: If given, store a view of the created abstractions of
+                the last level under this name. The layout and the
+                directory modification times are remembered under the
+                same name for :meth:`resync`.
+            parallel: Scan subdirectories concurrently.
+            max_workers: Maximum number of threads if `parallel` is
+                `True`.
+
+        Returns:
+            View of the created abstractions of the last level
+        """
+
+        levels = []
+        for level in layout:
+            if not isinstance(level, dict):
+                level = {"pattern": level}
+
+            template = level["pattern"]
+            if isinstance(template, str):
+                template = template.strip("/").split("/")
+            elif isinstance(template, re.Pattern):
+                template = [template]
+
+            levels.append({
+                "pattern": [
+                    {"regex": t.pattern, "flags": t.flags}
+                    if isinstance(t, re.Pattern) else t
+                    for t in template
+                    ],
+                "alias": level.get("alias", "{index}")
+                })
+
+        specs = {}
+        if contents is not None:
+            for alias, spec in contents.items():
+                if not isinstance(spec, dict):
+                    spec = {"filename": spec}
+                spec = dict(spec)
+                spec.setdefault("source", source)
+                specs[alias] = spec
+
+        bases = {}
+        for keyp in self.check_view(view):
+            if not isinstance(keyp, KeyPath):
+                keyp = KeyPath(keyp)
+            bases[keyp.to_string()] = {
+                "created": {}, "counters": {}, "journal": {}
+                }
+
+        state = {
+            "layout": levels,
+            "contents": specs,
+            "source": source,
+            "bases": bases,
+            }
+
+        _, leaves = self._sync_layout(
+            state, journal=name is not None,
+            parallel=parallel, max_workers=max_workers
+            )
+
+        if name is not None:
+            self.layouts[name] = state
+            self._assigned("layout", name, state)
+            self.views[name] = leaves
+
+        return leaves
+
+    @_writes
+    def resync(self, name, *, parallel=False, max_workers=None):
+        """Update abstractions created by :meth:`populate` from disk
+
+        Every directory recorded for the layout is stat'ed, but only
+        directories whose modification time changed are listed again.
+        New matches are added and vanished matches are removed.
+        Contents are only re-evaluated for new abstractions and for
+        abstractions whose directory changed.
+
+        Args:
+            name: Name the layout was populated with.
+
+        Keyword args:
+            parallel: Scan subdirectories concurrently.
+            max_workers: Maximum number of threads if `parallel` is
+                `True`.
+
+        Returns:
+            :obj:`SyncReport`
+        """
+
+        try:
+            state = self.layouts[name]
+        except KeyError:
+            raise LookupError(f"No layout named {name!r}")
+
+        report, leaves = self._sync_layout(
+            state, parallel=parallel, max_workers=max_workers
+            )
+        self._assigned("layout", name, state)
+        self.views[name] = leaves
+
+        return report
+
+    def _sync_layout(
+            self, state, *, journal=True, parallel=False, max_workers=None):
+        """Bring the abstractions of a layout in line with the disk
+
+        Returns:
+            :obj:`SyncReport` and View of the abstractions of the last
+            level
+        """
+
+        from . import cookbook
+
+        start_time = time.perf_counter()
+
+        levels = [
+            (
+                [
+                    re.compile(t["regex"], t["flags"])
+                    if isinstance(t, dict) else t
+                    for t in level["pattern"]
+                    ],
+                level["alias"]
+            )
+            for level in state["layout"]
+            ]
+        full_template = [t for template, _ in levels for t in template]
+
+        specs = state["contents"]
+        list_files = any(
+            _has_magic(spec["filename"]) for spec in specs.values()
+            )
+
+        report = SyncReport()
+        leaves = View()
+        records = []
+        content_records = {alias: [] for alias in specs}
+        content_removed = []
+
+        for base_str, base_state in state["bases"].items():
+            base = tuple(KeyPath.from_string(base_str))
+            root = pathlib.Path(
+                _expandvars(self.sources[state["source"]])
+                ) / self.eval_keyp(base)
+
+            if journal:
+                dir_journal = cookbook.DirJournal(base_state["journal"])
+            else:
+                dir_journal = None
+
+            matches = cookbook.scan_dirs(
+                root, full_template,
+                parallel=parallel, max_workers=max_workers,
+                journal=dir_journal
+                )
+
+            created = base_state["created"]
+            counters = base_state["counters"]
+            seen = set()
+
+            for match in matches:
+                parent = base
+                is_new = False
+                end = 0
+                for template, alias_format in levels:
+                    start, end = end, end + len(template)
+                    prefix = "/".join(match[:end])
+                    seen.add(prefix)
+                    try:
+                        parent = tuple(created[prefix])
+                        continue
+                    except KeyError:
+                        pass
+
+                    group = match[start:end]
+                    parent_str = ".".join(parent)
+                    index = counters[parent_str] = (
+                        counters.get(parent_str, 0) + 1
+                        )
+                    fragment = "/".join(group)
+                    alias = alias_format.format(
+                        *group, name=fragment, index=index
+                        )
+                    records.append((alias, fragment, parent))
+
+                    parent = (*parent, alias)
+                    created[prefix] = list(parent)
+                    report.added.append(KeyPath(parent))
+                    is_new = True
+
+                leaves.append(KeyPath(parent))
+
+                if not specs:
+                    continue
+
+                rel = "/".join(match)
+                if not list_files:
+                    if not is_new:
+                        continue
+                elif dir_journal is None:
+                    with os.scandir(root.joinpath(*match)) as entries:
+                        files = sorted(
+                            entry.name for entry in entries
+                            if entry.is_file()
+                            )
+                else:
+                    _, files = dir_journal.listdir(root, rel)
+                    if not (is_new or rel in dir_journal.changed):
+                        continue
+
+                for alias, spec in specs.items():
+                    filename = spec["filename"]
+                    if _has_magic(filename):
+                        matching = fnmatch.filter(files, filename)
+                        if not matching:
+                            if not is_new:
+                                content_removed.append((alias, parent))
+                            continue
+                        filename = matching[0]
+                    content_records[alias].append((alias, filename, parent))
+
+            removed = set()
+            for prefix in sorted(
+                    created.keys() - seen, key=lambda p: p.count("/")):
+                keyp = created.pop(prefix)
+                removed.add(prefix)
+                parts = prefix.split("/")
+                if any(
+                        "/".join(parts[:i]) in removed
+                        for i in range(1, len(parts))):
+                    continue
+
+                try:
+                    self.rm_abstraction(keyp[-1], view=[keyp[:-1]])
+                except (LookupError, AttributeError):
+                    pass
+                report.removed.append(KeyPath(keyp))
+
+            if dir_journal is not None:
+                dir_journal.prune()
+                report.n_stat += dir_journal.n_stat
+                report.n_listed += dir_journal.n_listed
+
+        self.add_abstractions(records)
+
+        for alias, keyp in content_removed:
+            node = self.decent_keyp(keyp)
+            if (node.content is not None) and (alias in node.content):
+                self.rm_content(alias, view=[keyp])
+
+        for alias, spec in specs.items():
+            spec = dict(spec)
+            del spec["filename"]
+            self.add_contents(
+                (
+                    record for record in content_records[alias]
+                    if not self._has_content(*record)
+                    ),
+                **spec
+                )
 
-        for keyp in view:
-            if isinstance(keyp, str):
-                keyp = KeyPath.from_string(keyp)
+        report.elapsed = time.perf_counter() - start_time
 
-            last_a = self.decent_keyp(keyp)
-            assert isinstance(last_a, Abstraction)
+        return report, leaves
 
-            a = Abstraction(alias, path=path)
-            a.previous = proxy(last_a)
+    def _has_content(self, alias, filename, keyp):
+        node = self.decent_keyp(keyp)
+        if node.content is None:
+            return False
 
-            if last_a.next is None:
-                last_a.next = {}
-            last_a.next[alias] = a
+        c = node.content.get(alias)
+        return (c is not None) and (c.filename == filename)
 
     def check_view(self, view):
+        """Turn a view specification into an iterable of KeyPaths
+
+        Args:
+            view: `None` (the root), a view name, a
+                :obj:`KeyPathPattern` or pattern string (see
+                :meth:`glob`), a :obj:`LazyView`, or an iterable of
+                KeyPaths (or equivalents).
+        """
+
         if view is None:
             view = View([[]])
+        elif isinstance(view, LazyView):
+            view = view.resolve(self)
+        elif isinstance(view, KeyPathPattern):
+            view = self.glob(view)
         elif isinstance(view, str):
             try:
                 view = self.views[view]
             except KeyError:
-                raise LookupError("Could not find view")
+                if not KeyPathPattern.has_magic(view):
+                    raise LookupError("Could not find view")
+                view = self.glob(view)
+            else:
+                if isinstance(view, LazyView):
+                    view = view.resolve(self)
         elif not isinstance(view, View):
             view = View(view)
 
         return view
 
+    def glob(self, pattern):
+        """Iterate lazily over KeyPaths matching a pattern
+
+        Args:
+            pattern: :obj:`KeyPathPattern` or pattern string, e.g.
+                "a.*.report", "**.report" or "b.{1,3}.*".
+
+        Yields:
+            Matching KeyPaths
+        """
+
+        if not isinstance(pattern, KeyPathPattern):
+            pattern = KeyPathPattern(pattern)
+
+        return pattern.iter_matches(self.abstractions)
+
+    @_writes
     def rm_abstraction(self, alias, view):
+        """Remove the child `alias` of every abstraction in a view
 
-        view = self.check_view(view)
+        Abstractions of the view without such a child, or inside a
+        subtree removed by an earlier entry of the view, are skipped.
+        The view is resolved before anything is removed.
+        """
 
-        for keyp in view:
+        removed = set()
+        targets = []
+        for keyp in self.check_view(view):
             if isinstance(keyp, str):
                 keyp = KeyPath.from_string(keyp)
+            keyp = tuple(keyp)
+
+            if any(keyp[:i] in removed for i in range(len(keyp) + 1)):
+                continue
 
             last_a = self.decent_keyp(keyp)
             assert isinstance(last_a, Abstraction)
+            if not last_a.next or (alias not in last_a.next):
+                continue
+
+            removed.add((*keyp, alias))
+            targets.append((keyp, last_a))
 
+        for keyp, last_a in targets:
+            self._detach((*keyp, alias), last_a.next[alias])
             _ = last_a.next.pop(alias)
 
+    @_writes
     def add_content(
             self, alias, filename, *, cpath='',
             source="home", check=False, desc=None, kind=None, hash=None,
@@ -420,35 +2475,459 @@ class Project:
 
         view = self.check_view(view)
 
-        for keyp in view:
-            if isinstance(keyp, str):
-                keyp = KeyPath.from_string(keyp)
+        def make_records():
+            for keyp in view:
+                if isinstance(keyp, str):
+                    keyp = KeyPath.from_string(keyp)
+                yield alias, filename.format(*keyp), keyp
 
-            last_a = self.decent_keyp(keyp)
+        self.add_contents(
+            make_records(), cpath=cpath, source=source, check=check,
+            desc=desc, kind=kind, hash=hash, tags=tags,
+            ignore_keyp=ignore_keyp
+            )
+
+    @_writes
+    def add_contents(
+            self, records, *, cpath='',
+            source="home", check=False, desc=None, kind=None, hash=None,
+            tags=None, ignore_keyp=False):
+        """Add many contents in one pass
+
+        Lookups of the parent abstractions are shared between records,
+        so a common key path prefix is only traversed once.
+
+        Args:
+            records: Iterable of (alias, filename, keyp) tuples. The
+                new content is added under keyp (a KeyPath or
+                equivalent).
+
+        Keyword args:
+            Shared by all records, see :meth:`add_content`.
+        """
+
+        resolve = self._keyp_resolver()
+        cpath = pathlib.Path(cpath)
+        checked = []
+
+        for alias, filename, keyp in records:
+            # Interned, and hashes like the plain tuple for the lookups
+            keyp = KeyPath(keyp)
+            last_a = resolve(keyp)
             assert isinstance(last_a, Abstraction)
 
             c = Content(
                 alias,
-                filename=filename.format(*keyp),
+                filename=filename,
                 cpath=cpath,
                 keyp=keyp,
                 source=source,
-                exists=None,      # Implement existence check
+                exists=None,
                 desc=desc,
                 kind=kind,
+                hash=hash,
                 tags=tags,
-                project=proxy(self),
+                project=self._proxy,
                 ignore_keyp=ignore_keyp
                 )
 
+            key_c = (*keyp, alias)
+
             if last_a.content is None:
                 last_a.content = {}
+            else:
+                old = last_a.content.get(alias)
+                if old is not None:
+                    self._detach(key_c, old)
             last_a.content[alias] = c
+            self._attach(key_c, c)
+
+            if check:
+                checked.append((key_c, c))
+
+        if check:
+            self._check_exists(checked)
+
+    def iter_contents(self, view=None, *, recursive=True):
+        """Iterate over the contents under a view
+
+        Args:
+            view: View (or view name) to consider. If `None`, the whole
+                project is used.
+
+        Keyword args:
+            recursive: If `True`, include contents of the whole subtree
+                below each abstraction in the view. Otherwise, only
+                direct contents are included.
+
+        Yields:
+            (keyp, content) tuples
+        """
+
+        view = self.check_view(view)
+
+        for keyp in view:
+            if isinstance(keyp, str):
+                keyp = KeyPath.from_string(keyp)
+
+            node = self.decent_keyp(keyp)
+            if isinstance(node, Content):
+                yield tuple(keyp), node
+
+            elif recursive:
+                for keyp_, node_ in node.walk(keyp):
+                    if isinstance(node_, Content):
+                        yield keyp_, node_
+
+            elif node.content is not None:
+                for alias, c in node.content.items():
+                    yield (*keyp, alias), c
+
+    @_reads
+    def resolve_paths(
+            self, view=None, *, recursive=True, as_array=False,
+            with_keys=False):
+        """Resolve the file system paths of all contents under a view
 
+        Gives the same paths as ``str(content.fullpath)`` for every
+        content yielded by :meth:`iter_contents`, in the same order.
+        Sources, cpaths and the path of each abstraction are expanded
+        and resolved only once and shared by everything below, and no
+        `pathlib.Path` is created per content.
+
+        Args:
+            view: View (or view name) to consider. If `None`, the whole
+                project is used.
+
+        Keyword args:
+            recursive: Include contents in the subtrees of the view,
+                see :meth:`iter_contents`.
+            as_array: Return paths as NumPy string array instead of a
+                list (requires NumPy).
+            with_keys: Return the content keys as well.
+
+        Returns:
+            List of paths (str) or, if `with_keys` is `True`, a tuple of
+            a list of content key tuples and the paths.
+        """
+
+        keys = [] if with_keys else None
+        paths = []
+        joiner = _PathJoiner(self.sources)
+        child_of = joiner.child
+        tails = joiner._tails
+        sep = os.sep
+
+        def collect(keyp, contents, keyp_eval):
+            prefixes = {}
+            for alias, c in contents:
+                try:
+                    prefix = prefixes[c.source, c.ignore_keyp]
+                except KeyError:
+                    prefix = prefixes[c.source, c.ignore_keyp] = (
+                        joiner.prefix(c.source, c.ignore_keyp, keyp_eval)
+                        )
+
+                # Inlined joiner.tail and joiner.join, this is the hot loop
+                try:
+                    tail = tails[c._cpath, c.filename]
+                except KeyError:
+                    tail = joiner.tail(c._cpath, c.filename)
+
+                if (prefix[-1] == sep) or (prefix == "."):
+                    paths.append(joiner.concat(prefix, tail[1:]))
+                else:
+                    paths.append(prefix + tail)
+
+                if keys is not None:
+                    keys.append((*keyp, alias))
+
+        for keyp in self.check_view(view):
+            if isinstance(keyp, str):
+                keyp = KeyPath.from_string(keyp)
+            keyp = tuple(keyp)
+
+            node = self.decent_keyp(keyp)
+            if isinstance(node, Content):
+                collect(
+                    keyp[:-1], [(keyp[-1], node)],
+                    str(self.eval_keyp(keyp[:-1]))
+                    )
+                continue
+
+            stack = [(keyp, node, str(self.eval_keyp(keyp)))]
+            while stack:
+                keyp, a, keyp_eval = stack.pop()
+
+                if a.content:
+                    collect(keyp, a.content.items(), keyp_eval)
+
+                if not (recursive and a.next):
+                    continue
+
+                for alias, a_ in reversed(a.next.items()):
+                    stack.append((
+                        (*keyp, alias), a_, child_of(keyp_eval, str(a_.path))
+                        ))
+
+        if as_array:
+            import numpy as np
+
+            paths = np.array(paths, dtype=str)
+
+        if with_keys:
+            return keys, paths
+        return paths
+
+    @_writes
+    def check_exists(
+            self, view=None, *, recursive=True, max_workers=None,
+            n_slowest=10):
+        """Check if content files exist
+
+        File system checks are run concurrently in a thread pool, which
+        pays off on high latency (e.g. network) file systems.  The
+        outcome is stored in :attr:`Content.exists`.
+
+        Args:
+            view: View (or view name) to check. If `None`, the whole
+                project is checked.
+
+        Keyword args:
+            recursive: Include contents in the subtrees of the view,
+                see :meth:`iter_contents`.
+            max_workers: Maximum number of threads.
+                If `None`, uses the `ThreadPoolExecutor` default.
+            n_slowest: Number of slowest checks to report.
+
+        Returns:
+            :obj:`ExistenceReport`
+        """
+
+        return self._check_exists(
+            self.iter_contents(view, recursive=recursive),
+            max_workers=max_workers, n_slowest=n_slowest
+            )
+
+    def _check_exists(self, contents, max_workers=None, n_slowest=10):
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+
+        report = ExistenceReport()
+        slowest = []
+        contents = iter(contents)
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Submit in bounded batches to keep memory flat
+            batch_size = max_workers * 64
+            while True:
+                batch = list(islice(contents, batch_size))
+                if not batch:
+                    break
+
+                paths = [c.fullpath for _, c in batch]
+                checked = executor.map(_timed_isfile, paths)
+
+                for (keyp, c), path, (exists, duration) in zip(
+                        batch, paths, checked):
+                    if c.exists is not exists:
+                        c.exists = exists
+                        self._modified(keyp, c)
+                    report.n_checked += 1
+                    report.n_existing += exists
+
+                    item = (duration, keyp, path)
+                    if len(slowest) < n_slowest:
+                        heapq.heappush(slowest, item)
+                    elif n_slowest > 0:
+                        heapq.heappushpop(slowest, item)
+
+        report.elapsed = time.perf_counter() - start
+        report.slowest = sorted(slowest, reverse=True)
+
+        return report
+
+    @_writes
+    def update_hashes(
+            self, view=None, *, recursive=True, algorithm="sha256",
+            max_workers=None, processes=True, chunk_size=1 << 20):
+        """Hash content files to track modifications
+
+        Files are only re-hashed if their (size, mtime_ns, inode)
+        signature differs from the one stored with the content.
+        Hashing runs concurrently in a process pool (or thread pool).
+        Hashes and signatures are stored in :attr:`Content.hash` and
+        :attr:`Content.signature` and persist through :meth:`save`.
+
+        Args:
+            view: View (or view name) to hash. If `None`, the whole
+                project is hashed.
+
+        Keyword args:
+            recursive: Include contents in the subtrees of the view,
+                see :meth:`iter_contents`.
+            algorithm: Name of a hash algorithm known to `hashlib`.
+            max_workers: Maximum number of workers.
+            processes: Use a process pool. If `False`, use threads.
+            chunk_size: Size of the buffer files are read into.
+
+        Returns:
+            :obj:`HashReport`
+        """
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        if processes:
+            executor_type = ProcessPoolExecutor
+        else:
+            executor_type = ThreadPoolExecutor
+
+        report = HashReport()
+        contents = self.iter_contents(view, recursive=recursive)
+        start = time.perf_counter()
+
+        with executor_type(max_workers=max_workers) as executor:
+            batch_size = max_workers * 64
+            while True:
+                batch = list(islice(contents, batch_size))
+                if not batch:
+                    break
+
+                n = len(batch)
+                hashed = executor.map(
+                    _hash_file,
+                    [c.fullpath for _, c in batch],
+                    [c.signature for _, c in batch],
+                    [algorithm] * n, [chunk_size] * n,
+                    chunksize=max(1, n // (max_workers * 4))
+                    )
+
+                for (keyp, c), (signature, digest) in zip(batch, hashed):
+                    if signature is None:
+                        if c.exists is not False:
+                            c.exists = False
+                            self._modified(keyp, c)
+                        report.missing.append(KeyPath(keyp))
+                        continue
+
+                    modified = c.exists is not True
+                    c.exists = True
+
+                    if digest is None:
+                        report.unchanged += 1
+                    else:
+                        c.signature = signature
+                        modified = True
+                        if digest != c.hash:
+                            c.hash = digest
+                            report.changed.append(KeyPath(keyp))
+
+                    if modified:
+                        self._modified(keyp, c)
+
+        report.elapsed = time.perf_counter() - start
+
+        return report
+
+    @_writes
+    def collect_metadata(
+            self, view=None, *, recursive=True, max_workers=None):
+        """Collect size, modification time and mode of content files
+
+        Metadata still valid in :attr:`metadata` (see
+        :obj:`MetadataTable`) is reused.  The remaining files are
+        grouped by parent directory and stat'ed, one directory per task
+        of a thread pool.  A cold collection takes a stat call per file
+        like a plain loop does; it only overlaps the calls, which helps
+        where per-file round trips are slow (e.g. network file systems).
+        Repeated collections are served from the table.
+        :attr:`Content.exists` is updated like in :meth:`check_exists`.
+
+        Args:
+            view: View (or view name) to consider. If `None`, the whole
+                project is used.
+
+        Keyword args:
+            recursive: Include contents in the subtrees of the view,
+                see :meth:`iter_contents`.
+            max_workers: Maximum number of threads.
+                If `None`, uses the `ThreadPoolExecutor` default.
+
+        Returns:
+            :obj:`MetadataReport`
+        """
+
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+
+        table = self.metadata
+        entries = table._entries
+        report = MetadataReport()
+        metadata = report.metadata
+        start = time.perf_counter()
+
+        if table.ttl is None:
+            limit = float("-inf")
+        else:
+            limit = time.monotonic() - table.ttl
+
+        # directory -> file name -> (path, [(keyp, content), ...])
+        # Iterated twice, patterns and lazy views are resolved once
+        view = View(self.check_view(view))
+
+        pending = {}
+        paths = self.resolve_paths(view, recursive=recursive)
+        contents = self.iter_contents(view, recursive=recursive)
+        for (keyp, c), path in zip(contents, paths):
+            entry = entries.get(path)
+            if (entry is not None) and (entry[0] >= limit):
+                metadata[keyp] = entry[1]
+                report.n_cached += 1
+                self._update_exists(keyp, c, entry[1])
+                continue
+
+            directory, _, name = path.rpartition(os.sep)
+            files = pending.get(directory)
+            if files is None:
+                files = pending[directory] = {}
+            found = files.get(name)
+            if found is None:
+                files[name] = (path, [(keyp, c)])
+            else:
+                found[1].append((keyp, c))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            timestamp = time.monotonic()
+            futures = [
+                (executor.submit(_stat_dir, directory, list(files)), files)
+                for directory, files in pending.items()
+                ]
+
+            for future, files in futures:
+                for (path, contents), m in zip(
+                        files.values(), future.result()):
+                    entries[path] = (timestamp, m)
+                    for keyp, c in contents:
+                        metadata[keyp] = m
+                        self._update_exists(keyp, c, m)
+
+        report.n_dirs = len(pending)
+        report.elapsed = time.perf_counter() - start
+
+        return report
+
+    def _update_exists(self, keyp, content, metadata):
+        exists = (metadata is not None) and metadata.is_file
+        if content.exists is not exists:
+            content.exists = exists
+            self._modified(keyp, content)
+
+    @_writes
     def rm_content(self, alias, view=None):
 
-        if view is None:
-            view = [[]]
+        view = self.check_view(view)
 
         for keyp in view:
             if isinstance(keyp, str):
@@ -457,8 +2936,10 @@ class Project:
             last_a = self.decent_keyp(keyp)
             assert isinstance(last_a, Abstraction)
 
+            self._detach((*keyp, alias), last_a.content[alias])
             _ = last_a.content.pop(alias)
 
+    @_reads
     def decent_keyp(
             self, keyp: Type["KeyPath"]
             ) -> Union[Type["Abstraction"], Type["Content"]]:
@@ -473,33 +2954,379 @@ class Project:
                     raise LookupError("Invalid KeyPath")
         return a
 
+    @_reads
     def eval_keyp(self, keyp: Type[KeyPath]) -> Type[pathlib.Path]:
+        key = keyp if isinstance(keyp, tuple) else tuple(keyp)
+        try:
+            return self._path_cache[key]
+        except KeyError:
+            pass
+
         a = self.abstractions
         keyp_eval = pathlib.Path()
-        for key in keyp:
+        for depth, k in enumerate(key, 1):
             try:
-                a = a.next[key]
+                a = a.next[k]
             except (KeyError, TypeError):
                 try:
-                    a = a.content[key]
-                except (KeyError, TypeError):
+                    a = a.content[k]
+                except (KeyError, TypeError, AttributeError):
                     raise LookupError("Invalid KeyPath")
-            finally:
+
+            prefix = key[:depth]
+            cached = self._path_cache.get(prefix)
+            if cached is None:
                 if isinstance(a, Abstraction):
-                    keyp_eval = keyp_eval / os.path.expandvars(a.path)
-                elif isinstance(a, Content):
-                    keyp_eval = keyp_eval / (
-                        f"{os.path.expandvars(a.cpath)}/"
+                    cached = keyp_eval / _expandvars(a.path)
+                else:
+                    cached = keyp_eval / (
+                        f"{_expandvars(a._cpath)}/"
                         f"{a.filename}"
                         )
+                self._path_cache[prefix] = cached
+                self._register_cached(prefix)
+            keyp_eval = cached
 
         return keyp_eval
 
+    @_writes
+    def refresh_env(self):
+        """Pick up changes of environment variables
+
+        Environment variables in sources, abstraction paths and cpaths
+        are expanded once and cached.  Call this after changing
+        variables used in the project to drop outdated expansions and
+        resolved paths.
+
+        Returns:
+            Set of names of changed variables
+        """
+
+        changed = _expandvars.refresh()
+        if self._env_generation != _expandvars.generation:
+            self._env_generation = _expandvars.generation
+            self.invalidate()
+            self._path_index = None
+
+        return changed
+
+    @_writes
+    def invalidate(self, keyp=None):
+        """Drop cached resolved paths at and below a KeyPath
+
+        Mutations through the `Project` API invalidate the affected
+        subtree automatically.  Call this after modifying
+        abstractions or contents in place, which also makes the next
+        :meth:`snapshot` pick up the modification.
+
+        Args:
+            keyp: Root of the subtree to invalidate. If `None`, the
+                whole cache is cleared.
+        """
+
+        if keyp is None:
+            self._path_cache.clear()
+            self._fullpath_cache.clear()
+            self._cache_children.clear()
+            self._cache_by_source.clear()
+            if self._frozen_epoch is not None:
+                self._frozen_epoch += 1
+            return
+
+        if isinstance(keyp, str):
+            keyp = KeyPath.from_string(keyp)
+
+        self._unfreeze(keyp)
+
+        if not self._cache_children:
+            return
+
+        key = tuple(keyp)
+        if key:
+            siblings = self._cache_children.get(key[:-1])
+            if siblings is not None:
+                siblings.discard(key)
+
+        stack = [key]
+        while stack:
+            key = stack.pop()
+            self._path_cache.pop(key, None)
+            cached = self._fullpath_cache.pop(key, None)
+            if cached is not None:
+                self._cache_by_source.get(cached[0].source, set()).discard(key)
+            stack.extend(self._cache_children.pop(key, ()))
+
+    def _unfreeze(self, key):
+        """Drop snapshot memos of the nodes along a key path"""
+
+        if self._frozen_epoch is None:
+            return
+
+        a = self.abstractions
+        a._frozen = None
+        for k in key:
+            try:
+                a = a.next[k]
+            except (KeyError, TypeError):
+                return
+            a._frozen = None
+
+    @_reads
+    def snapshot(self):
+        """Take an immutable snapshot of the project
+
+        Snapshots share unchanged subtrees with earlier snapshots, so
+        that taking one costs time proportional to the number of nodes
+        modified since the last.  See :obj:`snapshot.Snapshot`.
+        Contents modified in place need to be announced with
+        :meth:`invalidate` to be picked up.
+
+        Returns:
+            :obj:`snapshot.Snapshot`
+        """
+
+        from . import snapshot
+
+        if self._frozen_epoch is None:
+            self._frozen_epoch = 0
+
+        return snapshot.Snapshot.of(self)
+
+    def _has_cached(self):
+        """Whether resolved paths or snapshot memos need invalidation"""
+
+        return bool(self._cache_children) or (
+            self._frozen_epoch is not None
+            )
+
+    def _attach(self, key, node):
+        """Update caches and indexes after a node was added at key"""
+
+        if self._has_cached():
+            self.invalidate(key)
+
+        if self._path_index is not None:
+            self._index_paths(key, node)
+
+        if self._content_index is not None:
+            self._index_contents(key, node)
+
+        if self._journal is not None:
+            self._journal.set(key, node)
+
+    def _detach(self, key, node):
+        """Update caches and indexes before the node at key is removed"""
+
+        if self._path_index is not None:
+            self._index_paths(key, node, remove=True)
+
+        if self._content_index is not None:
+            self._index_contents(key, node, remove=True)
+
+        if self._has_cached():
+            self.invalidate(key)
+
+        if self._journal is not None:
+            self._journal.remove(key, node)
+
+    def _modified(self, key, content):
+        """Announce that a content at key was modified in place"""
+
+        self._unfreeze(key)
+
+        if self._journal is not None:
+            self._journal.set(key, content)
+
+    def _assigned(self, kind, name, value):
+        """Journal that a source, view or layout was set (or deleted)"""
+
+        if self._journal is not None:
+            self._journal.assign(kind, name, value)
+
+    def _reset_indexes(self):
+        self.invalidate()
+        self._path_index = None
+        self._content_index = None
+
+    @_reads
+    def find(
+            self, *, tags=None, kind=None, source=None, alias=None,
+            view=None):
+        """Find contents by attribute values
+
+        Inverted indexes of contents by tag, kind, source and alias are
+        built on first use and kept up to date by the `Project` API.
+        Modifying these attributes of a content in place requires
+        re-adding it.
+
+        Keyword args:
+            tags: Tag or list of tags a content must all have.
+            kind: Kind a content must have.
+            source: Source a content must have.
+            alias: Alias a content must have.
+            view: View (or view name). If given, only contents in the
+                subtrees of the view are returned.
+
+        Returns:
+            Sorted list of KeyPaths
+        """
+
+        if isinstance(tags, str):
+            tags = [tags]
+
+        criteria = [("tags", tag) for tag in (tags or ())]
+        criteria.extend(
+            (field, value)
+            for field, value in (
+                ("kind", kind), ("source", source), ("alias", alias)
+                )
+            if value is not None
+            )
+
+        if not criteria:
+            # Only the view restricts, walk just its subtrees
+            return sorted({
+                KeyPath(key) for key, _ in self.iter_contents(view)
+                })
+
+        index = self._content_index
+        if index is None:
+            # Built aside, so that concurrent readers never see it partial
+            index = _ContentIndex()
+            self._index_contents((), self.abstractions, index=index)
+            self._content_index = index
+
+        candidates = sorted((index.get(*c) for c in criteria), key=len)
+        found = candidates[0].intersection(*candidates[1:])
+
+        if view is not None:
+            prefixes = {
+                tuple(KeyPath.from_string(keyp))
+                if isinstance(keyp, str) else tuple(keyp)
+                for keyp in self.check_view(view)
+                }
+            found = (
+                key for key in found
+                if any(key[:i] in prefixes for i in range(len(key) + 1))
+                )
+
+        return sorted(KeyPath(key) for key in found)
+
+    def _index_contents(self, key, node, remove=False, index=None):
+        """Add (or remove) the contents of the subtree at key"""
+
+        if index is None:
+            index = self._content_index
+
+        if remove:
+            update = index.remove
+        else:
+            update = index.insert
+
+        if isinstance(node, Content):
+            update(key, node)
+            return
+
+        for key_, node_ in node.walk(key):
+            if isinstance(node_, Content):
+                update(key_, node_)
+
+    @_reads
+    def locate(self, path):
+        """Find the KeyPath owning a file system path
+
+        The reverse index of resolved paths is built on first use and
+        kept up to date by the `Project` API. Paths are made absolute
+        relative to the current working directory.
+
+        Args:
+            path: File or directory path.
+
+        Returns:
+            KeyPath of the content with exactly this path, or of the
+            deepest abstraction containing the path, or `None`.
+        """
+
+        index = self._path_index
+        if index is None:
+            # Built aside, so that concurrent readers never see it partial
+            index = _PathIndex()
+            self._index_paths((), self.abstractions, index=index)
+            self._path_index = index
+
+        keyp = index.lookup(path)
+        if keyp is None:
+            return None
+
+        return KeyPath(keyp)
+
+    def _index_paths(self, key, node, remove=False, index=None):
+        """Add (or remove) the paths of the subtree at key to the index"""
+
+        if index is None:
+            index = self._path_index
+
+        if remove:
+            update = index.remove
+        else:
+            update = index.insert
+
+        sources = set(self.sources) | {"home"}
+        if isinstance(node, Content):
+            subtree = [(key, node)]
+        else:
+            subtree = node.walk(key)
+
+        for key_, node_ in subtree:
+            if isinstance(node_, Content):
+                update(node_.fullpath, key_)
+                continue
+
+            keyp_eval = self.eval_keyp(key_)
+            for source in sources:
+                update(
+                    pathlib.Path(
+                        _expandvars(self.sources[source])
+                        ) / keyp_eval,
+                    key_
+                    )
+
+    def _register_cached(self, key):
+        """Link a cached key path to its ancestors for invalidation"""
+
+        for depth in range(len(key), 0, -1):
+            parent = key[:depth - 1]
+            children = self._cache_children.get(parent)
+            if children is None:
+                # setdefault keeps concurrent readers from losing links
+                children = self._cache_children.setdefault(parent, set())
+
+            if key[:depth] in children:
+                break
+            children.add(key[:depth])
+
+    def _cache_fullpath(self, content, fullpath):
+        key = (*content.keyp, content.alias)
+        self._fullpath_cache[key] = (content, fullpath)
+        self._register_cached(key)
+
+        try:
+            self._cache_by_source[content.source].add(key)
+        except KeyError:
+            self._cache_by_source.setdefault(content.source, set()).add(key)
+
+    def _invalidate_source(self, source):
+        for key in self._cache_by_source.pop(source, ()):
+            self._fullpath_cache.pop(key, None)
+        self._path_index = None
+
+    @_reads
     def __getitem__(self, keyp):
         if isinstance(keyp, str):
             keyp = KeyPath.from_string(keyp)
         return self.decent_keyp(keyp)
 
+    @_writes
     def __setitem__(self, keyp, item):
         if isinstance(keyp, str):
             keyp = KeyPath.from_string(keyp)
@@ -509,10 +3336,15 @@ class Project:
             assert isinstance(item, Abstraction), "Root must be of type Abstraction"
 
             self.abstractions = item
+            self._reset_indexes()
+
+            if self._journal is not None:
+                self._journal.set(keyp, item)
             return
 
         a = self.decent_keyp(keyp[:-1])
         alias = keyp[-1]
+        key = (*keyp[:-1], item.alias)
 
         if isinstance(item, Content):
             if a.content is None:
@@ -523,6 +3355,9 @@ class Project:
                     f"Alias mismatch ({alias} != {item.alias})", UserWarning
                     )
 
+            old = a.content.get(item.alias)
+            if old is not None:
+                self._detach(key, old)
             a.content[item.alias] = item
 
         elif isinstance(item, Abstraction):
@@ -534,11 +3369,16 @@ class Project:
                     f"Alias mismatch ({alias} != {item.alias})", UserWarning
                     )
 
+            old = a.next.get(item.alias)
+            if old is not None:
+                self._detach(key, old)
             a.next[item.alias] = item
 
         else:
             raise TypeError("Item must be of type Content or Abstraction")
 
+        self._attach(key, item)
+
     def __repr__(self):
         obj_repr = (
             f"{type(self).__name__}"
@@ -556,6 +3396,14 @@ class Project:
         return str_repr
 
 
+def _intern(s):
+    """Intern strings, pass anything else through"""
+
+    if isinstance(s, str):
+        return sys.intern(s)
+    return s
+
+
 class Content:
     """
     Args:
@@ -567,11 +3415,23 @@ class Content:
         exists: Existence indicator.
         desc: Description.
         kind: Binary, txt? Used if filename has no extension.
-        _hash: Hash to track file modification.
+        hash: Hash to track file modification.
+        signature: (size, mtime_ns, inode) of the file when it was
+            last hashed.
         tags: List of keyword identifiers.
         project: Associated project.
         ignore_keyp Do not consider keyp for fullpath.
+
+    Contents use slots.  `alias`, `source` and `kind` are interned
+    (if they are strings) and `cpath` is kept as given (usually a
+    string) until it is first accessed as a path.
     """
+
+    __slots__ = [
+        "alias", "filename", "_cpath", "keyp", "source", "exists", "desc",
+        "kind", "hash", "signature", "tags", "project", "ignore_keyp"
+        ]
+
     def __init__(
             self,
             alias: Optional[str] = None, /, *,
@@ -582,7 +3442,8 @@ class Content:
             exists: Optional[bool] = None,
             desc: Optional[str] = None,
             kind: Optional[str] = None,
-            # _hash:               ,
+            hash: Optional[str] = None,
+            signature: Optional[tuple] = None,
             tags: Optional[list] = None,
             project: Type["Project"] = None,
             ignore_keyp: bool = False
@@ -590,23 +3451,21 @@ class Content:
 
         if alias is None:
             alias = ""
-        self.alias = alias
+        self.alias = _intern(alias)
 
         if filename is None:
             filename = ""
         self.filename = filename
 
-        if cpath is None:
-            cpath = ""
-        self.cpath = pathlib.Path(cpath)
+        self.cpath = cpath
 
         if keyp is None:
-            keyp = []
+            keyp = ()
         self.keyp = KeyPath(keyp)
 
         if source is None:
             source = "home"
-        self.source = source
+        self.source = _intern(source)
 
         self.exists = exists
 
@@ -614,34 +3473,70 @@ class Content:
             desc = ""
         self.desc = desc
 
-        self.kind = kind
+        self.kind = _intern(kind)
 
-        if tags is None:
-            tags = []
-        self.tags = tags
+        self.hash = hash
+        if signature is not None:
+            signature = tuple(signature)
+        self.signature = signature
+
+        # Copied, contents created together must not share the list
+        self.tags = list(tags) if tags else []
 
         self.project = project
         self.ignore_keyp = ignore_keyp
 
+    @property
+    def cpath(self):
+        cpath = self._cpath
+        if not isinstance(cpath, pathlib.Path):
+            cpath = self._cpath = pathlib.Path(cpath)
+        return cpath
+
+    @cpath.setter
+    def cpath(self, value):
+        if not value:
+            value = "."
+        self._cpath = value
+
     @property
     def fullpath(self):
         if self.project is None:
             fullpath_ = pathlib.Path(
-                f"{os.path.expandvars(self.cpath)}/"
+                f"{_expandvars(self._cpath)}/"
                 f"{self.filename}"
                 )
         else:
-            if not self.ignore_keyp:
-                keyp_eval = self.project.eval_keyp(self.keyp)
-            else:
-                keyp_eval = ""
+            lock = self.project._lock
+            if lock is None:
+                return self._resolve_fullpath()
 
-            fullpath_ = pathlib.Path(
-                f"{os.path.expandvars(self.project.sources[self.source])}/"
-                f"{keyp_eval}/"
-                f"{os.path.expandvars(self.cpath)}/"
-                f"{self.filename}"
-                )
+            # Caching races with invalidation unless writers are held off
+            lock.acquire_read()
+            try:
+                return self._resolve_fullpath()
+            finally:
+                lock.release_read()
+
+        return fullpath_
+
+    def _resolve_fullpath(self):
+        cached = self.project._fullpath_cache.get((*self.keyp, self.alias))
+        if (cached is not None) and (cached[0] is self):
+            return cached[1]
+
+        if not self.ignore_keyp:
+            keyp_eval = self.project.eval_keyp(self.keyp)
+        else:
+            keyp_eval = ""
+
+        fullpath_ = pathlib.Path(
+            f"{_expandvars(self.project.sources[self.source])}/"
+            f"{keyp_eval}/"
+            f"{_expandvars(self._cpath)}/"
+            f"{self.filename}"
+            )
+        self.project._cache_fullpath(self, fullpath_)
 
         return fullpath_
 
@@ -656,6 +3551,8 @@ class Content:
             f"exists={self.exists!r}, "
             f"desc={self.desc!r}, "
             f"kind={self.kind!r}', "
+            f"hash={self.hash!r}, "
+            f"signature={self.signature!r}, "
             f"tags={self.tags!r}, "
             f"project={self.project.__repr__()}, "
             f"ignore_keyp={self.ignore_keyp!r})"
@@ -674,6 +3571,7 @@ class Content:
             f"    exists:       {self.exists!r}\n"
             f"    desc:         {self.desc!r}\n"
             f"    kind:         {self.kind!r}\n"
+            f"    hash:         {self.hash!r}\n"
             f"    tags:         {self.tags!r}\n"
             f"    project:      {self.project!s}\n"
             f"    ignore keyp:  {self.ignore_keyp!r}"
@@ -0,0 +1,256 @@
+"""Append-only journal of project modifications
+
+While a journal is open (see :meth:`indirect.Project.open_journal`),
+every modification made through the `Project` API is appended as one
+JSON record per line to ``<project file>.journal``:
+
+    {"op": "set", "key": [...], "content": {...}}
+    {"op": "set", "key": [...], "tree": {...}}
+    {"op": "rm", "key": [...], "type": "abstraction" | "content"}
+    {"op": "source", "name": ..., "value": ...}
+    {"op": "view", "name": ..., "value": ...}
+    {"op": "layout", "name": ..., "value": ...}
+
+`value` is `null` for deletions.  Records are flushed in batches and
+each batch is fsync'ed, at the latest `sync_interval` seconds after its
+first record and when the journal is closed or the interpreter exits.
+:meth:`indirect.Project.load` replays the
+journal on top of the project file (the checkpoint), and
+:meth:`indirect.Project.checkpoint` folds it into a fresh checkpoint.
+Replaying is idempotent, so a journal that was not truncated after a
+checkpoint (e.g. after a crash) can be replayed again safely.
+"""
+
+import json
+import os
+import pathlib
+import threading
+import warnings
+from weakref import finalize, proxy
+
+from . import indirect
+
+
+SUFFIX = ".journal"
+
+
+def path_for(file):
+    """Journal file belonging to a project file"""
+
+    file = pathlib.Path(file)
+    return file.with_name(f"{file.name}{SUFFIX}")
+
+
+class Journal:
+    """Writer for a journal file
+
+    Args:
+        file: Journal file. Records are appended if it exists.
+
+    Keyword args:
+        sync_every: Flush and fsync after this many records.
+        sync_interval: Flush and fsync in the background at most this
+            many seconds after a record was appended. If `None`, only
+            full batches and closing sync.
+    """
+
+    def __init__(self, file, *, sync_every=256, sync_interval=1.):
+        self.file = pathlib.Path(file)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        self._encoder = indirect.ProjectEncoder()
+        self._fp = open(self.file, "a")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._timer = None
+        self.n_records = 0
+
+        # Sync at exit if the journal is not closed before
+        self._finalizer = finalize(self, _close, self._fp, self._lock)
+
+    def set(self, key, node):
+        """Record that a node was added or replaced"""
+
+        if isinstance(node, indirect.Content):
+            record = {"op": "set", "key": key, "content": node}
+        else:
+            record = {"op": "set", "key": key, "tree": node.to_dict()}
+        self.append(record)
+
+    def remove(self, key, node):
+        """Record that a node was removed"""
+
+        if isinstance(node, indirect.Content):
+            kind = "content"
+        else:
+            kind = "abstraction"
+        self.append({"op": "rm", "key": key, "type": kind})
+
+    def assign(self, kind, name, value):
+        """Record that a source, view or layout was set or deleted"""
+
+        try:
+            self.append({"op": kind, "name": name, "value": value})
+        except TypeError as error:
+            warnings.warn(f"{kind} {name!r} not journaled: {error}")
+
+    def append(self, record):
+        """Append a record and sync if a batch is complete"""
+
+        # Encode first, so that unserialisable records leave no trace
+        line = self._encoder.encode(record)
+
+        # Readers of threadsafe projects may append concurrently
+        with self._lock:
+            self._fp.write(f"{line}\n")
+            self._pending += 1
+            self.n_records += 1
+
+            if self._pending >= self.sync_every:
+                self._sync()
+            elif (self._timer is None) and (self.sync_interval is not None):
+                self._timer = threading.Timer(self.sync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def sync(self):
+        """Flush pending records to disk"""
+
+        with self._lock:
+            if not self._fp.closed:
+                self._sync()
+
+    def _sync(self):
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._pending = 0
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def truncate(self):
+        """Drop all records, e.g. after a checkpoint"""
+
+        with self._lock:
+            self._fp.truncate(0)
+            self._fp.seek(0)
+            self._sync()
+            self.n_records = 0
+
+    def close(self):
+        with self._lock:
+            if not self._fp.closed:
+                self._sync()
+        self._finalizer()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self.file)!r})"
+
+
+def _close(fp, lock):
+    with lock:
+        if not fp.closed:
+            fp.flush()
+            os.fsync(fp.fileno())
+            fp.close()
+
+
+def replay(project, file):
+    """Apply the records of a journal file to a project
+
+    A truncated last line (from an interrupted write) is ignored.
+
+    Returns:
+        Number of applied records
+    """
+
+    with open(file) as fp:
+        return replay_lines(project, fp)
+
+
+def replay_lines(project, lines):
+    """Apply journal records given as lines of JSON
+
+    Records for nodes whose parent no longer exists (e.g. removed by
+    another writer of a shared journal) are skipped with a warning.
+
+    Returns:
+        Number of applied records
+    """
+
+    decoder = indirect.ProjectDecoder(project=project._proxy)
+    n_applied = 0
+
+    for line in lines:
+        try:
+            record = json.loads(line, object_hook=decoder)
+        except json.JSONDecodeError:
+            if line.endswith("\n"):
+                raise
+            break
+
+        try:
+            apply(project, record)
+        except LookupError as error:
+            warnings.warn(
+                f"Skipped journal record {record['op']!r} "
+                f"for {record.get('key')!r}: {error}"
+                )
+            continue
+        n_applied += 1
+
+    return n_applied
+
+
+def apply(project, record):
+    op = record["op"]
+
+    if op == "set":
+        key = indirect.KeyPath(record["key"])
+        if "content" in record:
+            node = record["content"]
+        else:
+            node = indirect.Abstraction.from_dict(record["tree"])
+            if key:
+                node.previous = proxy(project.decent_keyp(key[:-1]))
+        project[key] = node
+
+    elif op == "rm":
+        key = indirect.KeyPath(record["key"])
+        try:
+            parent = project.decent_keyp(key[:-1])
+        except LookupError:
+            return
+        if not isinstance(parent, indirect.Abstraction):
+            return
+
+        kind = record.get("type")
+        if kind == "content":
+            candidates = (parent.content,)
+        elif kind == "abstraction":
+            candidates = (parent.next,)
+        else:
+            # Records written before the type was recorded
+            candidates = (parent.content, parent.next)
+
+        for children in candidates:
+            if (children is not None) and (key[-1] in children):
+                project._detach(key, children[key[-1]])
+                del children[key[-1]]
+                break
+
+    elif op in ("source", "view", "layout"):
+        mapping = {
+            "source": project.sources,
+            "view": project.views,
+            "layout": project.layouts,
+            }[op]
+        if record["value"] is None:
+            mapping.pop(record["name"], None)
+        else:
+            mapping[record["name"]] = record["value"]
+
+    else:
+        raise ValueError(f"Unknown journal operation {op!r}")
@@ -0,0 +1,277 @@
+"""Project files shared between concurrent processes
+
+Many processes (e.g. cluster jobs) can modify the same project file
+through :obj:`SharedProject`.  Instead of rewriting the file, each
+process buffers its modifications as journal records (see
+:mod:`indirect.journal`) and :meth:`SharedProject.commit` appends them
+to the journal next to the file while holding an exclusive advisory
+lock (``fcntl.flock`` on ``<file>.lock``).  The lock is only held for
+the append, so commits cost time proportional to their own changes.
+
+Records of other processes are merged by :meth:`SharedProject.refresh`
+(and on load).  Records apply in commit order, so concurrent
+modifications of different nodes all persist and modifications of the
+same node resolve to the last commit.  :meth:`SharedProject.checkpoint`
+folds the journal into the project file.
+"""
+
+from contextlib import contextmanager
+import os
+import pathlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from . import indirect
+from . import journal
+
+
+LOCK_SUFFIX = ".lock"
+
+
+class _Deltas(journal.Journal):
+    """Journal records buffered in memory until they are committed"""
+
+    def __init__(self):
+        self._encoder = indirect.ProjectEncoder()
+        self.lines = []
+
+    def append(self, record):
+        self.lines.append(f"{self._encoder.encode(record)}\n")
+
+    @property
+    def n_records(self):
+        return len(self.lines)
+
+    def sync(self):
+        pass
+
+    def truncate(self):
+        self.lines.clear()
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"{type(self).__name__}(n_records={self.n_records!r})"
+
+
+class SharedProject(indirect.Project):
+    """Project whose file is modified by many processes concurrently
+
+    Modifications through the `Project` API are kept locally and
+    published with :meth:`commit`.  :meth:`save` to the project file
+    commits.  Abstractions or contents modified in place need to be
+    assigned again (`project[keyp] = node`) to be committed.
+
+    Args:
+        alias: Name of the project.
+
+    Keyword args:
+        file: Shared project file. It is created on the first
+            :meth:`commit` if it does not exist.
+        threadsafe: See :obj:`indirect.Project`.
+    """
+
+    def __init__(self, alias=None, /, *, file=None, threadsafe=False):
+        if fcntl is None:
+            raise NotImplementedError(
+                "Shared projects require fcntl (POSIX systems)"
+                )
+
+        super().__init__(alias, threadsafe=threadsafe)
+        self._journal = _Deltas()
+
+        # Identity (inode) and read position of the shared journal
+        self._journal_inode = None
+        self._journal_offset = 0
+
+        if file is not None:
+            self.file = pathlib.Path(file)
+            if self.file.is_file():
+                self.load(self.file)
+
+    @property
+    def n_pending(self):
+        """Number of modifications not committed yet"""
+
+        return self._journal.n_records
+
+    @contextmanager
+    def _locked(self, operation):
+        file = self.file
+        with open(file.with_name(f"{file.name}{LOCK_SUFFIX}"), "a") as fp:
+            fcntl.flock(fp, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+
+    def load(self, file, reinit=False, *, fmt=None):
+        """Load the project file and merge the shared journal
+
+        See :meth:`indirect.Project.load`.
+        """
+
+        self.file = pathlib.Path(file)
+        with self._locked(fcntl.LOCK_SH):
+            super().load(file, reinit=reinit, fmt=fmt)
+            self._journal_inode, self._journal_offset = self._journal_end()
+
+    def _journal_end(self):
+        try:
+            stat = os.stat(journal.path_for(self.file))
+        except FileNotFoundError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    @indirect._writes
+    def refresh(self):
+        """Merge modifications committed by other processes
+
+        Uncommitted local modifications are re-applied on top.
+
+        Returns:
+            `True` if anything was merged
+        """
+
+        with self._locked(fcntl.LOCK_SH):
+            return self._pull()
+
+    def _pull(self):
+        """Replay new records of the shared journal, lock held"""
+
+        inode, size = self._journal_end()
+        if (inode == self._journal_inode) and (size == self._journal_offset):
+            return False
+
+        pending, self._journal = self._journal, None
+        try:
+            if inode != self._journal_inode:
+                # Checkpointed by another process, reinit resets alias
+                alias = self.alias
+                indirect.Project.load(self, self.file, reinit=True)
+                self.alias = alias
+            else:
+                with open(journal.path_for(self.file)) as fp:
+                    fp.seek(self._journal_offset)
+                    journal.replay_lines(self, fp)
+
+            journal.replay_lines(self, pending.lines)
+        finally:
+            self._journal = pending
+
+        self._journal_inode, self._journal_offset = inode, size
+        return True
+
+    @indirect._writes
+    def commit(self):
+        """Publish local modifications to the shared journal
+
+        Returns:
+            Number of committed records
+        """
+
+        if self.file is None:
+            raise ValueError("Project has no file to commit to")
+
+        pending = self._journal
+        if not pending.lines:
+            return 0
+
+        if not self.file.exists():
+            self.checkpoint()
+            return 0
+
+        with self._locked(fcntl.LOCK_EX):
+            up_to_date = self._journal_end() == (
+                self._journal_inode, self._journal_offset
+                )
+
+            with open(journal.path_for(self.file), "a") as fp:
+                fp.write("".join(pending.lines))
+                fp.flush()
+                os.fsync(fp.fileno())
+
+            if up_to_date:
+                # Nothing to merge in between, skip own records
+                self._journal_inode, self._journal_offset = (
+                    self._journal_end()
+                    )
+
+        n_committed = pending.n_records
+        pending.truncate()
+
+        return n_committed
+
+    @indirect._writes
+    def checkpoint(self, *, fmt=None):
+        """Merge and commit, then fold the journal into the project file
+
+        Other processes reload the project file on their next
+        :meth:`refresh`.
+
+        Keyword args:
+            fmt: File format, see :meth:`indirect.Project.save`.
+        """
+
+        if self.file is None:
+            raise ValueError("Project has no file to checkpoint to")
+
+        file = self.file
+        with self._locked(fcntl.LOCK_EX):
+            self._pull()
+
+            pending, self._journal = self._journal, None
+            try:
+                tmp = file.with_name(f"{file.name}.tmp")
+                indirect.Project.save(
+                    self, tmp, fmt=self._check_fmt(file, fmt)
+                    )
+                os.replace(tmp, file)
+
+                # Replace the journal, so that readers notice
+                journal_file = journal.path_for(file)
+                tmp.write_text("")
+                os.replace(tmp, journal_file)
+            finally:
+                self._journal = pending
+                self.file = file
+                self.sources._sources["home"] = file.parent
+
+            pending.truncate()
+            self._journal_inode, self._journal_offset = self._journal_end()
+
+    def save(self, file=None, *, fmt=None):
+        """Commit, or save a copy to another file
+
+        Args:
+            file: If `None` or the shared project file, modifications
+                are committed (see :meth:`commit`). Otherwise, see
+                :meth:`indirect.Project.save`.
+        """
+
+        if (file is not None) and (self.file is None):
+            self.file = pathlib.Path(file)
+
+        if (file is None) or (pathlib.Path(file) == self.file):
+            self.commit()
+            return
+
+        # Saving a copy is no modification of the shared project
+        shared_file = self.file
+        pending, self._journal = self._journal, None
+        try:
+            super().save(file, fmt=fmt)
+        finally:
+            self._journal = pending
+            self.file = shared_file
+            self.sources._sources["home"] = shared_file.parent
+
+    def open_journal(self, *args, **kwargs):
+        raise TypeError("Shared projects manage their journal")
+
+    def close_journal(self):
+        raise TypeError("Shared projects manage their journal")
@@ -0,0 +1,321 @@
+"""Immutable project snapshots with structural sharing
+
+A snapshot (see :meth:`indirect.Project.snapshot`) freezes the
+abstraction tree into immutable nodes.  Every abstraction remembers its
+frozen node until it or something below it is modified through the
+`Project` API, so consecutive snapshots share all unchanged subtrees and
+taking a snapshot only rebuilds the modified nodes and their ancestors.
+The same sharing makes :func:`diff` skip identical subtrees.
+"""
+
+from collections import namedtuple
+import copy
+import time
+from types import MappingProxyType
+from weakref import proxy
+
+from . import indirect
+
+
+_EMPTY = MappingProxyType({})
+
+
+FrozenAbstraction = namedtuple(
+    "FrozenAbstraction", ["alias", "path", "next", "content"]
+    )
+FrozenAbstraction.__doc__ = """Immutable abstraction
+
+`next` and `content` are read-only mappings of aliases to frozen
+abstractions and contents.
+"""
+
+FrozenContent = namedtuple(
+    "FrozenContent", [
+        "alias", "filename", "cpath", "keyp", "source", "exists", "desc",
+        "kind", "hash", "signature", "tags", "ignore_keyp"
+        ]
+    )
+FrozenContent.__doc__ = "Immutable content (see :obj:`indirect.Content`)"
+
+
+def _freeze_content(c):
+    return FrozenContent(
+        c.alias, c.filename, f"{c._cpath!s}", c.keyp, c.source, c.exists,
+        c.desc, c.kind, c.hash, c.signature, tuple(c.tags), c.ignore_keyp
+        )
+
+
+def _freeze(a, epoch):
+    memo = a._frozen
+    if (memo is not None) and (memo[0] == epoch):
+        return memo[1]
+
+    next_ = (
+        MappingProxyType({
+            alias: _freeze(a_, epoch) for alias, a_ in a.next.items()
+            })
+        if a.next else _EMPTY
+        )
+    content = (
+        MappingProxyType({
+            alias: _freeze_content(c) for alias, c in a.content.items()
+            })
+        if a.content else _EMPTY
+        )
+
+    frozen = FrozenAbstraction(a.alias, f"{a.path!s}", next_, content)
+    a._frozen = (epoch, frozen)
+
+    return frozen
+
+
+def _thaw(frozen, project, previous=None):
+    a = indirect.Abstraction(frozen.alias, path=frozen.path)
+    if previous is not None:
+        a.previous = proxy(previous)
+
+    if frozen.content:
+        a.content = {
+            alias: indirect.Content(
+                alias,
+                filename=c.filename, cpath=c.cpath, keyp=c.keyp,
+                source=c.source, exists=c.exists, desc=c.desc, kind=c.kind,
+                hash=c.hash, signature=c.signature, tags=list(c.tags),
+                project=project, ignore_keyp=c.ignore_keyp
+                )
+            for alias, c in frozen.content.items()
+            }
+
+    if frozen.next:
+        a.next = {
+            alias: _thaw(a_, project, previous=a)
+            for alias, a_ in frozen.next.items()
+            }
+
+    return a
+
+
+class Snapshot:
+    """Immutable version of a project
+
+    Args:
+        root: Frozen root abstraction.
+        sources: Mapping of source names to paths.
+        views: Mapping of view names to views.
+        layouts: Layout states (see :meth:`indirect.Project.populate`).
+    """
+
+    def __init__(self, root, sources=None, views=None, layouts=None):
+        self.root = root
+        self.sources = MappingProxyType(dict(sources or {}))
+        self.views = MappingProxyType(dict(views or {}))
+        self.layouts = MappingProxyType(dict(layouts or {}))
+        self.created = time.time()
+
+    @classmethod
+    def of(cls, project):
+        """Take a snapshot of a project"""
+
+        views = {
+            name: view if isinstance(view, indirect.LazyView)
+            else tuple(view)
+            for name, view in project.views.items()
+            }
+
+        return cls(
+            _freeze(project.abstractions, project._frozen_epoch),
+            sources=project.sources,
+            views=views,
+            layouts=copy.deepcopy(project.layouts),
+            )
+
+    def __getitem__(self, keyp):
+        if isinstance(keyp, str):
+            keyp = indirect.KeyPath.from_string(keyp)
+
+        node = self.root
+        for key in keyp:
+            try:
+                node = node.next[key]
+            except (KeyError, AttributeError):
+                try:
+                    return node.content[key]
+                except (KeyError, AttributeError):
+                    raise LookupError("Invalid KeyPath")
+        return node
+
+    def walk(self):
+        """Iterate depth first over the frozen tree
+
+        Yields:
+            (keyp, node) tuples as :meth:`indirect.Abstraction.walk`
+        """
+
+        stack = [((), self.root)]
+        while stack:
+            keyp, a = stack.pop()
+            yield keyp, a
+
+            for alias, c in a.content.items():
+                yield (*keyp, alias), c
+
+            stack.extend(
+                ((*keyp, alias), a_)
+                for alias, a_ in reversed(a.next.items())
+                )
+
+    def diff(self, other):
+        """Changes from this snapshot to another, see :func:`diff`"""
+
+        return diff(self, other)
+
+    def to_project(self, project=None):
+        """Create a mutable project from this snapshot
+
+        Args:
+            project: Empty project to fill. If `None`, a new
+                :obj:`indirect.Project` is created.
+        """
+
+        if project is None:
+            project = indirect.Project()
+
+        project.sources.update(self.sources)
+        project.views.update({
+            name: view if isinstance(view, indirect.LazyView)
+            else list(view)
+            for name, view in self.views.items()
+            })
+        project.layouts.update(copy.deepcopy(dict(self.layouts)))
+        project.abstractions = _thaw(self.root, project._proxy)
+        project._reset_indexes()
+
+        return project
+
+    def save(self, file, *, fmt=None):
+        """Save the snapshot as project file
+
+        See :meth:`indirect.Project.save`.
+        """
+
+        self.to_project().save(file, fmt=fmt)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(root={self.root.alias!r})"
+
+    def __str__(self):
+        str_repr = (
+            f"{type(self).__name__}\n"
+            f"    root:     {self.root.alias!r}\n"
+            f"    created:  {time.ctime(self.created)}"
+            )
+        return str_repr
+
+
+class SnapshotDiff:
+    """Differences between two snapshots
+
+    Added or removed abstractions are reported once for their whole
+    subtree.
+
+    Args:
+        added: Key paths of added abstractions and contents.
+        removed: Key paths of removed abstractions and contents.
+        changed: Key paths of abstractions with a different path and of
+            contents with different attributes.
+        n_visited: Number of compared abstractions.
+    """
+
+    def __init__(self, added=None, removed=None, changed=None, n_visited=0):
+        if added is None:
+            added = []
+        self.added = added
+
+        if removed is None:
+            removed = []
+        self.removed = removed
+
+        if changed is None:
+            changed = []
+        self.changed = changed
+
+        self.n_visited = n_visited
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        obj_repr = (
+            f"{type(self).__name__}("
+            f"added={self.added!r}, "
+            f"removed={self.removed!r}, "
+            f"changed={self.changed!r}, "
+            f"n_visited={self.n_visited!r})"
+            )
+        return obj_repr
+
+    def __str__(self):
+        str_repr = (
+            f"{type(self).__name__}\n"
+            f"    added:    {len(self.added)!r}\n"
+            f"    removed:  {len(self.removed)!r}\n"
+            f"    changed:  {len(self.changed)!r}\n"
+            f"    visited:  {self.n_visited!r}"
+            )
+        return str_repr
+
+
+def diff(old, new):
+    """Compare two snapshots
+
+    Subtrees shared between the snapshots are skipped without being
+    visited, so comparing snapshots of the same project costs time
+    proportional to the modified part.
+
+    Args:
+        old: Snapshot (or frozen abstraction) to compare from.
+        new: Snapshot (or frozen abstraction) to compare to.
+
+    Returns:
+        :obj:`SnapshotDiff`
+    """
+
+    if isinstance(old, Snapshot):
+        old = old.root
+    if isinstance(new, Snapshot):
+        new = new.root
+
+    report = SnapshotDiff()
+    KeyPath = indirect.KeyPath
+
+    stack = [((), old, new)]
+    while stack:
+        keyp, a, b = stack.pop()
+        if a is b:
+            continue
+
+        report.n_visited += 1
+        if a.path != b.path:
+            report.changed.append(KeyPath(keyp))
+
+        if a.content is not b.content:
+            for alias in a.content.keys() - b.content.keys():
+                report.removed.append(KeyPath((*keyp, alias)))
+            for alias in b.content.keys() - a.content.keys():
+                report.added.append(KeyPath((*keyp, alias)))
+            for alias in a.content.keys() & b.content.keys():
+                if a.content[alias] != b.content[alias]:
+                    report.changed.append(KeyPath((*keyp, alias)))
+
+        for alias in a.next.keys() - b.next.keys():
+            report.removed.append(KeyPath((*keyp, alias)))
+        for alias in b.next.keys() - a.next.keys():
+            report.added.append(KeyPath((*keyp, alias)))
+        for alias in a.next.keys() & b.next.keys():
+            stack.append(((*keyp, alias), a.next[alias], b.next[alias]))
+
+    report.added.sort()
+    report.removed.sort()
+    report.changed.sort()
+
+    return report
@@ -0,0 +1,946 @@
+"""SQLite storage backend for projects
+
+A :obj:`SqliteProject` keeps its abstraction tree, sources, views and
+layouts in a SQLite database instead of in memory.  Abstractions are
+fetched row by row when they are accessed through the usual
+:obj:`indirect.Project` API (e.g. `project["a.b.report"]`,
+:meth:`indirect.Project.eval_keyp`), and a bounded LRU cache keeps the
+most recently used ones alive.  Contents of an abstraction are fetched
+together on first access.
+
+Schema::
+
+    nodes     id, parent, alias, path       unique on (parent, alias)
+    contents  node, alias, position, ...    clustered by (node, alias),
+                                            indexed by kind
+    tags      node, alias, position, tag    clustered by (node, alias),
+                                            indexed by tag
+    meta      kind, name, value             sources, views and layouts
+                                            as JSON
+
+Children are ordered by id and contents by position within their
+abstraction, so that both keep the order of a :obj:`indirect.Project`;
+a replaced child keeps the id of the one it replaces.  Modifications
+are written to the database as they happen, buffered into batched
+inserts, and run in one transaction until :meth:`SqliteProject.commit`.
+"""
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import json
+import pathlib
+import sqlite3
+import threading
+import warnings
+
+from . import indirect
+
+
+VERSION = 1
+ROOT = 0
+
+# SQLite page cache in KiB
+PAGE_CACHE = 1 << 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    parent INTEGER,
+    alias TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS nodes_parent_alias ON nodes (parent, alias);
+CREATE TABLE IF NOT EXISTS contents (
+    node INTEGER NOT NULL,
+    alias TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    filename TEXT,
+    cpath TEXT,
+    keyp TEXT,
+    source TEXT,
+    "exists" INTEGER,
+    desc TEXT,
+    kind TEXT,
+    hash TEXT,
+    signature TEXT,
+    ignore_keyp INTEGER,
+    PRIMARY KEY (node, alias)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS contents_kind ON contents (kind);
+CREATE TABLE IF NOT EXISTS tags (
+    node INTEGER NOT NULL,
+    alias TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (node, alias, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE TABLE IF NOT EXISTS meta (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (kind, name)
+);
+"""
+
+# Per connection arguments of find, too many for host parameters
+_TEMP_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS find_roots (id INTEGER PRIMARY KEY);
+CREATE TEMP TABLE IF NOT EXISTS find_exact (
+    node INTEGER NOT NULL,
+    alias TEXT NOT NULL,
+    PRIMARY KEY (node, alias)
+) WITHOUT ROWID;
+"""
+
+_INSERT_NODE = (
+    "INSERT INTO nodes (id, parent, alias, path) VALUES (?, ?, ?, ?)"
+    )
+_CONTENT_FIELDS = (
+    "filename", "cpath", "keyp", "source", "\"exists\"", "desc", "kind",
+    "hash", "signature", "ignore_keyp"
+    )
+# Replaced contents keep their position
+_INSERT_CONTENT = (
+    f"INSERT INTO contents (node, alias, position, "
+    f"{', '.join(_CONTENT_FIELDS)}) "
+    f"VALUES ({', '.join('?' * (len(_CONTENT_FIELDS) + 3))}) "
+    f"ON CONFLICT (node, alias) DO UPDATE SET "
+    f"{', '.join(f'{f} = excluded.{f}' for f in _CONTENT_FIELDS)}"
+    )
+_INSERT_TAG = (
+    "INSERT INTO tags (node, alias, position, tag) VALUES (?, ?, ?, ?)"
+    )
+
+_SUBTREE = """
+WITH RECURSIVE subtree(id) AS (
+    VALUES (?)
+    UNION ALL
+    SELECT nodes.id FROM nodes JOIN subtree ON nodes.parent = subtree.id
+)
+SELECT id FROM subtree
+"""
+
+
+class Store:
+    """Rows of a project in a SQLite database
+
+    Args:
+        database: Path to the database file, or ":memory:".
+
+    Keyword args:
+        cache_size: Maximum number of abstractions kept in the LRU
+            cache.
+        batch_size: Number of buffered rows that triggers a batched
+            insert.
+    """
+
+    def __init__(self, database, *, cache_size=4096, batch_size=10000):
+        self.database = database
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.project = None
+
+        self.connection = sqlite3.connect(
+            str(database), check_same_thread=False
+            )
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute(f"PRAGMA cache_size = -{PAGE_CACHE}")
+
+        version, = self.connection.execute("PRAGMA user_version").fetchone()
+        if version not in (0, VERSION):
+            raise ValueError(
+                f"Unsupported project database version {version}"
+                )
+        self.connection.executescript(SCHEMA)
+        self.connection.executescript(_TEMP_SCHEMA)
+        self.connection.execute(f"PRAGMA user_version = {VERSION}")
+
+        if self.connection.execute(
+                "SELECT 1 FROM nodes WHERE id = ?", (ROOT,)
+                ).fetchone() is None:
+            self.connection.execute(_INSERT_NODE, (ROOT, None, "root", ""))
+
+        next_id, = self.connection.execute(
+            "SELECT MAX(id) + 1 FROM nodes"
+            ).fetchone()
+        self._next_id = next_id
+
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._pending_nodes = {}
+        self._pending_contents = []
+        self._pending_content_nodes = set()
+        self._pending_tags = []
+        self._pending_untags = []
+
+    def flush(self):
+        """Insert buffered rows"""
+
+        with self._lock:
+            if self._pending_nodes:
+                self.connection.executemany(
+                    _INSERT_NODE,
+                    (
+                        (id_, parent, alias, path)
+                        for (parent, alias), (id_, path)
+                        in self._pending_nodes.items()
+                        )
+                    )
+                self._pending_nodes.clear()
+
+            if self._pending_untags:
+                self.connection.executemany(
+                    "DELETE FROM tags WHERE node = ? AND alias = ?",
+                    self._pending_untags
+                    )
+                self._pending_untags.clear()
+
+            if self._pending_contents:
+                self.connection.executemany(
+                    _INSERT_CONTENT, self._pending_contents
+                    )
+                self._pending_contents.clear()
+                self._pending_content_nodes.clear()
+
+            if self._pending_tags:
+                self.connection.executemany(_INSERT_TAG, self._pending_tags)
+                self._pending_tags.clear()
+
+    def _query(self, sql, parameters=()):
+        self.flush()
+        return self.connection.execute(sql, parameters)
+
+    def commit(self):
+        with self._lock:
+            self.flush()
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            self.connection.close()
+
+    def _buffered(self):
+        n_pending = (
+            len(self._pending_nodes) + len(self._pending_contents)
+            + len(self._pending_tags)
+            )
+        if n_pending >= self.batch_size:
+            self.flush()
+
+    def _cached(self, key, node):
+        cache = self._cache
+        cache[key] = node
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return node
+
+    def _node(self, id_, alias, path, previous):
+        a = _StoredAbstraction.__new__(_StoredAbstraction)
+        _alias_slot.__set__(a, alias)
+        if not isinstance(path, pathlib.Path):
+            path = pathlib.Path(path)
+        _path_slot.__set__(a, path)
+        _previous_slot.__set__(a, previous)
+        _next_slot.__set__(a, None)
+        _content_slot.__set__(a, None)
+        a._frozen = None
+        a._store = self
+        a._id = id_
+        return a
+
+    def root(self):
+        with self._lock:
+            alias, path = self._query(
+                "SELECT alias, path FROM nodes WHERE id = ?", (ROOT,)
+                ).fetchone()
+            return self._node(ROOT, alias, path, None)
+
+    def child(self, parent, alias):
+        """Child abstraction of a stored abstraction, or `None`
+
+        Misses are cached as well.
+        """
+
+        key = (parent._id, alias)
+        with self._lock:
+            try:
+                a = self._cache[key]
+            except KeyError:
+                pass
+            else:
+                self._cache.move_to_end(key)
+                return a
+
+            # Buffered and stored rows are disjoint, so point lookups
+            # do not need to flush
+            try:
+                id_, path = self._pending_nodes[key]
+            except KeyError:
+                row = self.connection.execute(
+                    "SELECT id, path FROM nodes "
+                    "WHERE parent = ? AND alias = ?", key
+                    ).fetchone()
+                if row is None:
+                    return self._cached(key, None)
+                id_, path = row
+
+            return self._cached(key, self._node(id_, alias, path, parent))
+
+    def children(self, parent):
+        """All child abstractions of a stored abstraction"""
+
+        children = {}
+        with self._lock:
+            cache = self._cache
+            for id_, alias, path in self._query(
+                    "SELECT id, alias, path FROM nodes WHERE parent = ? "
+                    "ORDER BY id", (parent._id,)):
+                key = (parent._id, alias)
+                a = cache.get(key)
+                if a is None:
+                    a = self._cached(key, self._node(id_, alias, path, parent))
+                children[alias] = a
+
+        return children
+
+    def n_children(self, parent):
+        with self._lock:
+            n, = self._query(
+                "SELECT COUNT(*) FROM nodes WHERE parent = ?", (parent._id,)
+                ).fetchone()
+            return n
+
+    def put_node(self, parent, a):
+        """Store abstraction `a` (and its subtree) under `parent`
+
+        Replaces the child with the same alias.  A stored abstraction
+        assigned to its own place only updates its path.
+        """
+
+        key = (parent._id, a.alias)
+        with self._lock:
+            old = self.child(parent, a.alias)
+            if (old is not None) and isinstance(a, _StoredAbstraction) and (
+                    a._store is self) and (a._id == old._id):
+                self.flush()
+                self.connection.execute(
+                    "UPDATE nodes SET path = ? WHERE id = ?",
+                    (f"{a.path!s}", a._id)
+                    )
+                _path_slot.__set__(old, a.path)
+                return old
+
+            if isinstance(a, _StoredAbstraction) and (a._store is self):
+                # Copy the subtree before it may be deleted below
+                a = indirect.Abstraction.from_dict(a.to_dict())
+
+            id_ = None
+            if old is not None:
+                # The replacement takes the place of the old child
+                id_ = old._id
+                self.delete_node(parent, a.alias)
+
+            ids = self._tree_rows(parent, a, id_)
+            id_ = next(ids)
+            for _ in ids:
+                self._buffered()
+            self._buffered()
+
+            return self._cached(key, self._node(id_, a.alias, a.path, parent))
+
+    def _tree_rows(self, parent, a, id_=None):
+        """Buffer the rows of a subtree, yielding after each node
+
+        The root of the subtree gets `id_` if given.
+        """
+
+        parent_keyp = parent._keyp()
+        stack = [(parent._id, parent_keyp, a)]
+        while stack:
+            parent_id, keyp, a = stack.pop()
+            keyp = (*keyp, a.alias)
+            if id_ is None:
+                id_ = self._next_id
+                self._next_id += 1
+            self._pending_nodes[(parent_id, a.alias)] = (id_, f"{a.path!s}")
+
+            if a.content:
+                for i, c in enumerate(a.content.values()):
+                    self._buffer_content(id_, keyp, c, i)
+
+            if a.next:
+                stack.extend((id_, keyp, a_) for a_ in a.next.values())
+
+            yield id_
+            id_ = None
+
+    def delete_node(self, parent, alias):
+        key = (parent._id, alias)
+        with self._lock:
+            row = self._query(
+                "SELECT id FROM nodes WHERE parent = ? AND alias = ?", key
+                ).fetchone()
+            self._cache.pop(key, None)
+            if row is None:
+                return
+
+            ids = [(id_,) for id_, in self.connection.execute(_SUBTREE, row)]
+
+            # Evict cached descendants, their rows are gone
+            deleted = {id_ for id_, in ids}
+            for key_ in [key_ for key_ in self._cache if key_[0] in deleted]:
+                del self._cache[key_]
+
+            self.connection.executemany("DELETE FROM tags WHERE node = ?", ids)
+            self.connection.executemany(
+                "DELETE FROM contents WHERE node = ?", ids
+                )
+            self.connection.executemany("DELETE FROM nodes WHERE id = ?", ids)
+
+    def contents(self, node):
+        """Contents of a stored abstraction"""
+
+        keyp = indirect.KeyPath(node._keyp())
+        with self._lock:
+            if node._id in self._pending_content_nodes:
+                self.flush()
+
+            tags = {}
+            for alias, tag in self.connection.execute(
+                    "SELECT alias, tag FROM tags WHERE node = ? "
+                    "ORDER BY alias, position", (node._id,)):
+                tags.setdefault(alias, []).append(tag)
+
+            contents = _Contents(node, keyp)
+            for position, *row in self.connection.execute(
+                    f"SELECT position, alias, {', '.join(_CONTENT_FIELDS)} "
+                    f"FROM contents WHERE node = ? ORDER BY position",
+                    (node._id,)):
+                c = self._content(row, keyp, tags.get(row[0]))
+                dict.__setitem__(contents, c.alias, c)
+                contents._next_position = position + 1
+
+            return contents
+
+    def _content(self, row, keyp, tags):
+        (alias, filename, cpath, keyp_, source, exists, desc, kind, hash_,
+         signature, ignore_keyp) = row
+
+        if keyp_ is not None:
+            keyp = json.loads(keyp_)
+            if keyp is not None:
+                keyp = indirect.KeyPath(keyp)
+
+        return indirect.Content(
+            alias,
+            filename=filename,
+            cpath=cpath,
+            keyp=keyp,
+            source=source,
+            exists=None if exists is None else bool(exists),
+            desc=desc,
+            kind=kind,
+            hash=hash_,
+            signature=(
+                tuple(json.loads(signature))
+                if signature is not None else None
+                ),
+            tags=tags,
+            project=self.project,
+            ignore_keyp=bool(ignore_keyp)
+            )
+
+    def _buffer_content(self, node_id, keyp, c, position):
+        c_keyp = c.keyp
+        if (c_keyp is not None) and (c_keyp == keyp):
+            c_keyp = None
+        else:
+            c_keyp = json.dumps(
+                list(c_keyp) if c_keyp is not None else None
+                )
+
+        self._pending_contents.append((
+            node_id, c.alias, position, c.filename, f"{c._cpath!s}", c_keyp,
+            c.source, None if c.exists is None else int(c.exists), c.desc,
+            c.kind, c.hash,
+            json.dumps(c.signature) if c.signature is not None else None,
+            int(c.ignore_keyp)
+            ))
+        self._pending_content_nodes.add(node_id)
+        if c.tags:
+            self._pending_tags.extend(
+                (node_id, c.alias, i, t) for i, t in enumerate(c.tags)
+                )
+
+    def put_content(self, node, keyp, c, position, replace=True):
+        """Store content `c` in a stored abstraction at `keyp`
+
+        Set `replace` if a content with the same alias may be stored,
+        which keeps its position.
+        """
+
+        with self._lock:
+            if replace:
+                # Buffered tag deletions run before buffered inserts
+                if node._id in self._pending_content_nodes:
+                    self.flush()
+                self._pending_untags.append((node._id, c.alias))
+            self._buffer_content(node._id, keyp, c, position)
+            self._buffered()
+
+    def delete_content(self, node, alias):
+        with self._lock:
+            self.flush()
+            for table in ("tags", "contents"):
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE node = ? AND alias = ?",
+                    (node._id, alias)
+                    )
+
+    def replace_root(self, a):
+        """Replace the whole abstraction tree"""
+
+        with self._lock:
+            self.flush()
+            self._cache.clear()
+            for table in ("tags", "contents", "nodes"):
+                self.connection.execute(f"DELETE FROM {table}")
+
+            self.connection.execute(
+                _INSERT_NODE, (ROOT, None, a.alias, f"{a.path!s}")
+                )
+            root = self.root()
+
+            if a.content:
+                for i, c in enumerate(a.content.values()):
+                    self._buffer_content(ROOT, (), c, i)
+
+            if a.next:
+                for a_ in a.next.values():
+                    for _ in self._tree_rows(root, a_):
+                        self._buffered()
+
+            self.flush()
+            return root
+
+    def keyp(self, node_id, memo=None):
+        """KeyPath of a node id"""
+
+        if memo is None:
+            memo = {}
+
+        keys = []
+        id_ = node_id
+        while id_ != ROOT:
+            try:
+                keyp = memo[id_]
+            except KeyError:
+                parent, alias = self._query(
+                    "SELECT parent, alias FROM nodes WHERE id = ?", (id_,)
+                    ).fetchone()
+                keys.append((id_, alias))
+                id_ = parent
+            else:
+                break
+        else:
+            keyp = ()
+
+        for id_, alias in reversed(keys):
+            keyp = memo[id_] = (*keyp, alias)
+
+        return keyp
+
+    def find(
+            self, *, tags=(), kind=None, source=None, alias=None,
+            roots=None, exact=()):
+        """(node id, alias) of contents matching all criteria
+
+        Keyword args:
+            roots: If given, only contents in the subtrees of these node
+                ids are returned, ...
+            exact: ... and contents with these (node id, alias).
+        """
+
+        conditions = []
+        parameters = []
+        sql = "SELECT node, alias FROM contents"
+
+        if roots is not None:
+            where = []
+            if roots:
+                sql = (
+                    "WITH RECURSIVE subtree(id) AS ("
+                    "SELECT id FROM find_roots "
+                    "UNION ALL SELECT nodes.id FROM nodes "
+                    "JOIN subtree ON nodes.parent = subtree.id) "
+                    f"{sql}"
+                    )
+                where.append("node IN subtree")
+            if exact:
+                where.append(
+                    "(node, alias) IN (SELECT node, alias FROM find_exact)"
+                    )
+            conditions.append(f"({' OR '.join(where) or '0'})")
+        for field, value in (
+                ("kind", kind), ("source", source), ("alias", alias)):
+            if value is not None:
+                conditions.append(f"{field} = ?")
+                parameters.append(value)
+
+        for tag in tags:
+            conditions.append(
+                "(node, alias) IN (SELECT node, alias FROM tags WHERE tag = ?)"
+                )
+            parameters.append(tag)
+
+        if conditions:
+            sql = f"{sql} WHERE {' AND '.join(conditions)}"
+
+        with self._lock:
+            if roots is not None:
+                # Roots and exact keys of views go through temp tables
+                self.connection.execute("DELETE FROM find_roots")
+                self.connection.execute("DELETE FROM find_exact")
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO find_roots VALUES (?)",
+                    ((id_,) for id_ in roots)
+                    )
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO find_exact VALUES (?, ?)", exact
+                    )
+            return self._query(sql, parameters).fetchall()
+
+    def assign(self, kind, name, value):
+        """Store (or delete) a source, view or layout"""
+
+        with self._lock:
+            if value is None:
+                self.connection.execute(
+                    "DELETE FROM meta WHERE kind = ? AND name = ?",
+                    (kind, name)
+                    )
+                return
+
+            try:
+                value = json.dumps(value, cls=indirect.ProjectEncoder)
+            except TypeError as error:
+                warnings.warn(f"{kind} {name!r} not stored: {error}")
+                return
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (kind, name, value) "
+                "VALUES (?, ?, ?)", (kind, name, value)
+                )
+
+    def meta(self):
+        """Stored (kind, name, value) records"""
+
+        decoder = indirect.ProjectDecoder(project=self.project)
+        with self._lock:
+            rows = self._query(
+                "SELECT kind, name, value FROM meta ORDER BY rowid"
+                ).fetchall()
+
+        return [
+            (kind, name, json.loads(value, object_hook=decoder))
+            for kind, name, value in rows
+            ]
+
+    def clear(self):
+        """Drop all rows"""
+
+        with self._lock:
+            self.connection.execute("DELETE FROM meta")
+            self.replace_root(indirect.Abstraction("root"))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self.database)!r})"
+
+
+_alias_slot = indirect.Abstraction.alias
+_path_slot = indirect.Abstraction.path
+_previous_slot = indirect.Abstraction.previous
+_next_slot = indirect.Abstraction.next
+_content_slot = indirect.Abstraction.content
+
+
+class _StoredAbstraction(indirect.Abstraction):
+    """Abstraction backed by a row of a :obj:`Store`
+
+    Children are looked up in the store on access, contents are read
+    from the store on first access.  `previous` refers to the parent
+    strongly, so that parents evicted from the cache stay alive while a
+    child is used.
+    """
+
+    __slots__ = ["_store", "_id"]
+
+    def _keyp(self):
+        keyp = []
+        a = self
+        while a.previous is not None:
+            keyp.append(a.alias)
+            a = a.previous
+        return tuple(reversed(keyp))
+
+    def to_dict(self, depth=None):
+        dct = super().to_dict(depth)
+
+        # Contents are never None here, omit them where empty
+        stack = list(dct.values())
+        while stack:
+            d = stack.pop()
+            if not d.get("content", True):
+                del d["content"]
+            stack.extend(d.get("next", {}).values())
+
+        return dct
+
+    @property
+    def next(self):
+        return _Children(self)
+
+    @next.setter
+    def next(self, value):
+        children = _Children(self)
+        children.clear()
+        if value:
+            children.update(value)
+
+    @property
+    def content(self):
+        contents = _content_slot.__get__(self)
+        if contents is None:
+            contents = self._store.contents(self)
+            _content_slot.__set__(self, contents)
+        return contents
+
+    @content.setter
+    def content(self, value):
+        contents = self.content
+        contents.clear()
+        if value:
+            contents.update(value)
+
+
+class _Children(MutableMapping):
+    """Mapping of aliases to the children of a stored abstraction"""
+
+    __slots__ = ["_node"]
+
+    def __init__(self, node):
+        self._node = node
+
+    def __getitem__(self, alias):
+        node = self._node
+        a = node._store.child(node, alias)
+        if a is None:
+            raise KeyError(alias)
+        return a
+
+    def __setitem__(self, alias, a):
+        if alias != a.alias:
+            raise KeyError(f"Alias mismatch ({alias} != {a.alias})")
+        self._node._store.put_node(self._node, a)
+
+    def __delitem__(self, alias):
+        if alias not in self:
+            raise KeyError(alias)
+        self._node._store.delete_node(self._node, alias)
+
+    def _load(self):
+        return self._node._store.children(self._node)
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def keys(self):
+        return self._load().keys()
+
+    def values(self):
+        return self._load().values()
+
+    def items(self):
+        return self._load().items()
+
+    def clear(self):
+        for alias in list(self._load()):
+            del self[alias]
+
+    def __len__(self):
+        return self._node._store.n_children(self._node)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)!r})"
+
+
+class _Contents(dict):
+    """Contents of a stored abstraction, written through to the store"""
+
+    __slots__ = ["_node", "_keyp", "_next_position"]
+
+    def __init__(self, node, keyp):
+        super().__init__()
+        self._node = node
+        self._keyp = keyp
+        self._next_position = 0
+
+    def __setitem__(self, alias, c):
+        if alias != c.alias:
+            raise KeyError(f"Alias mismatch ({alias} != {c.alias})")
+        replace = alias in self
+        self._node._store.put_content(
+            self._node, self._keyp, c, self._next_position, replace=replace
+            )
+        if not replace:
+            self._next_position += 1
+        super().__setitem__(alias, c)
+
+    def __delitem__(self, alias):
+        super().__delitem__(alias)
+        self._node._store.delete_content(self._node, alias)
+
+    _MISSING = object()
+
+    def pop(self, alias, default=_MISSING):
+        if alias in self:
+            c = self[alias]
+            del self[alias]
+            return c
+        if default is self._MISSING:
+            raise KeyError(alias)
+        return default
+
+    def clear(self):
+        for alias in list(self):
+            del self[alias]
+
+    def update(self, *args, **kwargs):
+        for alias, c in dict(*args, **kwargs).items():
+            self[alias] = c
+
+
+class SqliteProject(indirect.Project):
+    """Project storing its tree, sources, views and layouts in SQLite
+
+    Opening a database with a stored project restores it.  Only the
+    rows touched by lookups are read, see :mod:`indirect.sqlite`.
+    Abstractions and contents added to the project are copied into the
+    database, so modify them through the project afterwards (e.g.
+    ``project["a.b"]``), not through the original objects.  In-place
+    modifications are stored after assigning the node again
+    (`project[keyp] = node`).  Changes are durable after
+    :meth:`commit`.
+
+    Args:
+        alias: Name of the project.
+
+    Keyword args:
+        database: Path to the database file, or ":memory:".
+        file: Project file to import into the database, replacing the
+            stored project.
+        cache_size: Maximum number of abstractions kept in memory.
+        threadsafe: See :obj:`indirect.Project`.
+    """
+
+    def __init__(
+            self, alias=None, /, *,
+            database=":memory:", file=None, cache_size=4096,
+            threadsafe=False):
+        store = getattr(self, "_store", None)
+        self._store = None
+        super().__init__(alias, threadsafe=threadsafe)
+
+        if store is None:
+            store = Store(database, cache_size=cache_size)
+            store.project = self._proxy
+            for kind, name, value in store.meta():
+                getattr(self, f"{kind}s")[name] = value
+        else:
+            # Reinitialised
+            store.clear()
+            store.project = self._proxy
+
+        self._store = store
+        self._root = store.root()
+
+        if file is not None:
+            self.load(file)
+
+    @property
+    def abstractions(self):
+        return self._root
+
+    @abstractions.setter
+    def abstractions(self, a):
+        if self._store is None:
+            self._root = a
+        elif a is not self._root:
+            self._root = self._store.replace_root(a)
+
+    @property
+    def store(self):
+        """:obj:`Store` holding the project"""
+
+        return self._store
+
+    @indirect._writes
+    def commit(self):
+        """Commit modifications to the database"""
+
+        self._store.commit()
+
+    @indirect._writes
+    def close(self):
+        """Commit and close the database"""
+
+        self._store.close()
+
+    def _assigned(self, kind, name, value):
+        super()._assigned(kind, name, value)
+        if self._store is not None:
+            self._store.assign(kind, name, value)
+
+    def _modified(self, key, content):
+        super()._modified(key, content)
+        self.decent_keyp(key[:-1]).content[content.alias] = content
+
+    @indirect._reads
+    def find(
+            self, *, tags=None, kind=None, source=None, alias=None,
+            view=None):
+        """Find contents by attribute values
+
+        Queries the indexes of the database, see
+        :meth:`indirect.Project.find`.
+        """
+
+        if isinstance(tags, str):
+            tags = [tags]
+
+        roots = exact = None
+        if view is not None:
+            roots, exact = [], []
+            for keyp in self.check_view(view):
+                if isinstance(keyp, str):
+                    keyp = indirect.KeyPath.from_string(keyp)
+                node = self.decent_keyp(keyp)
+                if isinstance(node, indirect.Content):
+                    exact.append((self.decent_keyp(keyp[:-1])._id, keyp[-1]))
+                else:
+                    roots.append(node._id)
+
+        memo = {}
+        keyp = self._store.keyp
+        found = (
+            (*keyp(node_id, memo), alias_)
+            for node_id, alias_ in self._store.find(
+                tags=tags or (), kind=kind, source=source, alias=alias,
+                roots=roots, exact=exact or ()
+                )
+            )
+
+        return sorted(indirect.KeyPath(key) for key in found)
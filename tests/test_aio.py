@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from indirect import aio
+from indirect import indirect
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_scan_dirs(tmp_path):
+    for d in [
+            "exp_1/replica_1", "exp_1/replica_2", "exp_1/other",
+            "exp_2/replica_1", "old_3/replica_1"]:
+        (tmp_path / d).mkdir(parents=True)
+    (tmp_path / "exp_2" / "replica_3").touch()
+
+    found = asyncio.run(collect(
+        aio.scan_dirs(tmp_path, "exp_*/replica_*", max_concurrency=2)
+        ))
+    assert sorted(found) == [
+        ("exp_1", "replica_1"), ("exp_1", "replica_2"),
+        ("exp_2", "replica_1")
+        ]
+
+    found = asyncio.run(collect(aio.get_dirs(tmp_path, prefix="exp_")))
+    assert found == ["1", "2"]
+
+
+def test_iter_exists(tmp_path):
+    p = indirect.Project()
+    p.sources["data"] = tmp_path
+    p.add_abstractions((f"{i}", None, []) for i in range(10))
+    for i in range(10):
+        p.add_content(
+            "out", f"{i}.dat", source="data", ignore_keyp=True,
+            view=[f"{i}"]
+            )
+        if i % 3 == 0:
+            (tmp_path / f"{i}.dat").touch()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        checked = asyncio.run(collect(aio.iter_exists(
+            p, batch_size=3, max_concurrency=2, executor=executor
+            )))
+    assert sorted(checked) == [
+        ((f"{i}", "out"), i % 3 == 0) for i in range(10)
+        ]
+    assert p["3.out"].exists is True
+    assert p["4.out"].exists is False
+
+    stats = dict(asyncio.run(collect(aio.iter_stats(p, ["0", "1"]))))
+    assert stats[("0", "out")].st_size == 0
+    assert stats[("1", "out")] is None
+
+    # A file in place of a directory, and a directory in place of a file
+    p.add_content("nested", "0.dat/x.dat", source="data", view=["1"])
+    (tmp_path / "2.dat").mkdir()
+    for iterate in [aio.iter_exists, aio.iter_stats]:
+        checked = dict(asyncio.run(collect(iterate(p, ["1", "2"]))))
+        assert p["1.nested"].exists is False
+        assert p["2.out"].exists is False
+    assert checked[("1", "nested")] is None
+    assert checked[("2", "out")] is not None
+
+
+def test_load_save(tmp_path):
+    files = [tmp_path / f"{i}.json" for i in range(3)]
+    for i, file in enumerate(files):
+        p = indirect.Project()
+        p.add_abstraction(f"a{i}")
+        p.save(file)
+
+    async def roundtrip():
+        projects = await asyncio.gather(*(aio.load(f) for f in files))
+        for p in projects:
+            p.add_abstraction("new")
+        await asyncio.gather(*(aio.save(p, p.file) for p in projects))
+
+    asyncio.run(roundtrip())
+    for i, file in enumerate(files):
+        assert sorted(indirect.Project(file=file).abstractions.next) == [
+            f"a{i}", "new"
+            ]
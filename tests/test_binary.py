@@ -0,0 +1,79 @@
+import pathlib
+import sys
+import threading
+
+import pytest
+
+from indirect import binary
+from indirect import indirect
+
+
+@pytest.fixture
+def project():
+    p = indirect.Project()
+    p.sources["main"] = "data"
+    p.add_abstractions((s, f"system_{s}", []) for s in "ab")
+    p.add_abstractions(
+        (f"{i}", f"rep{i}", [s]) for s in "ab" for i in range(10)
+        )
+    p.add_content(
+        "report", "report.dat", source="main", kind="txt", tags=["raw"],
+        view=[f"a.{i}" for i in range(10)]
+        )
+    return p
+
+
+def test_lazy_load(project, tmp_path):
+    file = tmp_path / "project.idb"
+    project.save(file)
+
+    loaded = indirect.Project(file=file)
+    root = loaded.abstractions
+    assert root._reader is not None
+
+    report = loaded["a.3.report"]
+    assert report.fullpath == pathlib.Path("data/system_a/rep3/report.dat")
+    assert report.keyp == ("a", "3")
+    assert report.tags == ["raw"]
+    assert report.exists is None
+    assert root._reader is None
+    assert root.next["b"]._reader is not None
+    assert root.next["a"].next["4"]._reader is not None
+
+
+def test_concurrent_materialise(tmp_path):
+    project = indirect.Project()
+    project.add_abstractions((f"{i}", None, []) for i in range(1000))
+    file = tmp_path / "project.idb"
+    project.save(file)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(20):
+            root = indirect.Project(file=file).abstractions
+            barrier = threading.Barrier(8)
+            seen = []
+
+            def read():
+                barrier.wait()
+                seen.append(root.next)
+
+            threads = [threading.Thread(target=read) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            assert all(next_ is seen[0] for next_ in seen)
+            assert len(seen[0]) == 1000
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_invalid_file(tmp_path):
+    file = tmp_path / "project.idb"
+    file.write_bytes(b"NOTINDIRECT" * 10)
+
+    with pytest.raises(ValueError):
+        binary.Reader(file)
@@ -0,0 +1,133 @@
+import pathlib
+
+import pytest
+
+from indirect import columnar
+from indirect import indirect
+
+
+@pytest.fixture(params=["numpy", "fallback"])
+def project(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(columnar, "np", None)
+
+    p = columnar.ColumnarProject()
+    p.sources["main"] = "data"
+    p.add_abstractions((s, f"system_{s}", []) for s in "ab")
+    p.add_abstractions(
+        (f"{i}", f"rep{i}", [s]) for s in "ab" for i in range(3)
+        )
+    p.add_content(
+        "report", "report.dat", source="main",
+        view=[f"a.{i}" for i in range(3)]
+        )
+    return p
+
+
+def test_columns(project):
+    columns = project.columns
+    assert columns.n_nodes == 9
+    assert columns.n_contents_total == 3
+    assert project.abstractions._reader is not None
+
+    i = columns.index("a.1")
+    assert columns.keyp(i) == ("a", "1")
+    assert columns.string(columns.path[i]) == "rep1"
+    assert sorted(columns.keyp(j) for j in columns.subtree(i)) == [("a", "1")]
+    assert len(columns.subtree(columns.index("b"))) == 4
+    assert list(columns.content_parent) == [
+        columns.index(f"a.{i}") for i in range(3)
+        ]
+
+    with pytest.raises(LookupError):
+        columns.index("a.9")
+
+    # Paths are resolved without materialising the tree
+    assert project.resolve_paths() == [
+        str(pathlib.Path(f"data/system_a/rep{i}/report.dat"))
+        for i in range(3)
+        ]
+    assert project.abstractions._reader is not None
+
+
+def test_project_api(project, tmp_path):
+    project.compact()
+    assert project["a.2.report"].fullpath == pathlib.Path(
+        "data/system_a/rep2/report.dat"
+        )
+
+    columns = project.columns
+    project.add_abstraction("deep", path="d", view=["b.0"])
+    assert project.columns is columns
+    assert columns.n_nodes == 10
+    assert columns.keyp(columns.index("b.0.deep")) == ("b", "0", "deep")
+    assert project["b.0.deep"].fullpath == pathlib.Path("system_b/rep0/d")
+
+    file = tmp_path / "project.idb"
+    project.save(file)
+    loaded = columnar.ColumnarProject(file=file)
+    assert loaded._columns is not None
+    assert loaded.columns.keyp(loaded.columns.index("b.0.deep")) == (
+        "b", "0", "deep"
+        )
+
+    file = tmp_path / "project.json"
+    project.save(file)
+    loaded = columnar.ColumnarProject(file=file)
+    assert loaded._columns is not None
+    assert isinstance(loaded, indirect.Project)
+
+
+def assert_mirrors(project):
+    """Columns match a freshly compacted copy of the tree"""
+
+    columns = project.columns
+    expected = indirect.Project.resolve_paths(project, with_keys=True)
+    assert project.resolve_paths(with_keys=True) == expected
+    assert columns.n_contents_total == len(expected[0])
+    assert sorted(columns.keyp(i) for i in columns.subtree()) == sorted(
+        keyp for keyp, node in project.abstractions.walk()
+        if isinstance(node, indirect.Abstraction)
+        )
+
+
+def test_incremental(project):
+    project.compact()
+    columns = project.columns
+    assert_mirrors(project)
+
+    # Replacing keeps the position, re-adding appends
+    project.add_abstraction("1", path="new", view=["a"])
+    project.rm_abstraction("0", view=["a"])
+    project.add_abstraction("0", path="again", view=["a"])
+    project.add_content("log", "x.log", source="main", view=["a.1", "b"])
+    project.add_content("report", "other.dat", source="main", view=["a.2"])
+    assert [columns.keyp(j) for j in columns.children(0)] == [("a",), ("b",)]
+    assert [
+        columns.keyp(j) for j in columns.children(columns.index("a"))
+        ] == [("a", "1"), ("a", "2"), ("a", "0")]
+    assert project.columns is columns
+    assert_mirrors(project)
+
+    project.rm_abstraction("b", view=[[]])
+    with pytest.raises(LookupError):
+        columns.index("b.0")
+    b = columns._find(0, columns.string_id("b"), removed=True)
+    assert columns.keyp(b) == ("b",)
+    assert columns._find(0, columns.string_id("b")) is None
+    assert columns.n_nodes == 5
+    assert_mirrors(project)
+
+    # In place modifications are announced with invalidate
+    project["a.2"].path = "moved"
+    project.invalidate("a.2")
+    assert project.resolve_paths(["a.2"]) == [
+        str(pathlib.Path("data/system_a/moved/other.dat"))
+        ]
+    assert_mirrors(project)
+
+    project.compact()
+    assert project.columns.n_nodes == 5
+    assert_mirrors(project)
@@ -1,6 +1,9 @@
+import re
+
 import pytest
 
 from indirect import cookbook
+from indirect import indirect
 
 
 @pytest.mark.parametrize(
@@ -27,3 +30,48 @@ def test_get_dirs(args, kwargs, expected):
     found = cookbook.get_dirs(*args, **kwargs)
 
     assert expected == list(found)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for d in [
+            "exp_1/replica_1", "exp_1/replica_2", "exp_1/other",
+            "exp_2/replica_1", "old_3/replica_1"]:
+        (tmp_path / d).mkdir(parents=True)
+    (tmp_path / "exp_2" / "replica_3").touch()
+    return tmp_path
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+@pytest.mark.parametrize(
+    "template",
+    ["exp_*/replica_*", ["exp_*", re.compile("^replica")]]
+)
+def test_scan_dirs(tree, template, parallel):
+    found = cookbook.scan_dirs(tree, template, parallel=parallel)
+
+    assert found == [
+        ("exp_1", "replica_1"), ("exp_1", "replica_2"),
+        ("exp_2", "replica_1")
+        ]
+
+    journal = cookbook.DirJournal()
+    assert cookbook.scan_dirs(
+        tree, template, parallel=parallel, journal=journal
+        ) == found
+    assert journal.changed == {"", "exp_1", "exp_2"}
+    assert journal.n_stat == journal.n_listed == 3
+
+
+def test_list_content_paths(tmp_path, capsys):
+    p = indirect.Project()
+    p.sources["home"] = tmp_path
+    p.add_abstractions((s, None, []) for s in "ab")
+    p.add_content("report", "report.dat", view=["a", "b"])
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "report.dat").touch()
+
+    cookbook.list_content_paths(p, "*")
+    out = capsys.readouterr().out
+    assert "report.dat (True)" in out
+    assert "report.dat (False)" in out
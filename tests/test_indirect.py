@@ -1,5 +1,10 @@
+import hashlib
 import inspect
 import json
+import pathlib
+import re
+import sys
+import threading
 import pytest
 
 from indirect import indirect
@@ -20,6 +25,12 @@ ABSTRACTION_CASES = [
 ]
 
 
+def dump_tree(project):
+    return json.dumps(
+        project.abstractions.to_dict(), cls=indirect.ProjectEncoder
+        )
+
+
 class TestProject:
 
     def test_add_abstraction(self):
@@ -27,6 +38,580 @@ class TestProject:
         p = indirect.Project()
         p.add_abstraction("s1")
 
+    def test_add_in_bulk(self):
+        p = indirect.Project()
+        p.add_abstractions([("a", "x", []), ("b", None, [])])
+        p.add_abstractions(
+            (f"{i}", f"r{i}", keyp) for keyp in ("a", "b") for i in range(3)
+            )
+        p.add_contents(
+            ("report", f"{i}.dat", ["a", f"{i}"]) for i in range(3)
+            )
+
+        assert list(p["b"].next) == ["0", "1", "2"]
+        assert p["a.2.report"].fullpath == pathlib.Path("x/r2/2.dat")
+
+        with pytest.raises(LookupError):
+            p.add_abstractions([("c", None, ["missing"])])
+
+    @pytest.mark.parametrize("suffix", [".json", ".jsonl", ".idb"])
+    def test_save_load(self, suffix, tmp_path):
+        p = indirect.Project()
+        p.sources["main"] = "data"
+        p.add_abstraction("a", path="x")
+        p.add_abstractions((f"{i}", f"r{i}", ["a"]) for i in range(3))
+        p.add_abstraction("deep", view=["a.1"])
+        p.add_content("report", "{1}.dat", source="main", view=["a.0", "a.1"])
+        p.add_content("info", "info.txt", tags=["meta"])
+        p.views["a"] = ["a.0", "a.1"]
+
+        file = tmp_path / f"project{suffix}"
+        p.save(file)
+
+        loaded = indirect.Project(file=file)
+        assert dump_tree(loaded) == dump_tree(p)
+        assert loaded.views["a"] == p.views["a"]
+        assert loaded["a.1.report"].fullpath == pathlib.Path("data/x/r1/1.dat")
+        assert loaded["info"].tags == ["meta"]
+        assert loaded["a.1.deep"].fullpath == pathlib.Path("x/r1/deep")
+
+    def test_check_exists(self, tmp_path):
+        (tmp_path / "a" / "1").mkdir(parents=True)
+        (tmp_path / "a" / "1" / "data.dat").touch()
+
+        p = indirect.Project()
+        p.sources["main"] = tmp_path
+        p.add_abstraction("a")
+        p.add_abstractions((f"{i}", None, ["a"]) for i in range(1, 4))
+        p.add_content(
+            "report", "data.dat", source="main",
+            view=[f"a.{i}" for i in range(1, 4)]
+            )
+        p.add_content("info", "info", source="main", check=True)
+
+        assert p["info"].exists is False
+        assert p["a.1.report"].exists is None
+
+        report = p.check_exists(["a"], max_workers=2, n_slowest=2)
+        assert report.n_checked == 3
+        assert report.n_existing == 1
+        assert len(report.slowest) == 2
+        assert [p[f"a.{i}.report"].exists for i in range(1, 4)] == [
+            True, False, False
+            ]
+
+    @pytest.mark.parametrize("processes", [False, True])
+    def test_update_hashes(self, processes, tmp_path):
+        for i in range(1, 4):
+            (tmp_path / f"{i}.dat").write_text(f"{i}")
+
+        p = indirect.Project()
+        p.sources["main"] = tmp_path
+        p.add_contents(
+            ((f"r{i}", f"{i}.dat", []) for i in range(1, 5)), source="main"
+            )
+        # Unreadable, e.g. a directory
+        (tmp_path / "5.dat").mkdir()
+        p.add_content("r5", "5.dat", source="main")
+
+        report = p.update_hashes(max_workers=2, processes=processes)
+        assert sorted(report.changed) == [("r1",), ("r2",), ("r3",)]
+        assert report.missing == [("r4",), ("r5",)]
+        assert p["r5"].hash is None
+        assert p["r1"].hash == hashlib.sha256(b"1").hexdigest()
+
+        (tmp_path / "2.dat").write_text("changed")
+        report = p.update_hashes(max_workers=2, processes=processes)
+        assert report.changed == [("r2",)]
+        assert report.unchanged == 2
+
+        file = tmp_path / "project.idb"
+        p.save(file)
+        loaded = indirect.Project(file=file)
+        assert loaded["r2"].hash == p["r2"].hash
+        assert loaded["r2"].signature == p["r2"].signature
+
+    def test_collect_metadata(self, tmp_path):
+        for i in range(1, 3):
+            (tmp_path / f"{i}").mkdir()
+            (tmp_path / f"{i}" / "data.dat").write_text("x" * i)
+        (tmp_path / "2" / "data.dat").chmod(0o600)
+        (tmp_path / "3" / "data.dat").mkdir(parents=True)
+
+        p = indirect.Project()
+        p.sources["main"] = tmp_path
+        p.add_abstractions((f"{i}", None, []) for i in range(1, 4))
+        p.add_content(
+            "report", "data.dat", source="main",
+            view=[f"{i}" for i in range(1, 4)]
+            )
+        p.add_content("log", "log.txt", source="main", view=["1"])
+
+        report = p.collect_metadata(max_workers=2)
+        assert report.n_dirs == 3
+        assert report.n_cached == 0
+        assert report.metadata[("2", "report")].size == 2
+        assert report.metadata[("2", "report")].permissions == 0o600
+        assert report.metadata[("1", "log")] is None
+        assert report.metadata[("3", "report")] is None
+        assert report.total_size == 3
+        assert p["1.report"].exists is True
+        assert p["3.report"].exists is False
+
+        (tmp_path / "1" / "data.dat").write_text("changed")
+        report = p.collect_metadata(["1"])
+        assert report.n_cached == 2
+        assert report.metadata[("1", "report")].size == 1
+
+        p.metadata.ttl = 0
+        report = p.collect_metadata(["1"])
+        assert report.n_cached == 0
+        assert report.n_dirs == 1
+        assert report.metadata[("1", "report")].size == 7
+
+        # Matches of patterns are iterated once
+        report = p.collect_metadata(p.glob("*"))
+        assert len(report.metadata) == 4
+
+    def test_populate(self, tmp_path):
+        for d in [
+                "exp_1/replica_1", "exp_1/replica_2", "exp_2/replica_1",
+                "exp_2/other"]:
+            (tmp_path / "s" / d).mkdir(parents=True)
+            (tmp_path / "s" / d / "data.dat").touch()
+
+        p = indirect.Project()
+        p.sources["main"] = tmp_path
+        p.add_abstraction("s")
+        view = p.populate(
+            [
+                {"pattern": "exp_*", "alias": "e{index}"},
+                {"pattern": re.compile("^replica_([0-9]+)")},
+            ],
+            contents={
+                "report": "*.dat",
+                "log": {"filename": "run.log", "kind": "txt"},
+                "missing": "*.xtc",
+            },
+            source="main", view=["s"], name="replicas"
+            )
+
+        assert view == [("s", "e1", "1"), ("s", "e1", "2"), ("s", "e2", "1")]
+        assert p.views["replicas"] == view
+        assert p["s.e2.1"].fullpath == pathlib.Path("s/exp_2/replica_1")
+        assert p["s.e1.2.report"].fullpath == (
+            tmp_path / "s/exp_1/replica_2/data.dat"
+            )
+        assert p["s.e1.1.log"].kind == "txt"
+        assert "missing" not in p["s.e1.1"]
+
+    def test_resync(self, tmp_path):
+        data = tmp_path / "data"
+
+        def make(d):
+            (data / d).mkdir(parents=True)
+            (data / d / "data.dat").touch()
+
+        for d in ["exp_1/replica_1", "exp_1/replica_2", "exp_2/replica_1"]:
+            make(d)
+
+        p = indirect.Project()
+        p.sources["data"] = data
+        p.populate(
+            ["exp_*", "replica_*"], contents={"report": "*.dat"},
+            source="data", name="replicas"
+            )
+        assert len(p.views["replicas"]) == 3
+
+        file = tmp_path / "project.json"
+        p.save(file)
+        p = indirect.Project(file=file)
+
+        report = p.resync("replicas")
+        assert report.added == report.removed == []
+        assert report.n_listed == 0
+
+        make("exp_2/replica_2")
+        (data / "exp_1/replica_1/data.dat").unlink()
+        (data / "exp_1/replica_1/new.dat").touch()
+        (data / "exp_1/replica_2/data.dat").unlink()
+        (data / "exp_1/replica_2").rmdir()
+
+        report = p.resync("replicas")
+        assert report.added == [("2", "2")]
+        assert report.removed == [("1", "2")]
+        assert report.n_listed == 4
+        assert p.views["replicas"] == [("1", "1"), ("2", "1"), ("2", "2")]
+        assert p["1.1.report"].filename == "new.dat"
+        assert p["2.2.report"].fullpath == data / "exp_2/replica_2/data.dat"
+
+    def test_locate(self, tmp_path):
+        p = indirect.Project()
+        p.sources["main"] = tmp_path / "main"
+        p.add_abstraction("a", path="system_a")
+        p.add_abstractions((f"{i}", f"rep{i}", ["a"]) for i in range(3))
+        p.add_content(
+            "report", "data.dat", source="main",
+            view=[f"a.{i}" for i in range(3)]
+            )
+
+        main = tmp_path / "main" / "system_a"
+        assert p.locate(main / "rep1" / "data.dat") == ("a", "1", "report")
+        assert p.locate(main / "rep1" / "other.dat") == ("a", "1")
+        assert p.locate(main / "rep9") == ("a",)
+        assert p.locate(tmp_path / "main") == ()
+        assert p.locate(tmp_path) is None
+
+        p.rm_content("report", view=["a.1"])
+        assert p.locate(main / "rep1" / "data.dat") == ("a", "1")
+
+        p.add_abstraction("3", path="rep3", view=["a"])
+        p.add_content("log", "run.log", source="main", view=["a.3"])
+        assert p.locate(main / "rep3" / "run.log") == ("a", "3", "log")
+
+        p.rm_abstraction("3", view=["a"])
+        assert p.locate(main / "rep3" / "run.log") == ("a",)
+
+        p.sources["main"] = tmp_path / "moved"
+        assert p.locate(main / "rep2" / "data.dat") is None
+        assert p.locate(
+            tmp_path / "moved" / "system_a" / "rep2" / "data.dat"
+            ) == ("a", "2", "report")
+
+    def test_content_tags(self):
+        p = indirect.Project()
+        p.add_contents(
+            ((f"c{i}", f"{i}.dat", []) for i in range(2)), tags=["raw"]
+            )
+        p["c0"].tags.append("checked")
+        assert p["c0"].tags == ["raw", "checked"]
+        assert p["c1"].tags == ["raw"]
+        assert indirect.Content(3).alias == 3
+
+    def test_find(self):
+        p = indirect.Project()
+        p.add_abstractions((s, None, []) for s in "ab")
+        p.add_abstractions(
+            (f"{i}", None, [s]) for s in "ab" for i in range(3)
+            )
+        p.add_content(
+            "raw", "raw.bin", kind="binary", tags=["raw", "large"],
+            view=[f"{s}.{i}" for s in "ab" for i in range(3)]
+            )
+        p.add_content(
+            "log", "run.log", kind="txt", tags=["raw"], source="scratch",
+            view=["a.0", "b.1"]
+            )
+
+        # A view alone walks its subtrees, without building the index
+        assert p.find(view=["b.1", "b"]) == [
+            ("b", "0", "raw"), ("b", "1", "log"), ("b", "1", "raw"),
+            ("b", "2", "raw")
+            ]
+        assert p._content_index is None
+
+        assert p.find(tags="raw", kind="binary", view=["a"]) == [
+            ("a", f"{i}", "raw") for i in range(3)
+            ]
+        assert p.find(tags=["raw", "large"], view=["b.1"]) == [
+            ("b", "1", "raw")
+            ]
+        assert p.find(source="scratch") == [
+            ("a", "0", "log"), ("b", "1", "log")
+            ]
+        assert p.find(tags="missing") == []
+
+        p.rm_abstraction("0", view=["a"])
+        p.add_content("log", "run.log", kind="txt", view=["a.1"])
+        assert p.find(alias="log", kind="txt") == [
+            ("a", "1", "log"), ("b", "1", "log")
+            ]
+        assert len(p.find(view=["b"])) == 4
+
+    @pytest.mark.parametrize(
+        "pattern,expected",
+        [
+            ("a.*", ["a.0", "a.1", "a.2"]),
+            ("a.*.report", ["a.0.report", "a.2.report"]),
+            ("**.report", ["a.0.report", "a.2.report", "b.1.report"]),
+            ("b.{1,2}", ["b.1", "b.2"]),
+            ("{a,b}.[12].*", ["a.2.report", "b.1.report"]),
+            ("**", ["", "a", "a.0", "a.1", "a.2", "b", "b.0", "b.1", "b.2"]),
+            ("*.**.report", ["a.0.report", "a.2.report", "b.1.report"]),
+            ("c.*", []),
+        ]
+    )
+    def test_glob(self, pattern, expected):
+        p = indirect.Project()
+        p.add_abstractions((s, None, []) for s in "ab")
+        p.add_abstractions(
+            (f"{i}", None, [s]) for s in "ab" for i in range(3)
+            )
+        p.add_content("report", "r.dat", view=["a.0", "a.2", "b.1"])
+
+        assert [k.to_string() for k in p.glob(pattern)] == expected
+
+    def test_pattern_view(self):
+        p = indirect.Project()
+        p.add_abstractions((s, None, []) for s in "ab")
+        p.add_abstractions(
+            (f"{i}", None, [s]) for s in "ab" for i in range(3)
+            )
+
+        p.add_content("report", "r.dat", view="*.{0,1}")
+        assert len(list(p.glob("**.report"))) == 4
+
+        p.rm_content("report", view=indirect.KeyPathPattern("b.[01]"))
+        assert p.find(alias="report") == [
+            ("a", "0", "report"), ("a", "1", "report")
+            ]
+
+        p.add_abstraction("sub", view="**")
+        assert len(list(p.glob("**.sub"))) == 9
+
+        # Matches below removed nodes are skipped
+        p.add_abstraction("sub", view=["a.sub"])
+        p.rm_abstraction("sub", view="**")
+        assert list(p.glob("**.sub")) == []
+        assert len(list(p.glob("**"))) == 9
+
+        with pytest.raises(LookupError):
+            p.check_view("missing")
+
+    def test_resolve_paths(self, monkeypatch):
+        monkeypatch.setenv("INDIRECT_TEST_DIR", "env/dir")
+
+        p = indirect.Project()
+        p.sources["main"] = "$INDIRECT_TEST_DIR"
+        p.sources["abs"] = "/abs/"
+        p.add_abstraction("a", path="x")
+        p.add_abstractions((f"{i}", f"./r{i}/", ["a"]) for i in range(3))
+        p.add_abstraction("b", path="/other")
+        p.add_content("report", "data.dat", source="main", view=["a.0", "b"])
+        p.add_content("log", "", cpath="logs/", source="abs", view=["a.1"])
+        p.add_content("up", "f", cpath="../$INDIRECT_TEST_DIR", view=["a.2"])
+        p.add_content("flat", "f", cpath="/c", ignore_keyp=True)
+        p.add_content("top", "f", view=["a"])
+        p.add_content("literal", "$INDIRECT_TEST_DIR.dat", view=["a.0"])
+
+        expected = [
+            (key, str(c.fullpath)) for key, c in p.iter_contents()
+            ]
+        keys, paths = p.resolve_paths(with_keys=True)
+        assert list(zip(keys, paths)) == expected
+
+        assert p.resolve_paths(["a.1", "a.2.up"]) == [
+            "/abs/x/r1/logs", "x/r2/../env/dir/f"
+            ]
+        assert p.resolve_paths(["a"], recursive=False) == ["x/f"]
+
+        np = pytest.importorskip("numpy")
+        array = p.resolve_paths(as_array=True)
+        assert isinstance(array, np.ndarray)
+        assert array.tolist() == paths
+
+    def test_refresh_env(self, monkeypatch):
+        monkeypatch.setenv("INDIRECT_TEST_SYSTEM", "s1")
+
+        p = indirect.Project()
+        p.sources["main"] = "/data"
+        p.add_abstraction("a", path="${INDIRECT_TEST_SYSTEM}/run")
+        p.add_content("report", "data.dat", source="main", view=["a"])
+        assert p["a.report"].fullpath == pathlib.Path("/data/s1/run/data.dat")
+
+        monkeypatch.setenv("INDIRECT_TEST_SYSTEM", "s2")
+        assert "INDIRECT_TEST_SYSTEM" in p.refresh_env()
+        assert p["a.report"].fullpath == pathlib.Path("/data/s2/run/data.dat")
+        assert p.resolve_paths() == ["/data/s2/run/data.dat"]
+        assert p.refresh_env() == set()
+
+    @pytest.mark.parametrize("suffix", [".json", ".jsonl", ".idb"])
+    def test_threadsafe_save(self, tmp_path, suffix):
+        p = indirect.Project(threadsafe=True)
+        p.add_content("report", "data.dat")
+        p.save(tmp_path / f"project{suffix}")
+        assert p.sources["home"] == tmp_path
+
+        loaded = indirect.Project(file=p.file, threadsafe=True)
+        assert loaded["report"].fullpath == tmp_path / "data.dat"
+
+    def test_threadsafe(self):
+        p = indirect.Project(threadsafe=True)
+        p.add_abstraction("a", path="x")
+        p.add_content("report", "data.dat", view=["a"])
+        errors = []
+
+        def write():
+            for i in range(200):
+                p.add_abstraction(f"{i}", path=f"r{i}", view=["a"])
+                p.add_content("report", "data.dat", view=[f"a.{i}"])
+                if i > 0:
+                    p.rm_abstraction(f"{i - 1}", view=["a"])
+
+        def read():
+            try:
+                for _ in range(200):
+                    assert p["a.report"].fullpath == pathlib.Path(
+                        "x/data.dat"
+                        )
+                    with p.reading():
+                        json.dumps(
+                            p.abstractions.to_dict(),
+                            cls=indirect.ProjectEncoder
+                            )
+                        paths = p.resolve_paths(["a"])
+                        assert len(paths) == len(list(p.iter_contents(["a"])))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=write)]
+        threads.extend(threading.Thread(target=read) for _ in range(4))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert list(p["a"].next) == ["199"]
+
+        with p.reading():
+            with pytest.raises(RuntimeError):
+                p.add_abstraction("b")
+
+    def test_threadsafe_setters(self, tmp_path):
+        p = indirect.Project(threadsafe=True)
+        p.add_content("report", "data.dat")
+        reading = threading.Event()
+        release = threading.Event()
+        done = threading.Event()
+
+        def read():
+            with p.reading():
+                reading.set()
+                release.wait()
+
+        def write():
+            p.sources["home"] = tmp_path
+            p.views["all"] = [[]]
+            del p.views["all"]
+            p.check_exists()
+            done.set()
+
+        threads = [threading.Thread(target=read)]
+        threads[0].start()
+        reading.wait()
+        threads.append(threading.Thread(target=write))
+        threads[1].start()
+
+        try:
+            # Writers wait for the reader
+            assert not done.wait(0.1)
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+        assert done.is_set()
+        assert p["report"].exists is False
+
+    def test_threadsafe_indexes(self):
+        p = indirect.Project(threadsafe=True)
+        p.add_contents(
+            ((f"c{i}", f"{i}.dat", []) for i in range(5000)), tags=["raw"]
+            )
+        found = []
+
+        def find():
+            found.append(len(p.find(tags="raw")))
+            found.append(p.locate("4999.dat"))
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        try:
+            threads = [threading.Thread(target=find) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        assert found.count(5000) == 2
+        assert found.count(("c4999",)) == 2
+
+    def test_lazy_view(self, tmp_path):
+        p = indirect.Project()
+        p.add_abstractions((s, None, []) for s in "ab")
+        p.add_abstractions(
+            (f"{i}", None, [s]) for s in "ab" for i in range(3)
+            )
+
+        view = indirect.LazyView({"a": {"0": None, "1": {}}, "b": None})
+        assert list(view.resolve(p)) == [("a", "0"), ("a", "1"), ("b",)]
+
+        p.views["subtree"] = indirect.LazyView.from_subtree("b")
+        p.views["pattern"] = indirect.LazyView("*.2")
+        p.add_content("report", "r.dat", view="pattern")
+        assert p.find(alias="report") == [
+            ("a", "2", "report"), ("b", "2", "report")
+            ]
+
+        # Nodes added while iterating are not visited
+        p.add_abstraction("sub", view="subtree")
+        assert len(list(p.glob("b.**.sub"))) == 4
+
+        p.save(tmp_path / "p.json")
+        loaded = indirect.Project()
+        loaded.load(tmp_path / "p.json")
+        assert isinstance(loaded.views["subtree"], indirect.LazyView)
+        assert list(loaded.check_view("subtree")) == list(
+            p.check_view("subtree")
+            )
+
+        p.views["callable"] = indirect.LazyView(lambda p: [["a"]])
+        for suffix in [".json", ".jsonl", ".idb"]:
+            with pytest.warns(UserWarning, match="'callable' not saved"):
+                p.save(tmp_path / f"p{suffix}")
+            loaded = indirect.Project(file=tmp_path / f"p{suffix}")
+            assert sorted(loaded.views) == ["pattern", "subtree"]
+
+    @pytest.mark.parametrize("suffix", [".json", ".jsonl"])
+    def test_failed_save(self, suffix, tmp_path):
+        file = tmp_path / f"p{suffix}"
+        p = indirect.Project()
+        p.add_content("report", "r.dat")
+        p.save(file)
+
+        p["report"].desc = object()
+        with pytest.raises(TypeError):
+            p.save(file)
+
+        assert indirect.Project(file=file)["report"].desc == ""
+        assert list(tmp_path.iterdir()) == [file]
+
+    def test_path_cache_invalidation(self):
+        p = indirect.Project()
+        p.add_abstraction("a", path="x")
+        p.add_abstraction("b", path="y")
+        p.add_abstraction("1", path="r1", view=["a"])
+        p.add_content("report", "data.dat", view=["a.1"])
+
+        assert p["a.1.report"].fullpath == pathlib.Path("x/r1/data.dat")
+        assert p.eval_keyp(["b"]) == pathlib.Path("y")
+
+        p.add_abstraction("1", path="r2", view=["a"])
+        p.add_content("report", "data.dat", view=["a.1"])
+        assert p["a.1.report"].fullpath == pathlib.Path("x/r2/data.dat")
+        assert ("b",) in p._path_cache
+
+        p.sources["home"] = "home"
+        assert p["a.1.report"].fullpath == pathlib.Path(
+            "home/x/r2/data.dat"
+            )
+
+        p.rm_abstraction("1", view=["a"])
+        with pytest.raises(LookupError):
+            p.eval_keyp(["a", "1"])
+
 
 class TestContent:
 
@@ -70,3 +655,20 @@ class TestAbstraction:
     def test_to_dict(self):
         abstraction = indirect.Abstraction("s1")
         print(abstraction.to_dict())
+
+
+class TestKeyPath:
+
+    def test_interned(self):
+        keyp = indirect.KeyPath(["a", 1])
+        assert keyp == ("a", "1")
+        assert indirect.KeyPath("a.1") is keyp
+        assert indirect.KeyPath(keyp) is keyp
+        assert indirect.KeyPath.from_string("") == ()
+        assert keyp.to_string() == "a.1"
+        assert {keyp: True}[("a", "1")]
+
+        p = indirect.Project()
+        p.add_abstraction("a")
+        p.add_contents((f"r{i}", f"{i}.dat", ["a"]) for i in range(2))
+        assert p["a.r0"].keyp is p["a.r1"].keyp
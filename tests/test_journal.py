@@ -0,0 +1,105 @@
+import pathlib
+
+import pytest
+
+from indirect import indirect
+from indirect import journal
+
+
+@pytest.fixture
+def project(tmp_path):
+    p = indirect.Project()
+    p.sources["main"] = "data"
+    p.add_abstractions((s, f"system_{s}", []) for s in "ab")
+    p.add_content("report", "report.dat", source="main", view=["a"])
+    p.save(tmp_path / "project.json")
+    return p
+
+
+def test_replay(project, tmp_path):
+    project.open_journal(sync_every=1)
+    project.add_abstractions((f"{i}", f"rep{i}", ["a"]) for i in range(3))
+    project.add_content("log", "log.txt", view=["a.1"])
+    project.rm_abstraction("2", view=["a"])
+    project.rm_content("report", view=["a"])
+    project.sources["main"] = "moved"
+    project.views["reps"] = ["a.0", "a.1"]
+    project.views["lazy"] = indirect.LazyView("a.*")
+    project.close_journal()
+
+    loaded = indirect.Project(file=tmp_path / "project.json")
+    assert not loaded.snapshot().diff(project.snapshot())
+    assert loaded["a.1.log"].fullpath == tmp_path / "system_a/rep1/log.txt"
+    assert loaded.sources["main"] == pathlib.Path("moved")
+    assert loaded.views["reps"] == [("a", "0"), ("a", "1")]
+    assert isinstance(loaded.views["lazy"], indirect.LazyView)
+    assert "report" not in loaded["a"].content
+
+
+def test_checkpoint(project, tmp_path):
+    log = project.open_journal()
+    project.add_abstraction("c")
+    assert log.n_records == 1
+
+    project.checkpoint()
+    assert log.n_records == 0
+    assert journal.path_for(project.file).stat().st_size == 0
+    assert project.file == tmp_path / "project.json"
+
+    project.rm_abstraction("a", view=[[]])
+    project.close_journal()
+
+    loaded = indirect.Project(file=project.file)
+    assert list(loaded.a.next) == ["b", "c"]
+
+
+def test_truncated_record(project, tmp_path):
+    project.open_journal()
+    project.add_abstraction("c")
+    project.add_abstraction("d")
+    project.close_journal()
+
+    file = journal.path_for(project.file)
+    file.write_text(file.read_text()[:-10])
+
+    loaded = indirect.Project(file=project.file)
+    assert list(loaded.a.next) == ["a", "b", "c"]
+
+
+def test_unserialisable_view(project):
+    project.open_journal()
+    with pytest.warns(UserWarning):
+        project.views["func"] = indirect.LazyView(lambda p: [])
+    project.close_journal()
+
+    loaded = indirect.Project(file=project.file)
+    assert "func" not in loaded.views
+
+
+def test_remove_same_alias(project):
+    project.add_abstraction("report", view=["a"])
+    project.open_journal()
+    project.rm_abstraction("report", view=["a"])
+    project.close_journal()
+
+    loaded = indirect.Project(file=project.file)
+    assert "report" in loaded["a"].content
+    assert not loaded["a"].next
+
+    # Records without the node type remove the content first
+    loaded.add_abstraction("report", view=["a"])
+    journal.apply(loaded, {"op": "rm", "key": ["a", "report"]})
+    assert "report" not in loaded["a"].content
+    assert "report" in loaded["a"].next
+
+
+def test_sync_interval(project):
+    log = project.open_journal(sync_every=100, sync_interval=0.01)
+    project.add_abstraction("c")
+    assert log._timer is not None
+    log._timer.join(5)
+
+    loaded = indirect.Project(file=project.file)
+    assert "c" in loaded.a.next
+    assert log._pending == 0
+    project.close_journal()
@@ -0,0 +1,86 @@
+import multiprocessing
+
+import pytest
+
+from indirect import indirect
+from indirect import journal
+from indirect import shared
+
+
+pytestmark = pytest.mark.skipif(
+    shared.fcntl is None, reason="Requires fcntl"
+    )
+
+
+def job(file, i):
+    p = shared.SharedProject(file=file)
+    p.add_abstraction(f"job{i}", view=["runs"])
+    for j in range(20):
+        p.add_content(f"out{j}", f"out{j}.dat", view=[f"runs.job{i}"])
+    p.save(file)
+
+
+@pytest.fixture
+def file(tmp_path):
+    file = tmp_path / "project.json"
+    p = indirect.Project()
+    p.add_abstraction("runs")
+    p.save(file)
+    return file
+
+
+def test_concurrent_writers(file):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=job, args=(file, i)) for i in range(8)
+        ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    loaded = indirect.Project(file=file)
+    assert sorted(loaded["runs"].next) == [f"job{i}" for i in range(8)]
+    assert len(list(loaded.iter_contents())) == 8 * 20
+
+
+def test_refresh(file):
+    a = shared.SharedProject(file=file)
+    b = shared.SharedProject(file=file)
+
+    a.add_abstraction("x", view=["runs"])
+    a.add_content("log", "a.log", view=["runs.x"])
+    assert a.commit() == 2
+    assert a.n_pending == 0
+
+    b.add_abstraction("y", view=["runs"])
+    assert b.refresh()
+    assert not b.refresh()
+    assert sorted(b["runs"].next) == ["x", "y"]
+    assert b.n_pending == 1
+
+    # Same node, last commit wins
+    b.add_content("log", "b.log", view=["runs.x"])
+    b.commit()
+    a.refresh()
+    assert a["runs.x.log"].filename == "b.log"
+
+
+def test_checkpoint(file):
+    a = shared.SharedProject(file=file)
+    b = shared.SharedProject("writer_b", file=file)
+
+    a.add_abstraction("x", view=["runs"])
+    b.add_abstraction("y", view=["runs"])
+    b.commit()
+    a.checkpoint()
+
+    assert journal.path_for(file).read_text() == ""
+    assert sorted(indirect.Project(file=file)["runs"].next) == ["x", "y"]
+
+    b.add_abstraction("z", view=["runs"])
+    assert b.refresh()
+    assert sorted(b["runs"].next) == ["x", "y", "z"]
+    assert b.n_pending == 1
+    assert b.alias == "writer_b"
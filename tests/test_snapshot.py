@@ -0,0 +1,75 @@
+import pathlib
+
+import pytest
+
+from indirect import indirect
+from indirect import snapshot
+
+
+@pytest.fixture
+def project():
+    p = indirect.Project()
+    p.sources["main"] = "data"
+    p.add_abstractions((s, f"system_{s}", []) for s in "ab")
+    p.add_abstractions(
+        (f"{i}", f"rep{i}", [s]) for s in "ab" for i in range(3)
+        )
+    p.add_content(
+        "report", "report.dat", source="main",
+        view=[f"{s}.{i}" for s in "ab" for i in range(3)]
+        )
+    p.views["a"] = ["a.0", "a.1"]
+    return p
+
+
+def test_structural_sharing(project):
+    first = project.snapshot()
+    assert project.snapshot().root is first.root
+
+    project.add_abstraction("new", view=["a.1"])
+    second = project.snapshot()
+    assert second.root is not first.root
+    assert second["b"] is first["b"]
+    assert second["a.0"] is first["a.0"]
+    assert second["a.1"] is not first["a.1"]
+    assert "new" not in first["a.1"].next
+
+    with pytest.raises(LookupError):
+        first["a.1.new"]
+
+    with pytest.raises(TypeError):
+        first["a"].next["x"] = None
+
+
+def test_diff(project):
+    first = project.snapshot()
+    assert not first.diff(project.snapshot())
+
+    project.add_abstraction("new", view=["a.1"])
+    project.rm_content("report", view=["b.2"])
+    project["b.0.report"].hash = "abc"
+    project.invalidate("b.0.report")
+    project["a"].path = pathlib.Path("moved")
+    project.invalidate("a")
+
+    report = snapshot.diff(first, project.snapshot())
+    assert report.added == [("a", "1", "new")]
+    assert report.removed == [("b", "2", "report")]
+    assert report.changed == [("a",), ("b", "0", "report")]
+    assert report.n_visited == 6
+
+
+def test_save_and_restore(project, tmp_path):
+    frozen = project.snapshot()
+    project.rm_abstraction("a", view=[[]])
+
+    file = tmp_path / "snapshot.json"
+    frozen.save(file)
+    loaded = indirect.Project(file=file)
+    assert loaded["a.2.report"].fullpath == pathlib.Path(
+        "data/system_a/rep2/report.dat"
+        )
+    assert loaded.views["a"] == [("a", "0"), ("a", "1")]
+
+    restored = frozen.to_project()
+    assert not restored.snapshot().diff(frozen)
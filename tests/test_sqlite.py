@@ -0,0 +1,142 @@
+import pathlib
+
+import pytest
+
+from indirect import indirect
+from indirect import sqlite
+
+
+def fill(p):
+    p.sources["main"] = "data"
+    p.add_abstractions((s, f"system_{s}", []) for s in "ab")
+    p.add_abstractions(
+        (f"{i}", f"rep{i}", [s]) for s in "ab" for i in range(3)
+        )
+    p.add_content(
+        "report", "report.dat", source="main", kind="report",
+        tags=["x", "y"], view=[f"{s}.{i}" for s in "ab" for i in range(3)]
+        )
+    p.add_content("log", "log.txt", tags=["x"], view=["a.1"])
+    p.views["a"] = ["a.0", "a.1"]
+    return p
+
+
+@pytest.fixture
+def database(tmp_path):
+    return tmp_path / "project.sqlite"
+
+
+def test_persistence(database):
+    p = fill(sqlite.SqliteProject(database=database))
+    p.rm_abstraction("2", view=["b"])
+    p.close()
+
+    expected = fill(indirect.Project())
+    expected.rm_abstraction("2", view=["b"])
+
+    loaded = sqlite.SqliteProject(database=database)
+    assert not loaded.snapshot().diff(expected.snapshot())
+    assert loaded.sources["main"] == pathlib.Path("data")
+    assert loaded.views["a"] == [("a", "0"), ("a", "1")]
+    assert loaded["b.1.report"].tags == ["x", "y"]
+    assert loaded["a.1.report"].fullpath == pathlib.Path(
+        "data/system_a/rep1/report.dat"
+        )
+
+
+def test_order(database):
+    p = sqlite.SqliteProject(database=database)
+    expected = indirect.Project()
+    for project in (p, expected):
+        project.add_abstractions((s, None, []) for s in "bac")
+        project.add_abstraction("a", path="new")
+        for alias in ("z", "x", "y", "x"):
+            project.add_content(alias, f"{alias}.dat", view=["b"])
+    p.close()
+
+    loaded = sqlite.SqliteProject(database=database)
+    assert list(loaded.abstractions.next) == ["b", "a", "c"]
+    assert list(loaded["b"].content) == ["z", "x", "y"]
+
+    def layout(a):
+        return [
+            (alias, list(d), list(d.get("content", ())))
+            for alias, d in a.to_dict()["root"]["next"].items()
+            ]
+
+    assert layout(loaded.abstractions) == layout(expected.abstractions)
+    assert layout(loaded.abstractions)[1] == ("a", ["path"], [])
+
+
+def test_lru(database):
+    p = fill(sqlite.SqliteProject(database=database, cache_size=2))
+    p.commit()
+
+    for s in "ab":
+        for i in range(3):
+            assert p.eval_keyp((s, f"{i}")) == pathlib.Path(
+                f"system_{s}/rep{i}"
+                )
+            assert len(p.store._cache) <= 2
+
+    with pytest.raises(LookupError):
+        p["a.3"]
+
+
+def test_find(database):
+    p = fill(sqlite.SqliteProject(database=database))
+
+    assert p.find(tags=["x", "y"], view=["a"]) == [
+        ("a", str(i), "report") for i in range(3)
+        ]
+    assert p.find(tags="x", kind=None, view=["a.1"]) == [
+        ("a", "1", "log"), ("a", "1", "report")
+        ]
+    assert p.find(kind="report", view=["b.0.report"]) == [
+        ("b", "0", "report")
+        ]
+    assert len(p.find(source="main")) == 6
+
+
+def test_modifications(database, tmp_path):
+    file = tmp_path / "project.json"
+    fill(indirect.Project()).save(file)
+
+    p = sqlite.SqliteProject(database=database, file=file)
+    c = p["a.0.report"]
+    c.desc = "changed"
+    p["a.0.report"] = c
+    a = p["b"]
+    a.path = pathlib.Path("moved")
+    p["b"] = a
+    p.rm_content("log", view=["a.1"])
+    p.check_exists()
+    p.close()
+
+    loaded = sqlite.SqliteProject(database=database)
+    assert loaded["a.0.report"].desc == "changed"
+    assert loaded["a.0.report"].exists is False
+    assert loaded.eval_keyp(("b", "2")) == pathlib.Path("moved/rep2")
+    assert "log" not in loaded["a.1"].content
+
+
+def test_large_view(database):
+    p = sqlite.SqliteProject(database=database)
+    p.add_abstractions((f"{i}", None, []) for i in range(1200))
+    p.add_content("report", "r.dat", view=[f"{i}" for i in range(1200)])
+    p.views["all"] = [f"{i}" for i in range(1200)]
+    p.views["reports"] = [f"{i}.report" for i in range(1200)]
+
+    assert len(p.find(view="all")) == 1200
+    assert len(p.find(alias="report", view="reports")) == 1200
+
+
+def test_delete_evicts_subtree(database):
+    p = fill(sqlite.SqliteProject(database=database))
+    p.commit()
+    for i in range(3):
+        p.eval_keyp(("a", f"{i}"))
+
+    deleted = {p["a"]._id}
+    p.rm_abstraction("a", view=[[]])
+    assert not any(key[0] in deleted for key in p.store._cache)